@@ -1,297 +1,289 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, BackgroundTasks, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.exceptions import RequestValidationError
 from sqlalchemy.orm import Session
 from app.core.database import get_db
+from app.core.config import INGEST_BATCH_ROWS, NDJSON_READ_AHEAD_BATCHES
 
 
 
 from app.models.file_import import FileImport
-from app.models.claim_model import  Claim
-from app.models.claim_diagnose_model import ClaimDiagnose
-from app.models.patient_model import Patient
-from app.models.provider_model import Provider
-from app.models.policy_model import Policy
-from app.models.processing_log import ProcessingLog
+from app.services.ingest_service import record_mappings, ingest_rows, ingest_columns, run_ingest_job
+from app.services.ingest_jobs import create_job, get_job
+from app.services.import_status import transition, InvalidStatusTransition, QUEUED
+from app.utils.sse import sse_event
+from app.services.stored_rows import iter_stored_rows, STORED_ROW_EXTENSIONS
 
 
 
-from uuid import uuid4
-from datetime import datetime,date
-from pydantic import BaseModel
-from typing import Optional, List,Any, Tuple
-import re
+from pydantic import BaseModel, ValidationError
+from typing import Any, AsyncIterator, Iterable, List, Optional, Tuple
+from itertools import chain
+import asyncio
+import json
+import anyio.from_thread
+import msgpack
 
 router = APIRouter()
 
+MSGPACK_CONTENT_TYPES = ["application/msgpack", "application/x-msgpack"]
+NDJSON_CONTENT_TYPES = ["application/x-ndjson", "application/ndjson", "application/jsonl"]
+
 class FrontendDataPayload(BaseModel):
     import_id: str
-    filename: str
+    filename: Optional[str] = None
     mappings: List[dict]
-    data: List[dict]
-       
-        
-@router.post("/process")
-def process_and_insert_data(
-    payload: FrontendDataPayload, 
+    # Only needed for PDF/DOCX imports; structured files are read back from storage
+    data: Optional[List[dict]] = None
+    # Columnar alternative to data: each header once, then one array of cells per header
+    headers: Optional[List[str]] = None
+    columns: Optional[List[List[Any]]] = None
+
+
+async def _read_payload(request: Request) -> FrontendDataPayload:
+    """Decode a JSON or MessagePack body (by Content-Type) and validate it"""
+    body = await request.body()
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    try:
+        if content_type in MSGPACK_CONTENT_TYPES:
+            raw = msgpack.unpackb(body, raw=False)
+        else:
+            raw = json.loads(body)
+    except ValueError as e:  # msgpack's and json's decode errors are both ValueErrors
+        raise HTTPException(status_code=400, detail=f"Malformed request body: {str(e) or type(e).__name__}")
+
+    try:
+        payload = FrontendDataPayload.model_validate(raw)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+
+    if (payload.headers is None) != (payload.columns is None):
+        raise HTTPException(status_code=400, detail="Columnar payloads need both headers and columns")
+    if payload.columns is not None:
+        if payload.data is not None:
+            raise HTTPException(status_code=400, detail="Send either data or headers/columns, not both")
+        if len(payload.columns) != len(payload.headers):
+            raise HTTPException(status_code=400, detail="One column is needed per header")
+        if len({len(column) for column in payload.columns}) > 1:
+            raise HTTPException(status_code=400, detail="All columns must have the same length")
+    return payload
+
+
+async def _ndjson_records(request: Request) -> AsyncIterator[Tuple[int, dict]]:
+    """Decode an NDJSON body line by line as it arrives; yields (line number, object)"""
+    buffer, line_number = b"", 0
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield line_number, _ndjson_object(line, line_number)
+    if buffer.strip():
+        yield line_number + 1, _ndjson_object(buffer, line_number + 1)
+
+
+def _ndjson_object(line: bytes, line_number: int) -> dict:
+    try:
+        record = json.loads(line)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Line {line_number}: malformed JSON: {str(e)}")
+    if not isinstance(record, dict):
+        raise HTTPException(status_code=400, detail=f"Line {line_number}: expected a JSON object")
+    return record
+
+
+async def _process_ndjson(request: Request, db: Session):
+    """
+    Streaming mode: the first line holds import_id and mappings, every further line is one row.
+    Rows are decoded while they arrive and handed to the ingest in batches through a bounded
+    queue, so inserts overlap with the upload and memory stays flat however long the body is.
+    """
+    records = _ndjson_records(request)
+    try:
+        _, header = await records.__anext__()
+    except StopAsyncIteration:
+        raise HTTPException(status_code=400, detail="Empty NDJSON body: the first line must hold import_id and mappings")
+    try:
+        payload = FrontendDataPayload.model_validate(header)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    if payload.data is not None or payload.columns is not None:
+        raise HTTPException(status_code=400, detail="In NDJSON bodies rows follow the first line, one per line")
+
+    read_ahead = asyncio.Queue(maxsize=NDJSON_READ_AHEAD_BATCHES)
+
+    async def read_body():
+        try:
+            batch = []
+            async for _, record in records:
+                batch.append(record)
+                if len(batch) >= INGEST_BATCH_ROWS:
+                    await read_ahead.put(batch)
+                    batch = []
+            if batch:
+                await read_ahead.put(batch)
+            await read_ahead.put(None)
+        except Exception as e:
+            await read_ahead.put(e)
+
+    def rows() -> Iterable[dict]:
+        # Runs in the ingest's worker thread; each batch is awaited on the event loop
+        while True:
+            batch = anyio.from_thread.run(read_ahead.get)
+            if batch is None:
+                return
+            if isinstance(batch, Exception):
+                raise batch
+            yield from batch
+
+    reader = asyncio.create_task(read_body())
+    try:
+        return await run_in_threadpool(_process, payload, db, rows())
+    finally:
+        reader.cancel()
+
+
+# The body is decoded by hand, so the schema is declared for the docs explicitly
+_PAYLOAD_SCHEMA = {"schema": FrontendDataPayload.model_json_schema()}
+
+
+@router.post("/process", openapi_extra={"requestBody": {
+    "required": True,
+    "content": {
+        "application/json": _PAYLOAD_SCHEMA,
+        "application/msgpack": _PAYLOAD_SCHEMA,
+        "application/x-ndjson": {"schema": {"type": "string", "description": "Line 1: import_id and mappings; then one row object per line"}},
+    },
+}})
+async def process_and_insert_data(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    run_in_background: bool = False,
     db: Session = Depends(get_db)
 ):
+    """
+    Insert mapped rows. The body (JSON, or MessagePack with Content-Type application/msgpack)
+    carries the rows as `data` (row dicts), as `headers` plus `columns` (one array per header),
+    or neither, in which case structured files are read back from storage.
+    With Content-Type application/x-ndjson the rows are streamed instead, see _process_ndjson.
+
+    With `?run_in_background=true` the insert runs as a job: 202 with a job_id comes back at
+    once, progress is available from /process/jobs/{job_id} (snapshot), .../events (SSE) and
+    .../ws (WebSocket).
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in NDJSON_CONTENT_TYPES:
+        if run_in_background:
+            raise HTTPException(status_code=400, detail="NDJSON bodies are ingested while they stream; they cannot run in the background")
+        return await _process_ndjson(request, db)
+    payload = await _read_payload(request)
+    if run_in_background:
+        return await run_in_threadpool(_queue_job, payload, db, background_tasks)
+    return await run_in_threadpool(_process, payload, db)
+
+
+def _queue_job(payload: FrontendDataPayload, db: Session, background_tasks: BackgroundTasks):
+    file_import = db.query(FileImport).filter(FileImport.import_id == payload.import_id).first()
+    if not file_import:
+        raise HTTPException(status_code=404, detail="File import record not found")
+    if payload.data is None and payload.columns is None and file_import.file_extension.lower() not in STORED_ROW_EXTENSIONS:
+        raise HTTPException(status_code=400, detail="Rows must be sent for document imports")
+
+    try:
+        record_mappings(db, file_import, payload.mappings)
+        job = create_job(file_import.import_id)
+        transition(file_import, QUEUED)
+        db.commit()
+    except InvalidStatusTransition as e:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
+
+    columns = (payload.headers, payload.columns) if payload.columns is not None else None
+    background_tasks.add_task(run_ingest_job, job, payload.mappings, payload.data, columns)
+    return JSONResponse(status_code=202, content={
+        "message": "Data processing started",
+        "import_id": job.import_id,
+        "job_id": job.job_id,
+        "status": job.status
+    })
+
+
+def _get_job_or_404(job_id: str):
+    job = get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Ingest job not found")
+    return job
+
+
+@router.get("/process/jobs/{job_id}")
+def get_ingest_job(job_id: str):
+    """Current status, progress (rows, fields, entities created, failed rows sample) and result of a job"""
+    return _get_job_or_404(job_id).snapshot()
+
+
+@router.get("/process/jobs/{job_id}/events")
+async def stream_ingest_job(job_id: str):
+    """
+    Server-Sent Events for a job: status (the current state), progress after every committed
+    batch, then done (with the /process response) or error.
+    """
+    job = _get_job_or_404(job_id)
+
+    async def events():
+        async for event, data in job.events():
+            yield sse_event(event, data)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@router.websocket("/process/jobs/{job_id}/ws")
+async def watch_ingest_job(websocket: WebSocket, job_id: str):
+    """The events of /process/jobs/{job_id}/events as WebSocket messages: {"event": ..., "data": ...}"""
+    job = get_job(job_id)
+    if not job:
+        await websocket.close(code=4404, reason="Ingest job not found")
+        return
+    await websocket.accept()
+    try:
+        async for event, data in job.events():
+            await websocket.send_text(json.dumps({"event": event, "data": data}, default=str))
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+
+def _process(payload: FrontendDataPayload, db: Session, rows: Optional[Iterable[dict]] = None):
     try:
         # Validate import_id exists
         file_import = db.query(FileImport).filter(FileImport.import_id == payload.import_id).first()
         if not file_import:
             raise HTTPException(status_code=404, detail="File import record not found")
 
-        # Initialize counters
-        stats = {
-            'total_fields': 0,
-            'processed_fields': 0,
-            'failed_fields': 0,
-            'total_rows': len(payload.data),
-            'processed_rows': 0,
-            'failed_rows': 0,
-            'entity_counts': {
-                'patients': 0,
-                'providers': 0,
-                'policies': 0,
-                'claims': 0,
-                'diagnoses': 0
-            }
-        }
-
-        # Process mappings and log them
-        for mapping in payload.mappings:
-            log = ProcessingLog(
-                import_id=payload.import_id,
-                header=mapping["header"],
-                llm_suggestion=mapping.get("llm_suggestion"),
-                final_mapping=mapping["final_mapping"],
-                confidence_score=mapping.get("confidence_score"),
-                user_edited_mapping=mapping.get('user_edited_mapping', False)
-            )
-            db.add(log)
-        
-        file_import.processing_status = "Mapping"
-        db.commit()
+        if payload.columns is not None:
+            record_mappings(db, file_import, payload.mappings)
+            return ingest_columns(db, file_import, payload.mappings, payload.headers, payload.columns)
 
-        # Filter valid mappings
-        valid_mappings = [m for m in payload.mappings if m.get("final_mapping")]
-        column_mapping = {m['header']: m['final_mapping'] for m in valid_mappings}
-        
-        failed_records = []
-
-        for row in payload.data:
-            stats['total_fields'] += len(row)
-            row_success = True
-            row_errors = []
-            
-            # Initialize entities
-            patient_data = {}
-            provider_data = {}
-            policy_data = {}
-            claim_data = {}
-            diagnoses_data = []
-            
-            for header, value in row.items():
-                
-                    target_column = column_mapping.get(header)
-                    if not target_column:
-                        continue
-                    
-                    # Clean and convert values
-                    cleaned_value, error = clean_field_value(target_column, value)
-                    if error:
-                        row_errors.append(f"{header}: {error}")
-                        stats['failed_fields'] += 1
-                        continue
-                        
-                    stats['processed_fields'] += 1
-                    
-                    # Route to appropriate entity
-                    if target_column in ["member_id", "first_name", "last_name", "dob", "gender", "email", "phone", "address"]:
-                        patient_data[target_column] = cleaned_value
-                    elif target_column in ["npi_number", "provider_name"]:
-                        provider_data[target_column] = cleaned_value
-                    elif target_column in ["policy_number", "plan_name", "group_number", "policy_start_date", "policy_end_date"]:
-                        policy_data[target_column] = cleaned_value
-                    elif target_column in ["diagnosis_code", "diagnosis_description"]:
-                        diagnoses_data.append({target_column: cleaned_value})
-                    else:
-                        claim_data[target_column] = cleaned_value
-                        
-                
-            
-            # Process the row if we have any valid data
-            try:
-                if patient_data or provider_data or policy_data or claim_data or diagnoses_data:
-                    # Insert patient
-                    patient_id = None
-                    if patient_data:
-                        patient = Patient(
-                            patient_id=uuid4(),
-                            **{k: v for k, v in patient_data.items() if k in Patient.__table__.columns}
-                        )
-                        db.add(patient)
-                        db.flush()
-                        patient_id = patient.patient_id
-                        stats['entity_counts']['patients'] += 1
-                    
-                    # Insert provider
-                    provider_id = None
-                    if provider_data:
-                        provider = Provider(
-                            provider_id=uuid4(),
-                            **{k: v for k, v in provider_data.items() if k in Provider.__table__.columns}
-                        )
-                        db.add(provider)
-                        db.flush()
-                        provider_id = provider.provider_id
-                        stats['entity_counts']['providers'] += 1
-                    
-                    # Insert policy
-                    policy_id = None
-                    if policy_data and provider_id:
-                        policy = Policy(
-                            policy_id=uuid4(),
-                            provider_id=provider_id,
-                            **{k: v for k, v in policy_data.items() if k in Policy.__table__.columns}
-                        )
-                        db.add(policy)
-                        db.flush()
-                        policy_id = policy.policy_id
-                        stats['entity_counts']['policies'] += 1
-                    
-                    # Insert claim
-                    claim = Claim(
-                        claim_id=uuid4(),
-                        import_id=payload.import_id,
-                        patient_id=patient_id,
-                        provider_id=provider_id,
-                        policy_id=policy_id,
-                        **{k: v for k, v in claim_data.items() if k in Claim.__table__.columns}
-                    )
-                    db.add(claim)
-                    db.flush()
-                    stats['entity_counts']['claims'] += 1
-                    
-                    # Insert diagnoses
-                    for diagnosis in diagnoses_data:
-                        claim_diagnose = ClaimDiagnose(
-                            claim_diagnose_id=uuid4(),
-                            claim_id=claim.claim_id,
-                            **{k: v for k, v in diagnosis.items() if k in ClaimDiagnose.__table__.columns}
-                        )
-                        db.add(claim_diagnose)
-                        stats['entity_counts']['diagnoses'] += 1
-                    
-                    stats['processed_rows'] += 1
-                else:
-                    stats['failed_rows'] += 1
-                    row_errors.append("No valid data fields found in row")
-                    
-            except Exception as row_error:
-                db.rollback()
-                stats['failed_rows'] += 1
-                row_errors.append(f"Database insertion error: {str(row_error)}")
-                print(f"Error processing row: {row_error}")
-            
-            if row_errors:
-                failed_records.append({
-                    "import_id": payload.import_id,
-                    "row_data": row,
-                    "errors": row_errors
-                })
-
-        # Update file import status
-        finalize_status = (stats['processed_fields'] / stats['total_fields'])*100  
-        if finalize_status >= 70:
-            file_import.processing_status = "Success"
-        else:
-            file_import.processing_status = "Failed"
-        file_import.records_extracted_from_file = stats['total_fields']
-        file_import.records_inserted_count = stats['processed_fields']
-        file_import.records_failed_to_insert_count = stats['failed_fields']
-        db.commit()
-        
-        return {
-            "message": "Data processing completed",
-            "import_id": payload.import_id,
-            "statistics": {
-                "fields": {
-                    "total": stats['total_fields'],
-                    "successful": stats['processed_fields'],
-                    "failed": stats['failed_fields'],
-                    "success_rate": f"{(stats['processed_fields']/stats['total_fields'])*100:.2f}%" if stats['total_fields'] > 0 else "0%"
-                },
-                "rows": {
-                    "total": stats['total_rows'],
-                    "successful": stats['processed_rows'],
-                    "failed": stats['failed_rows'],
-                    "success_rate": f"{(stats['processed_rows']/stats['total_rows'])*100:.2f}%" if stats['total_rows'] > 0 else "0%"
-                },
-                "entities_created": stats['entity_counts']
-            },
-            "failed_records_sample": failed_records[:5]  # Return sample of failures
-        }
+        if rows is None:
+            rows = payload.data
+        if rows is None:
+            if file_import.file_extension.lower() not in STORED_ROW_EXTENSIONS:
+                raise HTTPException(status_code=400, detail="Rows must be sent for document imports")
+            # Stream the stored file through the parser instead of taking the dataset from the client
+            rows = chain.from_iterable(iter_stored_rows(db, file_import))
+
+        record_mappings(db, file_import, payload.mappings)
+        return ingest_rows(db, file_import, payload.mappings, rows)
     
+    except HTTPException:
+        raise
+    except InvalidStatusTransition as e:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         db.rollback()
         raise HTTPException(
             status_code=500, 
             detail=f"Failed to process data: {str(e)}"
         )
-
-def clean_field_value(target_column: str, value: Any) -> Tuple[Any, Optional[str]]:
-    """Clean and convert field values with error reporting"""
-    if value is None:
-        return None, "Null value"
-        
-    if isinstance(value, str):
-        value = value.strip()
-        if not value or value.lower() in ["null", "nil", "none", "--", "unknown"]:
-            return None, "Empty or invalid value"
-
-    try:
-        # Handle date fields
-        if any(x in target_column for x in ["date", "dob"]):
-            if isinstance(value, (date, datetime)):
-                return value, None
-            try:
-                # Handle multiple date formats
-                if "T" in value:  # ISO format
-                    return datetime.fromisoformat(value).date(), None
-                else:
-                    for fmt in ["%Y-%m-%d", "%m/%d/%Y", "%d-%b-%Y", "%b %d, %Y", "%Y%m%d"]:
-                        try:
-                            return datetime.strptime(value, fmt).date(), None
-                        except ValueError:
-                            continue
-                    return None, f"Unrecognized date format: {value}"
-            except (ValueError, TypeError):
-                return None, f"Invalid date value: {value}"
-        
-        # Handle numeric fields
-        if target_column in ["amount_claimed", "amount_approved"]:
-            try:
-                if isinstance(value, str):
-                    # Remove currency symbols and thousands separators
-                    value = re.sub(r"[^\d.]", "", value)
-                return float(value), None
-            except (ValueError, TypeError):
-                return None, f"Invalid numeric value: {value}"
-        
-        # Handle gender fields
-        if target_column == "gender":
-            gender_map = {
-                'm': 'M', 'male': 'M',
-                'f': 'F', 'female': 'F',
-                'o': 'O', 'other': 'O'
-            }
-            normalized = gender_map.get(value.lower().strip(), value)
-            if normalized not in ['M', 'F', 'O']:
-                return None, f"Invalid gender value: {value}"
-            return normalized, None
-        
-        return value, None
-        
-    except Exception as e:
-        return None, f"Processing error: {str(e)}"
-    
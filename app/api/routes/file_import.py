@@ -1,335 +1,114 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, BackgroundTasks
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from app.core.database import get_db
+from app.core.database import get_db, SessionLocal
+from app.core.config import MAX_UPLOAD_HEADERS, STRAIGHT_THROUGH_MIN_CONFIDENCE, UPLOAD_SAMPLE_ROWS
 from app.models.file_import import FileImport
-from app.services.storage_service import save_file
+from app.models.fixed_width_layout import FixedWidthLayout
+from app.services.storage_service import save_file, stored_file_path
 from datetime import datetime
-from app.services.llm_service import generate_mapping_with_llm
+from app.services.mapping_service import resolve_mappings, iter_mapping_stages
+from app.services.mapping_cache import get_mapping_template
+from app.services.ingest_service import record_mappings, ingest_rows, run_ingest_job
+from app.services.stored_rows import iter_stored_rows
+from app.services.ingest_jobs import create_job
+from app.services.import_status import transition, UPLOADED, QUEUED
+from app.services.fixed_width_service import FIXED_WIDTH_EXTENSIONS, read_fixed_width, layout_mapping_result
+from app.services.file_sniffer import sniff_text_file, open_csv_reader, detect_excel_layout, read_excel_file
+from app.services.source_profile_service import find_source_profile, record_source_profile
+from app.services.header_fingerprint import header_fingerprint
+from app.services import extraction_watchdog as watchdog
+from app.services.extraction_watchdog import run_with_limits
+from app.services.document_extraction import extract_pdf_content, extract_pdf_text_fallback, extract_docx_content
+from app.utils.sse import sse_event
 
 import pandas as pd
 from io import BytesIO
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import numpy as np
 import os
-
-# PDF processing imports
-import PyPDF2
-import pdfplumber
-from pdfminer.high_level import extract_text as pdfminer_extract_text
-
-# DOCX processing imports
-import docx
-from docx import Document
-import xml.etree.ElementTree as ET
-
-# Additional imports for table extraction
-import tabula
-import camelot
+from itertools import chain
 
 router = APIRouter()
 
 
-def extract_form_data_from_text(text: str) -> Dict[str, Any]:
+def extract_document_content(extension: str, file_contents: bytes, preferred_method: Optional[str] = None) -> Dict[str, Any]:
     """
-    Extract form-like data from text content
-    Looks for key-value pairs, labels, and form fields
+    Run PDF/DOCX extraction in an isolated worker under per-file CPU, wall-clock and memory limits.
+    When a tier hits a limit or fails, the next cheaper tier is tried instead.
     """
-    form_data = {
-        "headers": [],
-        "sample_data": [],
-        "form_fields": {}
-    }
-    
-    import re
-    
-    # Common form patterns
-    patterns = [
-        r'([A-Za-z\s]+):\s*([^\n\r]+)',  # Label: Value
-        r'([A-Za-z\s]+)\s*=\s*([^\n\r]+)',  # Label = Value
-        r'([A-Za-z\s]+)\s*-\s*([^\n\r]+)',  # Label - Value
-        r'([A-Za-z\s]+)\s*\|\s*([^\n\r]+)',  # Label | Value
-        r'([A-Za-z\s]+)\s*\.\s*([^\n\r]+)',  # Label . Value
-    ]
-    
-    found_fields = {}
-    
-    for pattern in patterns:
-        matches = re.findall(pattern, text, re.MULTILINE)
-        for match in matches:
-            key = match[0].strip()
-            value = match[1].strip()
-            
-            # Filter out likely non-form content
-            if (len(key) > 2 and len(key) < 50 and 
-                len(value) > 0 and len(value) < 200 and
-                not key.lower().startswith(('page', 'figure', 'table', 'section'))):
-                found_fields[key] = value
-    
-    if found_fields:
-        form_data["headers"] = list(found_fields.keys())
-        form_data["sample_data"] = [found_fields]
-        form_data["form_fields"] = found_fields
-    
-    return form_data
+    if extension == "pdf":
+        tiers = [
+            (extract_pdf_content, (file_contents, preferred_method)),
+            (extract_pdf_text_fallback, (file_contents,)),
+        ]
+    else:
+        tiers = [
+            (extract_docx_content, (file_contents, preferred_method)),
+            (extract_docx_content, (file_contents, "raw_text")),  # skips the form regexes and tables
+        ]
 
+    for func, args in tiers:
+        status, payload = run_with_limits(func, *args)
+        if status == watchdog.OK:
+            return payload
+        print(f"{func.__name__} stopped ({status}): {payload or 'resource limit exceeded'}")
 
-def extract_pdf_content(file_contents: bytes) -> Dict[str, Any]:
-    """
-    Extract content from PDF files with priority order:
-    1. Form data extraction
-    2. General text content
-    3. Table extraction (last resort)
-    """
-    pdf_data = {
-        "text_content": "",
-        "tables": [],
-        "headers": [],
-        "sample_data": [],
-        "form_fields": {},
-        "extraction_method": ""
-    }
-    
-    try:
-        # Step 1: Extract all text content first
-        with pdfplumber.open(BytesIO(file_contents)) as pdf:
-            full_text = ""
-            tables = []
-            
-            for page in pdf.pages:
-                # Extract text
-                page_text = page.extract_text()
-                if page_text:
-                    full_text += page_text + "\n"
-                
-                # Also collect tables for later use
-                page_tables = page.extract_tables()
-                if page_tables:
-                    tables.extend(page_tables)
-            
-            pdf_data["text_content"] = full_text
-            pdf_data["tables"] = tables
-            
-            # Step 2: Try to extract form data first
-            if full_text.strip():
-                form_data = extract_form_data_from_text(full_text)
-                if form_data["headers"]:
-                    pdf_data["headers"] = form_data["headers"]
-                    pdf_data["sample_data"] = form_data["sample_data"]
-                    pdf_data["form_fields"] = form_data["form_fields"]
-                    pdf_data["extraction_method"] = "form_extraction"
-                    print(f"Form data extracted: {len(form_data['headers'])} fields found")
-                    return pdf_data
-            
-            # Step 3: If no form data, try general text processing
-            if full_text.strip():
-                # Look for structured text patterns (not form-like)
-                lines = [line.strip() for line in full_text.split('\n') if line.strip()]
-                
-                # Try to identify if text has structured information
-                structured_content = []
-                for line in lines:
-                    if len(line) > 10 and any(char in line for char in [',', '|', '\t']):
-                        structured_content.append(line)
-                
-                if structured_content:
-                    # Process as structured text
-                    pdf_data["headers"] = ["structured_content"]
-                    pdf_data["sample_data"] = [{"structured_content": '\n'.join(structured_content[:5])}]
-                    pdf_data["extraction_method"] = "structured_text"
-                    print("Structured text content extracted")
-                    return pdf_data
-            
-            # Step 4: Finally, try table extraction as last resort
-            if tables:
-                first_table = tables[0]
-                if len(first_table) > 0:
-                    headers = [str(cell).strip() if cell else f"Column_{i}" 
-                              for i, cell in enumerate(first_table[0])]
-                    pdf_data["headers"] = headers
-                    
-                    # Get sample rows (skip header row)
-                    sample_rows = []
-                    for row in first_table[1:6]:  # Get up to 5 sample rows
-                        row_dict = {}
-                        for i, cell in enumerate(row):
-                            if i < len(headers):
-                                row_dict[headers[i]] = str(cell).strip() if cell else None
-                        sample_rows.append(row_dict)
-                    pdf_data["sample_data"] = sample_rows
-                    pdf_data["extraction_method"] = "table_extraction"
-                    print("Table data extracted as last resort")
-                    return pdf_data
-            
-            # If nothing structured found, return raw text
-            if full_text.strip():
-                pdf_data["headers"] = ["extracted_text"]
-                pdf_data["sample_data"] = [{"extracted_text": full_text[:1000]}]
-                pdf_data["extraction_method"] = "raw_text"
-                print("Raw text extracted")
-                return pdf_data
-            
-    except Exception as e:
-        print(f"pdfplumber failed: {e}")
-        
-        # Fallback methods
-        try:
-            pdf_reader = PyPDF2.PdfReader(BytesIO(file_contents))
-            text_content = ""
-            for page in pdf_reader.pages:
-                text_content += page.extract_text() + "\n"
-            
-            if text_content.strip():
-                # Try form extraction on fallback text
-                form_data = extract_form_data_from_text(text_content)
-                if form_data["headers"]:
-                    pdf_data["headers"] = form_data["headers"]
-                    pdf_data["sample_data"] = form_data["sample_data"]
-                    pdf_data["form_fields"] = form_data["form_fields"]
-                    pdf_data["extraction_method"] = "form_extraction_fallback"
-                else:
-                    pdf_data["headers"] = ["extracted_text"]
-                    pdf_data["sample_data"] = [{"extracted_text": text_content[:1000]}]
-                    pdf_data["extraction_method"] = "raw_text_fallback"
-                
-                pdf_data["text_content"] = text_content
-                
-        except Exception as e2:
-            print(f"PyPDF2 failed: {e2}")
-            
-            try:
-                text_content = pdfminer_extract_text(BytesIO(file_contents))
-                pdf_data["text_content"] = text_content
-                pdf_data["headers"] = ["extracted_text"]
-                pdf_data["sample_data"] = [{"extracted_text": text_content[:1000]}]
-                pdf_data["extraction_method"] = "raw_text_pdfminer"
-            except Exception as e3:
-                print(f"All PDF extraction methods failed: {e3}")
-                raise HTTPException(status_code=500, detail="Failed to extract content from PDF")
-    
-    return pdf_data
+    raise HTTPException(status_code=500, detail=f"Failed to extract content from {extension.upper()} within resource limits")
 
 
-def extract_docx_content(file_contents: bytes) -> Dict[str, Any]:
-    """
-    Extract content from DOCX files with priority order:
-    1. Form data extraction
-    2. General text content
-    3. Table extraction (last resort)
-    """
-    docx_data = {
-        "text_content": "",
-        "tables": [],
-        "headers": [],
-        "sample_data": [],
-        "form_fields": {},
-        "extraction_method": ""
-    }
-    
+def _extract_stored_document(file_import: FileImport, extension: str, preferred_method: Optional[str] = None) -> Dict[str, Any]:
+    """Extract a stored PDF/DOCX; documents are the one upload type read into memory whole"""
+    with stored_file_path(file_import) as path:
+        with open(path, "rb") as f:
+            file_contents = f.read()
+    return extract_document_content(extension, file_contents, preferred_method)
+
+
+def _read_with_known_settings(reader, path: str, settings: Dict[str, Any], profile) -> Optional[pd.DataFrame]:
+    """Parse a sample with a profile's settings; None when they no longer fit (parse error or different headers)"""
     try:
-        doc = Document(BytesIO(file_contents))
-        
-        # Extract all text content first
-        full_text = []
-        for paragraph in doc.paragraphs:
-            if paragraph.text.strip():
-                full_text.append(paragraph.text.strip())
-        
-        text_content = "\n".join(full_text)
-        docx_data["text_content"] = text_content
-        
-        # Step 1: Try to extract form data first
-        if text_content.strip():
-            form_data = extract_form_data_from_text(text_content)
-            if form_data["headers"]:
-                docx_data["headers"] = form_data["headers"]
-                docx_data["sample_data"] = form_data["sample_data"]
-                docx_data["form_fields"] = form_data["form_fields"]
-                docx_data["extraction_method"] = "form_extraction"
-                print(f"Form data extracted from DOCX: {len(form_data['headers'])} fields found")
-                return docx_data
-        
-        # Step 2: Try structured text processing
-        if text_content.strip():
-            lines = [line.strip() for line in text_content.split('\n') if line.strip()]
-            
-            # Look for structured content patterns
-            structured_content = []
-            for line in lines:
-                if len(line) > 10 and any(char in line for char in [',', '|', '\t', ':']):
-                    structured_content.append(line)
-            
-            if structured_content:
-                docx_data["headers"] = ["structured_content"]
-                docx_data["sample_data"] = [{"structured_content": '\n'.join(structured_content[:5])}]
-                docx_data["extraction_method"] = "structured_text"
-                print("Structured text content extracted from DOCX")
-                return docx_data
-        
-        # Step 3: Extract tables as last resort
-        if doc.tables:
-            tables_data = []
-            
-            for table in doc.tables:
-                table_data = []
-                for row in table.rows:
-                    row_data = []
-                    for cell in row.cells:
-                        row_data.append(cell.text.strip())
-                    table_data.append(row_data)
-                tables_data.append(table_data)
-            
-            docx_data["tables"] = tables_data
-            
-            # Use first table for headers and sample data
-            if tables_data and len(tables_data[0]) > 0:
-                first_table = tables_data[0]
-                headers = [str(cell).strip() if cell else f"Column_{i}" 
-                          for i, cell in enumerate(first_table[0])]
-                docx_data["headers"] = headers
-                
-                # Get sample rows
-                sample_rows = []
-                for row in first_table[1:6]:  # Skip header, get up to 5 rows
-                    row_dict = {}
-                    for i, cell in enumerate(row):
-                        if i < len(headers):
-                            row_dict[headers[i]] = str(cell).strip() if cell else None
-                    sample_rows.append(row_dict)
-                docx_data["sample_data"] = sample_rows
-                docx_data["extraction_method"] = "table_extraction"
-                print("Table data extracted from DOCX as last resort")
-                return docx_data
-        
-        # Step 4: If nothing structured found, return raw text
-        if text_content.strip():
-            docx_data["headers"] = ["extracted_text"]
-            docx_data["sample_data"] = [{"extracted_text": text_content[:1000]}]
-            docx_data["extraction_method"] = "raw_text"
-            print("Raw text extracted from DOCX")
-            return docx_data
-    
+        df = reader(path, settings, nrows=UPLOAD_SAMPLE_ROWS)
     except Exception as e:
-        print(f"DOCX extraction failed: {e}")
-        raise HTTPException(status_code=500, detail="Failed to extract content from DOCX file")
-    
-    return docx_data
+        print(f"Profiled parse settings failed, re-detecting: {e}")
+        return None
+    if profile.header_fingerprint and header_fingerprint(df.columns) != profile.header_fingerprint:
+        print("Source headers changed since the profile was recorded, re-detecting")
+        return None
+    return df
 
 
-@router.post("/upload")
-async def upload_file(file: UploadFile = File(...), db: Session = Depends(get_db)):
-    if not file.filename.endswith((".csv", ".xlsx", ".tsv", ".pdf", ".docx")):
+PREDEFINED_COLUMNS = [
+    "member_id", "first_name", "last_name", "dob", "gender", "email", "phone", "address",
+    "npi_number", "provider_name", "policy_number", "plan_name", "group_number",
+    "policy_start_date", "policy_end_date", "claim_date", "admission_date", "discharge_date",
+    "amount_claimed", "amount_approved", "claim_status", "rejection_reason", "diagnosis_code", "diagnosis_description"
+]
+
+STRUCTURED_EXTENSIONS = ["csv", "tsv", "xlsx", "xls", *FIXED_WIDTH_EXTENSIONS]
+
+
+def _resolve_layout(filename: str, layout_id: Optional[str], db: Session) -> Optional[FixedWidthLayout]:
+    """Check the file type; fixed-width files must name an existing layout"""
+    if not filename.endswith((".csv", ".xlsx", ".tsv", ".pdf", ".docx")) and \
+            not filename.lower().endswith(tuple(f".{ext}" for ext in FIXED_WIDTH_EXTENSIONS)):
         raise HTTPException(status_code=400, detail="Unsupported file type")
-    
-    PREDEFINED_COLUMNS = [
-        "member_id", "first_name", "last_name", "dob", "gender", "email", "phone", "address",
-        "npi_number", "provider_name", "policy_number", "plan_name", "group_number",
-        "policy_start_date", "policy_end_date", "claim_date", "admission_date", "discharge_date",
-        "amount_claimed", "amount_approved", "claim_status", "rejection_reason", "diagnosis_code", "diagnosis_description"
-    ]
 
-    file_contents = await file.read()
-    
-    storage_type, result = save_file(file, file.filename)
+    if filename.split(".")[-1].lower() not in FIXED_WIDTH_EXTENSIONS:
+        return None
+    if not layout_id:
+        raise HTTPException(status_code=400, detail="Fixed-width files require a layout_id")
+    layout = db.query(FixedWidthLayout).filter(FixedWidthLayout.layout_id == layout_id).first()
+    if not layout:
+        raise HTTPException(status_code=404, detail="Layout not found")
+    return layout
+
+
+async def _store_upload(file: UploadFile, layout: Optional[FixedWidthLayout], db: Session):
+    """Stream the upload to storage in chunks and create its FileImport row"""
+    await file.seek(0)
+    storage_type, result = await run_in_threadpool(save_file, file, file.filename)
 
     if storage_type == "local":
         local_path = result
@@ -345,107 +124,288 @@ async def upload_file(file: UploadFile = File(...), db: Session = Depends(get_db
         local_path=local_path,
         s3_bucket=s3_bucket,
         s3_key=s3_key,
-        processing_status="Uploaded",
-        upload_time=datetime.utcnow()
+        processing_status=UPLOADED,
+        upload_time=datetime.utcnow(),
+        layout_id=layout.layout_id if layout else None
     )
 
     db.add(new_import)
     db.commit()
+    return new_import
+
+
+async def _parse_upload(
+    db: Session,
+    new_import: FileImport,
+    layout: Optional[FixedWidthLayout]
+) -> Dict[str, Any]:
+    """
+    Parse a stored upload into headers and sample rows (or extracted document content) and validate it.
+    Structured files are only read up to UPLOAD_SAMPLE_ROWS rows; ingest re-reads them from storage.
+    `result` is set when the mapping is already known, as for fixed-width layouts.
+    """
+    filename = new_import.filename
+    extension = filename.split(".")[-1].lower()
+    parsed = {
+        "extension": extension,
+        "headers": [],
+        "rows": [],
+        "extracted_content": "",
+        "result": None,
+        "parse_settings": None,
+        "extraction_method": None,
+        "form_fields": {},
+    }
+    
+    # Recurring feeds reuse whatever parsed / extracted them last time
+    profile = find_source_profile(db, filename)
+    known_settings = profile.parse_settings if profile else None
+
+    if extension in ["csv", "tsv"]:
+        with stored_file_path(new_import) as path:
+            df = None
+            if known_settings:
+                df = _read_with_known_settings(open_csv_reader, path, known_settings, profile)
+            if df is None:
+                # Sniff encoding, delimiter, quoting and header offset once, then parse exactly once
+                known_settings = None
+                parsed["parse_settings"] = sniff_text_file(path, extension)
+                df = open_csv_reader(path, parsed["parse_settings"], nrows=UPLOAD_SAMPLE_ROWS)
+            else:
+                parsed["parse_settings"] = known_settings
+        print(f"Parse settings for {filename} ({'profile' if known_settings else 'sniffed'}): {parsed['parse_settings']}")
+        
+    elif extension in ["xls", "xlsx"]:
+        with stored_file_path(new_import) as path:
+            df = None
+            if known_settings:
+                df = _read_with_known_settings(read_excel_file, path, known_settings, profile)
+            if df is None:
+                parsed["parse_settings"] = detect_excel_layout(path)
+                df = read_excel_file(path, parsed["parse_settings"], nrows=UPLOAD_SAMPLE_ROWS)
+            else:
+                parsed["parse_settings"] = known_settings
+        
+    elif extension in FIXED_WIDTH_EXTENSIONS:
+        with stored_file_path(new_import) as path:
+            df = read_fixed_width(path, layout.fields, layout.header_lines, layout.encoding, nrows=UPLOAD_SAMPLE_ROWS)
+        # Layout fields carry their target column, so the mapping is already known
+        parsed["result"] = layout_mapping_result(layout.fields)
+        
+    elif extension in ["pdf", "docx"]:
+        document = await run_in_threadpool(
+            _extract_stored_document, new_import, extension, profile.extraction_method if profile else None
+        )
+        parsed["headers"] = document["headers"]
+        parsed["rows"] = document["sample_data"]
+        parsed["extracted_content"] = document["text_content"]
+        parsed["extraction_method"] = document.get("extraction_method", "unknown")
+        print(f"{extension.upper()} processed using method: {parsed['extraction_method']}")
+        
+        # If form fields were extracted, include them in response
+        parsed["form_fields"] = document.get("form_fields", {})
+        
+    else:
+        raise HTTPException(status_code=400, detail="Unsupported file type")
+
+    if extension in STRUCTURED_EXTENSIONS:
+        df = df.replace({np.nan: None})
+        headers = list(df.columns)
+        parsed["headers"] = headers
+        parsed["rows"] = df.to_dict(orient="records")
+
+        # Validation for structured data (CSV, TSV, XLSX, fixed-width)
+        if len(df) == 0:
+            raise HTTPException(status_code=400, detail="File is empty or has no valid data")
+        if len(headers) == 0:
+            raise HTTPException(status_code=400, detail="File has no headers")
+        if len(headers) > MAX_UPLOAD_HEADERS:
+            raise HTTPException(status_code=400, detail=f"File has too many headers (max {MAX_UPLOAD_HEADERS} allowed)")
+        if len(headers) != len(set(headers)):
+            raise HTTPException(status_code=400, detail="File has duplicate headers")
     
-    # Get file extension
-    extension = file.filename.split(".")[-1].lower()
+    if parsed["parse_settings"]:
+        # /process re-reads the stored file with exactly these settings
+        new_import.parse_settings = parsed["parse_settings"]
+        db.commit()
+
+    if extension not in FIXED_WIDTH_EXTENSIONS and parsed["headers"]:
+        record_source_profile(db, filename, parsed["headers"], parsed["parse_settings"], parsed["extraction_method"])
+    return parsed
+
+
+def _mapping_response(new_import: FileImport, parsed: Dict[str, Any], result: List[Dict[str, Any]]) -> Dict[str, Any]:
+    response_data = {
+        "file_import_id": new_import.import_id,
+        "filename": new_import.filename,
+        "headers": parsed["headers"],
+        "predefined_columns": PREDEFINED_COLUMNS,
+        "sample_data": parsed["rows"][:10],  # Limit sample data to first 10 rows
+        "mapping_result": result
+    }
+    
+    if parsed["parse_settings"]:
+        response_data["parse_settings"] = parsed["parse_settings"]
     
-    headers = []
-    sample_rows = []
-    extracted_content = ""
+    # Add extracted content and processing info for PDF/DOCX files
+    if parsed["extension"] in ["pdf", "docx"]:
+        response_data["extracted_content"] = parsed["extracted_content"][:2000]  # First 2000 characters
+        response_data["extraction_method"] = parsed["extraction_method"]
+        
+        # Include form fields if they were extracted
+        if parsed["form_fields"]:
+            response_data["form_fields"] = parsed["form_fields"]
+            response_data["total_form_fields"] = len(parsed["form_fields"])
+        
+    return response_data
+
+
+@router.post("/upload")
+async def upload_file(
+    file: UploadFile = File(...),
+    layout_id: Optional[str] = Form(None),
+    db: Session = Depends(get_db)
+):
+    layout = _resolve_layout(file.filename, layout_id, db)
+    new_import = await _store_upload(file, layout, db)
 
     try:
-        if extension == "csv":
-            df = pd.read_csv(BytesIO(file_contents), delimiter=",")
-            df = df.replace({np.nan: None})
-            headers = list(df.columns)
-            sample_rows = df.to_dict(orient="records")
-            
-        elif extension == "tsv":
-            df = pd.read_csv(BytesIO(file_contents), delimiter="\t")
-            df = df.replace({np.nan: None})
-            headers = list(df.columns)
-            sample_rows = df.to_dict(orient="records")
-            
-        elif extension in ["xls", "xlsx"]:
-            try:
-                df = pd.read_excel(BytesIO(file_contents), engine="openpyxl")
-            except:
-                df = pd.read_excel(BytesIO(file_contents), engine="xlrd")
-            
-            df = df.replace({np.nan: None})
-            headers = list(df.columns)
-            sample_rows = df.to_dict(orient="records")
-            
-        elif extension == "pdf":
-            pdf_data = extract_pdf_content(file_contents)
-            headers = pdf_data["headers"]
-            sample_rows = pdf_data["sample_data"]
-            extracted_content = pdf_data["text_content"]
-            extraction_method = pdf_data.get("extraction_method", "unknown")
-            
-            print(f"PDF processed using method: {extraction_method}")
-            
-            # If form fields were extracted, include them in response
-            form_fields = pdf_data.get("form_fields", {})
-            
-        elif extension == "docx":
-            docx_data = extract_docx_content(file_contents)
-            headers = docx_data["headers"]
-            sample_rows = docx_data["sample_data"]
-            extracted_content = docx_data["text_content"]
-            extraction_method = docx_data.get("extraction_method", "unknown")
-            
-            print(f"DOCX processed using method: {extraction_method}")
-            
-            # If form fields were extracted, include them in response
-            form_fields = docx_data.get("form_fields", {})
-                
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported file type")
-        
-        # Validation for structured data (CSV, TSV, XLSX)
-        if extension in ["csv", "tsv", "xlsx", "xls"]:
-            if len(pd.DataFrame(sample_rows)) == 0:
-                raise HTTPException(status_code=400, detail="File is empty or has no valid data")
-            if len(headers) == 0:
-                raise HTTPException(status_code=400, detail="File has no headers")
-            if len(headers) > 50:
-                raise HTTPException(status_code=400, detail="File has too many headers (max 50 allowed)")
-            if len(headers) != len(set(headers)):
-                raise HTTPException(status_code=400, detail="File has duplicate headers")
+        parsed = await _parse_upload(db, new_import, layout)
         
-        # Generate mapping using LLM service
-        result = generate_mapping_with_llm(headers, sample_rows)
+        # Generate mapping (cache first, LLM service for new layouts)
+        result = parsed["result"]
+        if result is None:
+            result = await resolve_mappings(db, parsed["headers"], parsed["rows"])
         print(f"Generated mapping for {file.filename}: {result}")
         
-        response_data = {
-            "file_import_id": new_import.import_id,
-            "filename": file.filename,
-            "headers": headers,
-            "predefined_columns": PREDEFINED_COLUMNS,
-            "sample_data": sample_rows[:10],  # Limit sample data to first 10 rows
-            "mapping_result": result
+        return _mapping_response(new_import, parsed, result)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to process file: {str(e)}")
+
+
+@router.post("/upload/stream")
+async def upload_file_stream(
+    file: UploadFile = File(...),
+    layout_id: Optional[str] = Form(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Server-Sent Events variant of /upload. Events are pushed as each stage completes:
+    stored, headers, cache / local / llm (partial mappings), then done with the full
+    /upload response, or error.
+    """
+    layout = _resolve_layout(file.filename, layout_id, db)
+    new_import = await _store_upload(file, layout, db)
+    import_id = new_import.import_id
+
+    async def events():
+        yield sse_event("stored", {"file_import_id": import_id, "filename": file.filename})
+        # The request's session is released once the response starts, so the stream uses its own
+        stream_db = SessionLocal()
+        try:
+            stream_import = stream_db.query(FileImport).filter(FileImport.import_id == import_id).first()
+            stream_layout = stream_db.merge(layout) if layout else None
+            parsed = await _parse_upload(stream_db, stream_import, stream_layout)
+            yield sse_event("headers", {
+                "headers": parsed["headers"],
+                "sample_data": parsed["rows"][:10],
+                "parse_settings": parsed["parse_settings"]
+            })
+
+            result = parsed["result"]
+            if result is None:
+                async for stage, mappings in iter_mapping_stages(stream_db, parsed["headers"], parsed["rows"]):
+                    if stage == "final":
+                        result = mappings
+                    else:
+                        yield sse_event(stage, {"mappings": mappings})
+            yield sse_event("done", _mapping_response(stream_import, parsed, result))
+        except HTTPException as e:
+            yield sse_event("error", {"status_code": e.status_code, "detail": e.detail})
+        except Exception as e:
+            yield sse_event("error", {"status_code": 500, "detail": f"Failed to process file: {str(e)}"})
+        finally:
+            stream_db.close()
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+def _template_mappings(mapping: List[Dict[str, Any]]) -> List[dict]:
+    """A template mapping in the shape /process receives from the review screen"""
+    return [
+        {
+            "header": m["header"],
+            "llm_suggestion": m.get("llm_suggestion"),
+            "final_mapping": None if m["matched_column"] == "Unmapped" else m["matched_column"],
+            "confidence_score": m.get("confidence_score"),
+            "user_edited_mapping": False,
         }
-        
-        # Add extracted content and processing info for PDF/DOCX files
-        if extension in ["pdf", "docx"]:
-            response_data["extracted_content"] = extracted_content[:2000]  # First 2000 characters
-            response_data["extraction_method"] = extraction_method
-            
-            # Include form fields if they were extracted
-            if 'form_fields' in locals() and form_fields:
-                response_data["form_fields"] = form_fields
-                response_data["total_form_fields"] = len(form_fields)
-            
-        return response_data
+        for m in mapping
+    ]
+
+
+@router.post("/upload/straight-through")
+async def upload_straight_through(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    layout_id: Optional[str] = Form(None),
+    run_in_background: bool = Form(False),
+    db: Session = Depends(get_db)
+):
+    """
+    Upload, map and insert in one call when the file matches a confirmed mapping template
+    (or a fixed-width layout). Otherwise the normal upload response is returned with
+    `straight_through: false`, so the file can go through review without being re-sent.
+    """
+    layout = _resolve_layout(file.filename, layout_id, db)
+    new_import = await _store_upload(file, layout, db)
+
+    try:
+        parsed = await _parse_upload(db, new_import, layout)
+
+        template, confidence = None, 0.0
+        if parsed["result"] is not None:
+            template, confidence = parsed["result"], 1.0
+        elif parsed["extension"] in STRUCTURED_EXTENSIONS:
+            template, confidence = get_mapping_template(db, parsed["headers"]) or (None, 0.0)
+
+        if template is None or confidence < STRAIGHT_THROUGH_MIN_CONFIDENCE:
+            print(f"No confident template for {file.filename} (confidence {confidence}), falling back to review")
+            result = parsed["result"]
+            if result is None:
+                result = await resolve_mappings(db, parsed["headers"], parsed["rows"])
+            return {**_mapping_response(new_import, parsed, result), "straight_through": False}
+
+        mappings = _template_mappings(template)
+        if run_in_background:
+            record_mappings(db, new_import, mappings, confirmed=False)
+            job = create_job(new_import.import_id)
+            transition(new_import, QUEUED)
+            db.commit()
+            # No rows passed: the job reads the stored file back as text, like /process
+            background_tasks.add_task(run_ingest_job, job, mappings)
+            return JSONResponse(status_code=202, content={
+                "message": "Data processing started",
+                "import_id": str(new_import.import_id),
+                "job_id": job.job_id,
+                "straight_through": True,
+                "template_confidence": confidence
+            })
+
+        def ingest():
+            record_mappings(db, new_import, mappings, confirmed=False)
+            # Not parsed["rows"]: those carry pandas' inferred types (an NPI as int, IDs as
+            # "123.0" next to NaN); the stored file is read back as text, like /process does
+            return ingest_rows(db, new_import, mappings, chain.from_iterable(iter_stored_rows(db, new_import)))
+
+        stats = await run_in_threadpool(ingest)
+        return {**stats, "straight_through": True, "template_confidence": confidence}
 
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to process file: {str(e)}")
\ No newline at end of file
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to process file: {str(e)}")
@@ -0,0 +1,59 @@
+from typing import List
+from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy.orm import Session
+from app.core.database import get_db
+from app.models.fixed_width_layout import FixedWidthLayout
+from app.schemas.fixed_width_layout import FixedWidthLayoutCreate, FixedWidthLayoutRead
+from app.services.fixed_width_service import validate_layout_fields
+from app.services.llm_service import PREDEFINED_COLUMNS
+
+router = APIRouter()
+
+
+def serialize_layout(layout: FixedWidthLayout):
+    return {
+        "layout_id": layout.layout_id,
+        "name": layout.name,
+        "source": layout.source,
+        "encoding": layout.encoding,
+        "header_lines": layout.header_lines,
+        "fields": layout.fields,
+        "created_at": layout.created_at.isoformat() if layout.created_at else None
+    }
+
+
+@router.post("/layouts", response_model=FixedWidthLayoutRead)
+def create_layout(payload: FixedWidthLayoutCreate, db: Session = Depends(get_db)):
+    fields = [field.model_dump() for field in payload.fields]
+    problems = validate_layout_fields(fields, PREDEFINED_COLUMNS)
+    if problems:
+        raise HTTPException(status_code=400, detail="; ".join(problems))
+
+    if db.query(FixedWidthLayout).filter(FixedWidthLayout.name == payload.name).first():
+        raise HTTPException(status_code=409, detail=f"Layout '{payload.name}' already exists")
+
+    layout = FixedWidthLayout(
+        name=payload.name,
+        source=payload.source,
+        encoding=payload.encoding,
+        header_lines=payload.header_lines,
+        fields=fields
+    )
+    db.add(layout)
+    db.commit()
+    db.refresh(layout)
+    return serialize_layout(layout)
+
+
+@router.get("/layouts", response_model=List[FixedWidthLayoutRead])
+def list_layouts(db: Session = Depends(get_db)):
+    layouts = db.query(FixedWidthLayout).order_by(FixedWidthLayout.name).all()
+    return [serialize_layout(layout) for layout in layouts]
+
+
+@router.get("/layouts/{layout_id}", response_model=FixedWidthLayoutRead)
+def get_layout(layout_id: str, db: Session = Depends(get_db)):
+    layout = db.query(FixedWidthLayout).filter(FixedWidthLayout.layout_id == layout_id).first()
+    if not layout:
+        raise HTTPException(status_code=404, detail="Layout not found")
+    return serialize_layout(layout)
@@ -0,0 +1,226 @@
+"""
+Header-mapping quality and latency benchmark.
+
+Runs every header set of the golden corpus through the full mapping pipeline (cache, history,
+local matcher, LLM provider) and reports precision, recall, p50/p99 latency, LLM calls avoided
+and runs where the provider did not answer and the local fallback did, per provider as JSON.
+
+    python -m app.benchmarks.mapping_benchmark --providers fake,replay --repeats 5 --output bench.json
+
+Runs without a database; the history index is empty and the cache is cleared before each cold run.
+`replay` answers strictly from the fixtures in app/benchmarks/llm_fixtures, so it runs in CI with no
+network; a prompt without a fixture is an error. `--record gemini` (GEMINI_API_KEY must be set) records
+the missing fixtures before replaying them:
+
+    python -m app.benchmarks.mapping_benchmark --providers replay --record gemini
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from app.core.config import MAPPING_CHUNK_SIZE
+from app.services import mapping_cache
+from app.services.llm_client import llm_client
+from app.services.llm_providers import MappingProvider, RecordingProvider, ReplayProvider, create_provider
+from app.services.mapping_service import iter_mapping_stages
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "golden_headers.json")
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "llm_fixtures")
+
+
+class CountingProvider(MappingProvider):
+    """Counts the prompts that actually reach the wrapped provider"""
+
+    def __init__(self, inner: MappingProvider):
+        self.inner = inner
+        self.name = inner.name
+        self.calls = 0
+
+    async def generate(self, prompt: str, headers: List) -> str:
+        self.calls += 1
+        return await self.inner.generate(prompt, headers)
+
+
+def load_corpus(path: str = CORPUS_PATH) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["cases"]
+
+
+def _case_inputs(case: Dict[str, Any]):
+    headers = [c["header"] for c in case["columns"]]
+    rows = [
+        {c["header"]: c["values"][i] if i < len(c["values"]) else None for c in case["columns"]}
+        for i in range(max(len(c["values"]) for c in case["columns"]))
+    ]
+    expected = {c["header"]: c["expected"] for c in case["columns"]}
+    return headers, rows, expected
+
+
+def _is_mapped(column) -> bool:
+    return bool(column) and column.lower() != "unmapped"
+
+
+def score_case(expected: Dict[str, str], result: List[Dict[str, Any]]) -> Dict[str, int]:
+    predicted = {str(m["header"]): m.get("matched_column") for m in result}
+    counts = {"true_positive": 0, "predicted": 0, "relevant": 0}
+    for header, target in expected.items():
+        guess = predicted.get(header)
+        counts["relevant"] += _is_mapped(target)
+        counts["predicted"] += _is_mapped(guess)
+        counts["true_positive"] += _is_mapped(guess) and guess == target
+    return counts
+
+
+async def _map_case(headers: List, rows: List[dict]):
+    """Returns (final mapping, stages seen, seconds); LLM chunks answered by the local fallback show as 'fallback'"""
+    started = time.perf_counter()
+    result, stages = [], []
+    async for stage, mappings in iter_mapping_stages(None, headers, rows):
+        if stage == "llm" and any(m.get("mapping_source") == "local_fallback" for m in mappings):
+            stage = "fallback"
+        stages.append(stage)
+        if stage == "final":
+            result = mappings
+    return result, stages, time.perf_counter() - started
+
+
+def _ratio(numerator: float, denominator: float) -> float:
+    return round(numerator / denominator, 4) if denominator else 0.0
+
+
+def benchmark_provider_for(name: str, fixtures_dir: str = FIXTURES_DIR, record: Optional[str] = None) -> MappingProvider:
+    """`replay` never leaves the fixtures unless `record` names the provider that fills in missing ones"""
+    if name == "replay":
+        fallback = RecordingProvider(create_provider(record), fixtures_dir) if record else None
+        return ReplayProvider(fixtures_dir, fallback=fallback)
+    return create_provider(name)
+
+
+async def benchmark_provider(
+    provider_name: str,
+    cases: List[Dict[str, Any]],
+    repeats: int,
+    fixtures_dir: str = FIXTURES_DIR,
+    record: Optional[str] = None
+) -> Dict[str, Any]:
+    provider = CountingProvider(benchmark_provider_for(provider_name, fixtures_dir, record))
+    llm_client.set_provider(provider)
+
+    latencies, warm_latencies, per_case = [], [], []
+    totals = {"true_positive": 0, "predicted": 0, "relevant": 0}
+    baseline_calls = errors = fallback_runs = 0
+
+    for case in cases:
+        headers, rows, expected = _case_inputs(case)
+        case_latencies, case_fallbacks = [], 0
+        case_totals = {"true_positive": 0, "predicted": 0, "relevant": 0}
+        for _ in range(repeats):
+            mapping_cache._memory_tier.clear()
+            # Without cache, history or local matching every header would go to the LLM
+            baseline_calls += math.ceil(len(headers) / MAPPING_CHUNK_SIZE)
+            try:
+                result, stages, seconds = await _map_case(headers, rows)
+            except Exception as e:
+                errors += 1
+                print(f"{provider_name}/{case['name']} failed: {e!r}", file=sys.stderr)
+                continue
+            if "fallback" in stages:
+                # The provider did not answer (missing fixture, no network): not its precision/recall
+                errors += 1
+                case_fallbacks += 1
+                print(f"{provider_name}/{case['name']} fell back to the local matcher", file=sys.stderr)
+                continue
+            case_latencies.append(seconds)
+            counts = score_case(expected, result)
+            for key in totals:
+                totals[key] += counts[key]
+                case_totals[key] += counts[key]
+
+        # Same header set again: answered from the mapping cache
+        try:
+            _, _, seconds = await _map_case(headers, rows)
+            warm_latencies.append(seconds)
+        except Exception:
+            pass
+
+        latencies.extend(case_latencies)
+        fallback_runs += case_fallbacks
+        per_case.append({
+            "case": case["name"],
+            "headers": len(headers),
+            "fallback_runs": case_fallbacks,
+            "precision": _ratio(case_totals["true_positive"], case_totals["predicted"]),
+            "recall": _ratio(case_totals["true_positive"], case_totals["relevant"]),
+            "latency_ms_p50": round(float(np.percentile(case_latencies, 50)) * 1000, 3) if case_latencies else None,
+        })
+
+    def percentile_ms(values, q):
+        return round(float(np.percentile(values, q)) * 1000, 3) if values else None
+
+    return {
+        "precision": _ratio(totals["true_positive"], totals["predicted"]),
+        "recall": _ratio(totals["true_positive"], totals["relevant"]),
+        "latency_ms": {"p50": percentile_ms(latencies, 50), "p99": percentile_ms(latencies, 99), "runs": len(latencies)},
+        "warm_latency_ms": {"p50": percentile_ms(warm_latencies, 50), "p99": percentile_ms(warm_latencies, 99)},
+        "llm_calls": provider.calls,
+        "baseline_llm_calls": baseline_calls,
+        "calls_avoided": _ratio(baseline_calls - provider.calls, baseline_calls),
+        "errors": errors,
+        "fallback_runs": fallback_runs,  # included in errors
+        "cases": per_case,
+    }
+
+
+async def run_benchmark(
+    providers: List[str],
+    repeats: int = 3,
+    corpus_path: str = CORPUS_PATH,
+    fixtures_dir: str = FIXTURES_DIR,
+    record: Optional[str] = None
+) -> Dict[str, Any]:
+    cases = load_corpus(corpus_path)
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "schema_version": mapping_cache.SCHEMA_VERSION,
+        "corpus": {"cases": len(cases), "headers": sum(len(c["columns"]) for c in cases)},
+        "repeats": repeats,
+        "providers": {},
+    }
+    for name in providers:
+        report["providers"][name] = await benchmark_provider(name, cases, repeats, fixtures_dir, record)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Header-mapping quality and latency benchmark")
+    parser.add_argument("--providers", default="fake", help="comma-separated: fake, replay, record, gemini")
+    parser.add_argument("--repeats", type=int, default=3, help="cold runs per header set")
+    parser.add_argument("--corpus", default=CORPUS_PATH)
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="fixtures directory for replay")
+    parser.add_argument("--record", choices=["gemini", "fake"], help="replay records missing fixtures from this provider")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    # Pipeline logging goes to stderr so stdout stays machine-readable
+    with contextlib.redirect_stdout(sys.stderr):
+        report = asyncio.run(run_benchmark(args.providers.split(","), args.repeats, args.corpus, args.fixtures, args.record))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,3 +6,61 @@ class StorageType(str, Enum):
     S3 = "s3"
 
 STORAGE_TYPE = os.getenv("STORAGE_TYPE", StorageType.LOCAL)  # switch to 's3' in prod
+
+# Per-file limits for PDF/DOCX extraction, which runs in an isolated worker process
+# (the memory limit is the worker's whole address space, interpreter and libraries included)
+EXTRACTION_CPU_SECONDS = int(os.getenv("EXTRACTION_CPU_SECONDS", 60))
+EXTRACTION_WALL_SECONDS = int(os.getenv("EXTRACTION_WALL_SECONDS", 90))
+EXTRACTION_MEMORY_MB = int(os.getenv("EXTRACTION_MEMORY_MB", 1024))
+
+# Header-fingerprint mapping cache: in-process LRU entries and persisted rows kept
+MAPPING_CACHE_SIZE = int(os.getenv("MAPPING_CACHE_SIZE", 256))
+MAPPING_CACHE_DB_MAX = int(os.getenv("MAPPING_CACHE_DB_MAX", 5000))
+
+# Local header matcher: headers scoring at least this are mapped without the LLM
+LOCAL_MATCH_THRESHOLD = float(os.getenv("LOCAL_MATCH_THRESHOLD", 0.85))
+
+# Mapping history index built from ProcessingLog: match threshold and how often it re-reads new logs
+HISTORY_MATCH_THRESHOLD = float(os.getenv("HISTORY_MATCH_THRESHOLD", 0.85))
+HISTORY_REFRESH_SECONDS = int(os.getenv("HISTORY_REFRESH_SECONDS", 30))
+
+# Gemini mapping calls: model, per-call deadline, retries, concurrency cap and circuit breaker
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", 30))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 2))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", 0.5))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 4))
+LLM_CIRCUIT_FAILURES = int(os.getenv("LLM_CIRCUIT_FAILURES", 5))
+LLM_CIRCUIT_RESET_SECONDS = float(os.getenv("LLM_CIRCUIT_RESET_SECONDS", 60))
+
+# Token budget for one header-mapping prompt; example values are trimmed to fit
+MAPPING_PROMPT_TOKEN_BUDGET = int(os.getenv("MAPPING_PROMPT_TOKEN_BUDGET", 3000))
+
+# Widest header set accepted on upload, and headers per LLM prompt when mapping wide files
+MAX_UPLOAD_HEADERS = int(os.getenv("MAX_UPLOAD_HEADERS", 1000))
+MAPPING_CHUNK_SIZE = int(os.getenv("MAPPING_CHUNK_SIZE", 40))
+
+# Uploads are copied to storage in chunks of this size; mapping only parses the first rows
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", 1024 * 1024))
+UPLOAD_SAMPLE_ROWS = int(os.getenv("UPLOAD_SAMPLE_ROWS", 100))
+
+# Straight-through uploads: a confirmed template must map every header at least this confidently
+STRAIGHT_THROUGH_MIN_CONFIDENCE = float(os.getenv("STRAIGHT_THROUGH_MIN_CONFIDENCE", 0.9))
+
+# Who answers mapping prompts: gemini, fake (offline stand-in), record (gemini, saving fixtures) or replay
+MAPPING_PROVIDER = os.getenv("MAPPING_PROVIDER", "gemini")
+MAPPING_FIXTURES_DIR = os.getenv("MAPPING_FIXTURES_DIR", "llm_fixtures")
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", 50))
+FAKE_LLM_JITTER_MS = float(os.getenv("FAKE_LLM_JITTER_MS", 20))
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", 0.0))
+FAKE_LLM_SEED = int(os.getenv("FAKE_LLM_SEED", 0))
+
+# Rows read from a stored upload per chunk when /process ingests server-side
+INGEST_READ_ROWS = int(os.getenv("INGEST_READ_ROWS", 5000))
+
+# Rows staged per bulk write during ingest, and whether PostgreSQL COPY is used for it
+INGEST_BATCH_ROWS = int(os.getenv("INGEST_BATCH_ROWS", 1000))
+INGEST_USE_COPY = os.getenv("INGEST_USE_COPY", "true").lower() == "true"
+
+# Row batches of a streamed NDJSON body decoded ahead of the insert (bounds memory per request)
+NDJSON_READ_AHEAD_BATCHES = int(os.getenv("NDJSON_READ_AHEAD_BATCHES", 2))
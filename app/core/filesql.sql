@@ -1,6 +1,17 @@
 -- Enable UUID support
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
+-- 0. Fixed-width layout specifications (reused across imports from the same source)
+CREATE TABLE fixed_width_layout (
+    layout_id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    name VARCHAR(255) NOT NULL UNIQUE,
+    source VARCHAR(255),
+    encoding VARCHAR(32) NOT NULL DEFAULT 'latin-1',
+    header_lines INT NOT NULL DEFAULT 0,
+    fields JSONB NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
 -- 1. File Import Tracking
 CREATE TABLE file_import(
     import_id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -10,11 +21,14 @@ CREATE TABLE file_import(
     local_path VARCHAR(512),
     s3_bucket VARCHAR(255),
     s3_key VARCHAR(512),
-    processing_status TEXT CHECK (processing_status IN ('Success', 'Failed','Uploaded','Mapping')) NOT NULL,
+    -- Uploaded -> Mapping -> [Queued] -> Processing -> Success | Failed (see app/services/import_status.py)
+    processing_status TEXT CHECK (processing_status IN ('Uploaded', 'Mapping', 'Queued', 'Processing', 'Success', 'Failed')) NOT NULL,
     upload_time TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     records_extracted_from_file INT NOT NULL DEFAULT 0,
     records_inserted_count INT NOT NULL DEFAULT 0,
     records_failed_to_insert_count INT DEFAULT 0,
+    layout_id UUID REFERENCES fixed_width_layout(layout_id) ON DELETE SET NULL,
+    parse_settings JSONB,
     CONSTRAINT valid_storage_path CHECK (
         (storage_type = 'local' AND local_path IS NOT NULL) OR
         (storage_type = 's3' AND s3_bucket IS NOT NULL AND s3_key IS NOT NULL)
@@ -92,5 +106,43 @@ CREATE TABLE processing_log (
     llm_suggestion TEXT,
     final_mapping TEXT,
     confidence_score REAL,
-    user_edited_mapping BOOLEAN DEFAULT FALSE
+    user_edited_mapping BOOLEAN DEFAULT FALSE,
+    user_confirmed BOOLEAN DEFAULT TRUE  -- FALSE when applied straight-through, without review
+);
+
+
+-- 9. Source profiles (parse settings / extraction tier that worked for a recurring feed)
+CREATE TABLE source_profile (
+    profile_id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    filename_pattern VARCHAR(255) NOT NULL,
+    file_extension VARCHAR(10) NOT NULL,
+    header_fingerprint VARCHAR(64),
+    parse_settings JSONB,
+    date_formats JSONB,
+    extraction_method VARCHAR(50),
+    success_count INT DEFAULT 0,
+    last_used_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
+CREATE INDEX ix_source_profile_filename_pattern ON source_profile (filename_pattern);
+CREATE INDEX ix_source_profile_header_fingerprint ON source_profile (header_fingerprint);
+
+
+-- 10. Header-fingerprint mapping cache
+CREATE TABLE mapping_cache (
+    fingerprint VARCHAR(64) NOT NULL,
+    schema_version VARCHAR(32) NOT NULL,
+    headers JSONB NOT NULL,
+    mapping JSONB NOT NULL,
+    confirmed BOOLEAN DEFAULT FALSE,
+    hit_count INT DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    last_used_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (fingerprint, schema_version)
+);
+
+
+-- 11. Natural-key indexes: ingest upserts patients, providers and policies on these
+-- (existing databases: app/core/migrations/002_natural_key_indexes.sql merges duplicates first)
+CREATE UNIQUE INDEX ix_patient_member_id ON patient (member_id);
+CREATE UNIQUE INDEX ix_provider_npi_number ON provider (npi_number);
+CREATE UNIQUE INDEX ix_policy_policy_number ON policy (policy_number);
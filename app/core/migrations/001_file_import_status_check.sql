@@ -0,0 +1,5 @@
+-- Existing databases: allow the Queued and Processing statuses (see app/services/import_status.py).
+-- filesql.sql already has the new CHECK for fresh databases. Safe to run more than once.
+ALTER TABLE file_import DROP CONSTRAINT IF EXISTS file_import_processing_status_check;
+ALTER TABLE file_import ADD CONSTRAINT file_import_processing_status_check
+    CHECK (processing_status IN ('Uploaded', 'Mapping', 'Queued', 'Processing', 'Success', 'Failed'));
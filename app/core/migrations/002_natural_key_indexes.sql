@@ -0,0 +1,38 @@
+-- Existing databases: the unique indexes ingest upserts patients, providers and policies on
+-- (ON CONFLICT needs them). Earlier imports inserted one row per file row, so duplicates are
+-- merged first: every key keeps one row, references to the others are repointed to it and the
+-- others are deleted. Safe to run more than once.
+BEGIN;
+
+-- Patients, by member_id
+CREATE TEMP TABLE patient_survivor ON COMMIT DROP AS
+SELECT patient_id, FIRST_VALUE(patient_id) OVER (PARTITION BY member_id ORDER BY patient_id) AS survivor_id
+FROM patient WHERE member_id IS NOT NULL;
+DELETE FROM patient_survivor WHERE patient_id = survivor_id;
+
+UPDATE claim c SET patient_id = s.survivor_id FROM patient_survivor s WHERE c.patient_id = s.patient_id;
+DELETE FROM patient p USING patient_survivor s WHERE p.patient_id = s.patient_id;
+CREATE UNIQUE INDEX IF NOT EXISTS ix_patient_member_id ON patient (member_id);
+
+-- Providers, by npi_number (policies reference providers too)
+CREATE TEMP TABLE provider_survivor ON COMMIT DROP AS
+SELECT provider_id, FIRST_VALUE(provider_id) OVER (PARTITION BY npi_number ORDER BY provider_id) AS survivor_id
+FROM provider WHERE npi_number IS NOT NULL;
+DELETE FROM provider_survivor WHERE provider_id = survivor_id;
+
+UPDATE claim c SET provider_id = s.survivor_id FROM provider_survivor s WHERE c.provider_id = s.provider_id;
+UPDATE policy p SET provider_id = s.survivor_id FROM provider_survivor s WHERE p.provider_id = s.provider_id;
+DELETE FROM provider p USING provider_survivor s WHERE p.provider_id = s.provider_id;
+CREATE UNIQUE INDEX IF NOT EXISTS ix_provider_npi_number ON provider (npi_number);
+
+-- Policies, by policy_number
+CREATE TEMP TABLE policy_survivor ON COMMIT DROP AS
+SELECT policy_id, FIRST_VALUE(policy_id) OVER (PARTITION BY policy_number ORDER BY policy_id) AS survivor_id
+FROM policy WHERE policy_number IS NOT NULL;
+DELETE FROM policy_survivor WHERE policy_id = survivor_id;
+
+UPDATE claim c SET policy_id = s.survivor_id FROM policy_survivor s WHERE c.policy_id = s.policy_id;
+DELETE FROM policy p USING policy_survivor s WHERE p.policy_id = s.policy_id;
+CREATE UNIQUE INDEX IF NOT EXISTS ix_policy_policy_number ON policy (policy_number);
+
+COMMIT;
@@ -0,0 +1,13 @@
+-- Existing databases: fixed-width uploads reference their layout (see filesql.sql for fresh ones).
+-- Safe to run more than once.
+CREATE TABLE IF NOT EXISTS fixed_width_layout (
+    layout_id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    name VARCHAR(255) NOT NULL UNIQUE,
+    source VARCHAR(255),
+    encoding VARCHAR(32) NOT NULL DEFAULT 'latin-1',
+    header_lines INT NOT NULL DEFAULT 0,
+    fields JSONB NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+ALTER TABLE file_import ADD COLUMN IF NOT EXISTS layout_id UUID REFERENCES fixed_width_layout(layout_id) ON DELETE SET NULL;
@@ -0,0 +1,3 @@
+-- Existing databases: the parse settings an upload was read with, reused by /process
+-- (see filesql.sql for fresh ones). Safe to run more than once.
+ALTER TABLE file_import ADD COLUMN IF NOT EXISTS parse_settings JSONB;
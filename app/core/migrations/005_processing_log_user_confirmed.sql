@@ -0,0 +1,4 @@
+-- Existing databases: whether a user reviewed the logged mapping; the history index learns only
+-- from confirmed rows (see filesql.sql for fresh ones). Safe to run more than once.
+-- Older rows cannot be told apart and count as confirmed, as they did before.
+ALTER TABLE processing_log ADD COLUMN IF NOT EXISTS user_confirmed BOOLEAN DEFAULT TRUE;
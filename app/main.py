@@ -6,6 +6,7 @@ from app.api.routes import file_report
 from app.api.routes import file_import
 from app.api.routes import file_list
 from app.api.routes import analytic_report
+from app.api.routes import fixed_width_layout
 
 app = FastAPI()
 
@@ -28,6 +29,7 @@ app.include_router(db_data_insert.router, prefix="/resource", tags=["Data Insert
 app.include_router(file_report.router, prefix="/resource", tags=["File Report Generation"])
 app.include_router(file_list.router, prefix="/resource", tags=["File List Generation"])
 app.include_router(analytic_report.router, prefix="/resource", tags=["Analytics Report Generation"])
+app.include_router(fixed_width_layout.router, prefix="/resource", tags=["Fixed-Width Layouts"])
 
 
 @app.get("/")
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, Integer, DateTime, Text, CheckConstraint
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Integer, DateTime, Text, CheckConstraint, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.sql import func
 import uuid
 from app.core.database import Base
@@ -19,9 +19,16 @@ class FileImport(Base):
     records_extracted_from_file = Column(Integer, default=0)
     records_inserted_count = Column(Integer, default=0)
     records_failed_to_insert_count = Column(Integer, default=0)
+    layout_id = Column(UUID(as_uuid=True), ForeignKey("fixed_width_layout.layout_id", ondelete="SET NULL"))
+    parse_settings = Column(JSONB)  # how the stored file was parsed at upload, reused for server-side ingest
 
     __table_args__ = (
         CheckConstraint("storage_type IN ('local', 's3')"),
+        # Allowed transitions are enforced in app/services/import_status.py
+        CheckConstraint(
+            "processing_status IN ('Uploaded', 'Mapping', 'Queued', 'Processing', 'Success', 'Failed')",
+            name="valid_processing_status"
+        ),
         CheckConstraint(
             "(storage_type = 'local' AND local_path IS NOT NULL) OR "
             "(storage_type = 's3' AND s3_bucket IS NOT NULL AND s3_key IS NOT NULL)",
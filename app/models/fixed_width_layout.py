@@ -0,0 +1,17 @@
+from sqlalchemy import Column, String, Integer, DateTime
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.sql import func
+import uuid
+from app.core.database import Base
+
+class FixedWidthLayout(Base):
+    __tablename__ = "fixed_width_layout"
+
+    layout_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    name = Column(String(255), nullable=False, unique=True)
+    source = Column(String(255))
+    encoding = Column(String(32), nullable=False, default="latin-1")
+    header_lines = Column(Integer, nullable=False, default=0)
+    # List of {"name", "offset", "length", "type", "format", "scale", "target_column"}
+    fields = Column(JSONB, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, String, Integer, Boolean, DateTime
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class MappingCacheEntry(Base):
+    __tablename__ = "mapping_cache"
+
+    fingerprint = Column(String(64), primary_key=True)
+    schema_version = Column(String(32), primary_key=True)
+    headers = Column(JSONB, nullable=False)
+    # Normalized header -> {"matched_column", "llm_suggestion", "confidence_score"}
+    mapping = Column(JSONB, nullable=False)
+    # True once a user has confirmed the mapping through /process
+    confirmed = Column(Boolean, default=False)
+    hit_count = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now())
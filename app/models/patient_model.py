@@ -9,7 +9,7 @@ class Patient(Base):
     __tablename__ = "patient"
 
     patient_id = Column(PG_UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    member_id = Column(String)
+    member_id = Column(String, unique=True, index=True)  # natural key, upserted on ingest
     first_name = Column(String)
     last_name = Column(String)
     dob = Column(Date)
@@ -9,7 +9,7 @@ class Policy(Base):
     __tablename__ = "policy"
 
     policy_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    policy_number = Column(String)
+    policy_number = Column(String, unique=True, index=True)  # natural key, upserted on ingest
     plan_name = Column(String)
     group_number = Column(String)
     policy_start_date = Column(Date)
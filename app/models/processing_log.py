@@ -14,3 +14,5 @@ class ProcessingLog(Base):
     final_mapping = Column(String)
     confidence_score = Column(Float)
     user_edited_mapping = Column(Boolean, default=False)
+    # False for mappings applied without review (straight-through templates); only confirmed ones are learned from
+    user_confirmed = Column(Boolean, default=True)
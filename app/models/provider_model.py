@@ -9,5 +9,5 @@ class Provider(Base):
     __tablename__ = "provider"
 
     provider_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    npi_number = Column(String)
+    npi_number = Column(String, unique=True, index=True)  # natural key, upserted on ingest
     provider_name = Column(String)
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, String, Integer, DateTime
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.sql import func
+import uuid
+from app.core.database import Base
+
+class SourceProfile(Base):
+    __tablename__ = "source_profile"
+
+    profile_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    filename_pattern = Column(String(255), nullable=False, index=True)
+    file_extension = Column(String(10), nullable=False)
+    header_fingerprint = Column(String(64), index=True)
+    # Settings that parsed this source successfully (encoding/delimiter/quotechar/header_row or sheet_name/header_row)
+    parse_settings = Column(JSONB)
+    # Column -> strptime format that parsed the column's dates
+    date_formats = Column(JSONB)
+    # Tier of the PDF/DOCX extraction cascade that produced the data
+    extraction_method = Column(String(50))
+    success_count = Column(Integer, default=0)
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,24 @@
+from datetime import datetime
+from typing import Optional, List, Literal
+from pydantic import BaseModel, Field
+from uuid import UUID as PyUUID
+
+class FixedWidthField(BaseModel):
+    name: str
+    offset: int = Field(ge=0)
+    length: int = Field(gt=0)
+    type: Literal["str", "int", "decimal", "date"] = "str"
+    format: Optional[str] = None  # strptime format for date fields
+    scale: Optional[int] = None  # implied decimal places for decimal fields
+    target_column: Optional[str] = None
+
+class FixedWidthLayoutCreate(BaseModel):
+    name: str
+    source: Optional[str] = None
+    encoding: str = "latin-1"
+    header_lines: int = Field(default=0, ge=0)
+    fields: List[FixedWidthField]
+
+class FixedWidthLayoutRead(FixedWidthLayoutCreate):
+    layout_id: PyUUID
+    created_at: Optional[datetime]
@@ -0,0 +1,209 @@
+import csv
+import io
+from typing import Dict, List, Any, Tuple
+
+from sqlalchemy import insert, func, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.core.config import INGEST_USE_COPY
+from app.models.claim_model import Claim
+from app.models.claim_diagnose_model import ClaimDiagnose
+from app.models.patient_model import Patient
+from app.models.provider_model import Provider
+from app.models.policy_model import Policy
+
+# Foreign-key order: every table only references tables written before it
+ENTITY_ORDER = [Patient, Provider, Policy, Claim, ClaimDiagnose]
+
+# Natural keys with a unique index: rows sharing one are the same real-world entity
+NATURAL_KEYS = {
+    "patient": "member_id",
+    "provider": "npi_number",
+    "policy": "policy_number",
+}
+
+# Dialects whose insert() supports ON CONFLICT ... RETURNING
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+# COPY null marker; cleaned values are never this literal text
+_COPY_NULL = "\\N"
+
+# Engines whose natural-key indexes were found, so the catalog is read once per process
+_indexed_engines = set()
+
+
+class MissingNaturalKeyIndex(RuntimeError):
+    """The database predates the natural-key unique indexes the upserts rely on"""
+
+
+def require_natural_key_indexes(bind):
+    """Raise MissingNaturalKeyIndex unless every NATURAL_KEYS column has a unique index"""
+    engine = bind.engine
+    if engine in _indexed_engines:
+        return
+    inspector = inspect(bind)
+    for table, key_column in NATURAL_KEYS.items():
+        unique = [i["column_names"] for i in inspector.get_indexes(table) if i.get("unique")]
+        unique += [c["column_names"] for c in inspector.get_unique_constraints(table)]
+        if [key_column] not in unique:
+            raise MissingNaturalKeyIndex(
+                f"No unique index on {table}.{key_column}; apply app/core/migrations/002_natural_key_indexes.sql"
+            )
+    _indexed_engines.add(engine)
+
+
+class BulkWriter:
+    """
+    Accumulates rows per entity table and writes each table with one statement per flush:
+    PostgreSQL COPY when available, otherwise a multi-row INSERT (executemany).
+    Primary keys are generated by the caller, so nothing needs to be read back.
+
+    Patients, providers and policies with a natural key are deduplicated instead: repeats of a
+    key already written during this import resolve through an in-memory identity map, and new
+    keys are upserted with ON CONFLICT so rows from earlier imports are reused. Foreign keys
+    of later tables are rewritten to the surviving IDs.
+    """
+
+    def __init__(self, db: Session, use_copy: bool = INGEST_USE_COPY):
+        self.db = db
+        dialect = db.get_bind().dialect.name
+        self.use_copy = use_copy and dialect == "postgresql"
+        self._upsert_insert = _UPSERT_INSERTS.get(dialect)
+        if self._upsert_insert is not None:
+            # Otherwise every flush fails with "no unique or exclusion constraint matching the ON CONFLICT"
+            require_natural_key_indexes(db.get_bind())
+        self._pending: Dict[str, List[Dict[str, Any]]] = {model.__tablename__: [] for model in ENTITY_ORDER}
+        self._identity: Dict[str, Dict[Any, Any]] = {table: {} for table in NATURAL_KEYS}  # table -> key -> id
+        self._resolved: Dict[str, Dict[Any, Any]] = {table: {} for table in NATURAL_KEYS}  # this flush, until accepted
+        self._replaced: Dict[Any, Any] = {}  # staged id -> surviving id, for this flush
+
+    def add(self, model, values: Dict[str, Any]):
+        # A copy: flush() rewrites foreign keys and fills gaps, and a failed flush may be retried
+        # with the caller's original rows (see write_with_bisection)
+        self._pending[model.__tablename__].append(dict(values))
+
+    def discard(self):
+        for rows in self._pending.values():
+            rows.clear()
+        for keys in self._resolved.values():
+            keys.clear()
+        self._replaced.clear()
+
+    def accept(self):
+        """Remember the natural keys of the last flush; call once its transaction (savepoint) succeeded"""
+        for table, keys in self._resolved.items():
+            self._identity[table].update(keys)
+        self.discard()
+
+    def flush(self) -> Dict[str, int]:
+        """
+        Write everything pending in FK order; returns rows created per table (rows that resolved
+        to an existing natural key are not counted). Pending rows are dropped either way;
+        natural keys written are kept only once accept() is called.
+        """
+        written = {}
+        try:
+            for model in ENTITY_ORDER:
+                table = model.__table__
+                rows = self._pending[model.__tablename__]
+                self._rewrite_references(table, rows)
+                inserted = 0
+                if model.__tablename__ in NATURAL_KEYS and self._upsert_insert is not None:
+                    rows, inserted = self._dedupe(table, rows)
+                if rows:
+                    self._write(table, rows)
+                written[model.__tablename__] = len(rows) + inserted
+        finally:
+            for rows in self._pending.values():
+                rows.clear()
+        return written
+
+    def _rewrite_references(self, table, rows: List[Dict[str, Any]]):
+        if not self._replaced:
+            return
+        for fk in table.foreign_keys:
+            column = fk.parent.name
+            for row in rows:
+                if row.get(column) in self._replaced:
+                    row[column] = self._replaced[row[column]]
+
+    def _dedupe(self, table, rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+        """Resolve keyed rows to known IDs and upsert new keys; returns (rows without a key, rows inserted)"""
+        name = table.name
+        key_column, id_column = NATURAL_KEYS[name], table.primary_key.columns.values()[0].name
+        identity = self._identity[name]
+
+        unkeyed, new_keys, repeats = [], {}, []
+        for row in rows:
+            key = row.get(key_column)
+            if key is None:
+                unkeyed.append(row)
+                continue
+            # Keys are text columns: compare (and look up what RETURNING gives back) as str
+            key = row[key_column] = str(key)
+            if key in identity:
+                self._replaced[row[id_column]] = identity[key]
+            elif key in new_keys:
+                # Same entity twice in this flush: fill gaps in the first row, resolve with it below
+                first = new_keys[key]
+                for column, value in row.items():
+                    if first.get(column) is None and value is not None:
+                        first[column] = value
+                repeats.append((key, row[id_column]))
+            else:
+                new_keys[key] = row
+
+        inserted = 0
+        if new_keys:
+            surviving = self._upsert(table, key_column, id_column, list(new_keys.values()))
+            for key, row in new_keys.items():
+                if surviving[key] == row[id_column]:
+                    inserted += 1  # our staged ID survived: the row is new, not an existing one reused
+                else:
+                    self._replaced[row[id_column]] = surviving[key]
+            for key, staged_id in repeats:
+                self._replaced[staged_id] = surviving[key]
+        return unkeyed, inserted
+
+    def _upsert(self, table, key_column: str, id_column: str, rows: List[Dict[str, Any]]) -> Dict[Any, Any]:
+        """Insert or update rows on their natural key; returns key -> ID of the row that holds it"""
+        columns = [c.name for c in table.columns if any(c.name in row for row in rows)]
+        stmt = self._upsert_insert(table)
+        # Later files fill in what earlier ones left empty, but never blank out known values
+        updates = {c: func.coalesce(stmt.excluded[c], table.c[c]) for c in columns if c not in (id_column, key_column)}
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[key_column],
+            # DO UPDATE (not DO NOTHING) so RETURNING also reports the existing row's ID
+            set_=updates or {key_column: stmt.excluded[key_column]}
+        ).returning(table.c[id_column], table.c[key_column])
+
+        result = self.db.execute(stmt, [{c: row.get(c) for c in columns} for row in rows])
+        surviving = {}
+        for surviving_id, key in result.all():
+            surviving[key] = self._resolved[table.name][key] = surviving_id
+        return surviving
+
+    def _write(self, table, rows: List[Dict[str, Any]]):
+        # One column list per statement: rows missing a column (say, no email mapped) insert NULL
+        columns = [c.name for c in table.columns if any(c.name in row for row in rows)]
+        if self.use_copy:
+            self._copy(table, columns, rows)
+        else:
+            self.db.execute(insert(table), [{c: row.get(c) for c in columns} for row in rows])
+
+    def _copy(self, table, columns: List[str], rows: List[Dict[str, Any]]):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([_COPY_NULL if row.get(c) is None else row[c] for c in columns])
+        buffer.seek(0)
+
+        cursor = self.db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '{_COPY_NULL}')",
+                buffer
+            )
+        finally:
+            cursor.close()
@@ -0,0 +1,212 @@
+import re
+from itertools import chain
+from datetime import datetime, date
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Tokens treated as empty, compared after strip().lower()
+NULL_TOKENS = ["null", "nil", "none", "--", "unknown"]
+
+# Tried in order; the first format that parses wins
+DATE_FORMATS = ["%Y-%m-%d", "%m/%d/%Y", "%d-%b-%Y", "%b %d, %Y", "%Y%m%d"]
+
+AMOUNT_COLUMNS = ["amount_claimed", "amount_approved"]
+
+GENDER_MAP = {
+    'm': 'M', 'male': 'M',
+    'f': 'F', 'female': 'F',
+    'o': 'O', 'other': 'O'
+}
+
+_AMOUNT = r"\d+\.?\d*|\.\d+"
+
+# Non-empty cells looked at when inferring a date column's format
+DATE_FORMAT_SAMPLE = 200
+
+# Distinct values remembered per date column; long files repeat a few thousand dates at most
+DATE_MEMO_MAX = 100_000
+
+
+def is_date_column(target_column: str) -> bool:
+    return any(x in target_column for x in ["date", "dob"])
+
+
+def clean_field_value(target_column: str, value: Any) -> Tuple[Any, Optional[str]]:
+    """Clean and convert field values with error reporting"""
+    if value is None:
+        return None, "Null value"
+        
+    if isinstance(value, str):
+        value = value.strip()
+        if not value or value.lower() in NULL_TOKENS:
+            return None, "Empty or invalid value"
+
+    try:
+        # Handle date fields
+        if is_date_column(target_column):
+            if isinstance(value, (date, datetime)):
+                return value, None
+            try:
+                # Handle multiple date formats
+                if "T" in value:  # ISO format
+                    return datetime.fromisoformat(value).date(), None
+                else:
+                    for fmt in DATE_FORMATS:
+                        try:
+                            return datetime.strptime(value, fmt).date(), None
+                        except ValueError:
+                            continue
+                    return None, f"Unrecognized date format: {value}"
+            except (ValueError, TypeError):
+                return None, f"Invalid date value: {value}"
+        
+        # Handle numeric fields
+        if target_column in AMOUNT_COLUMNS:
+            try:
+                if isinstance(value, str):
+                    # Remove currency symbols and thousands separators
+                    value = re.sub(r"[^\d.]", "", value)
+                return Decimal(str(value)), None
+            except (ValueError, TypeError, InvalidOperation):
+                return None, f"Invalid numeric value: {value}"
+        
+        # Handle gender fields
+        if target_column == "gender":
+            normalized = GENDER_MAP.get(value.lower().strip(), value)
+            if normalized not in ['M', 'F', 'O']:
+                return None, f"Invalid gender value: {value}"
+            return normalized, None
+        
+        return value, None
+        
+    except Exception as e:
+        return None, f"Processing error: {str(e)}"
+
+
+def infer_date_format(text: pd.Series, sample_size: int = DATE_FORMAT_SAMPLE) -> Optional[str]:
+    """
+    The DATE_FORMATS entry that parses the most of a sample of stripped, non-empty strings
+    (earlier formats win ties); None when no format parses any of them
+    """
+    sample = text[~text.str.contains("T", regex=False)].head(sample_size)
+    best, best_count = None, 0
+    for fmt in DATE_FORMATS:
+        count = int(pd.to_datetime(sample, format=fmt, errors="coerce").notna().sum())
+        if count > best_count:
+            best, best_count = fmt, count
+    return best
+
+
+class DateColumnParser:
+    """
+    Parses one date column of an import with a single format, inferred from the first cells it
+    sees, so every row of the column is read the same way. Results are memoized per distinct
+    value across batches. Cells that do not match the format go through clean_field_value
+    (all formats, ISO timestamps) and are counted in fallback_cells.
+    """
+
+    def __init__(self, date_format: Optional[str] = None):
+        self.date_format = date_format
+        self.fallback_cells = 0
+        self._memo: Dict[str, Tuple[Any, Optional[str], bool]] = {}  # value -> (cleaned, error, fell back)
+
+    def parse(self, text: pd.Series, cleaned: np.ndarray, errors: np.ndarray) -> List[int]:
+        if self.date_format is None and not text.empty:
+            self.date_format = infer_date_format(text)
+        if self.date_format is None:
+            return _clean_dates(text, cleaned, errors)
+
+        if len(self._memo) > DATE_MEMO_MAX:
+            self._memo.clear()
+        memo = self._memo
+        new = [value for value in pd.unique(text) if value not in memo]
+        if new:
+            parsed = pd.to_datetime(pd.Series(new, dtype=object), format=self.date_format, errors="coerce")
+            for value, timestamp in zip(new, parsed):
+                if pd.isna(timestamp):
+                    memo[value] = (*clean_field_value("date", value), True)
+                else:
+                    memo[value] = (timestamp.date(), None, False)
+
+        for i, value in zip(text.index, text):
+            cleaned[i], errors[i], fell_back = memo[value]
+            self.fallback_cells += fell_back
+        return []
+
+
+def clean_column(
+    target_column: str,
+    values: List[Any],
+    date_parser: Optional[DateColumnParser] = None
+) -> Tuple[List[Any], List[Optional[str]]]:
+    """
+    Column-wise clean_field_value: coerce a whole column batch with array operations and return
+    (cleaned values, per-cell error or None), cell for cell identical to calling clean_field_value.
+    Plain strings take the vectorized paths; anything else (numbers, native dates, odd types)
+    and strings the fast path cannot settle go through clean_field_value itself.
+    Date columns are parsed with `date_parser`'s single format when one is given.
+    """
+    count = len(values)
+    cleaned = np.full(count, None, dtype=object)
+    errors = np.full(count, None, dtype=object)
+
+    is_null = np.fromiter((v is None for v in values), dtype=bool, count=count)
+    errors[is_null] = "Null value"
+
+    # Series indexed by position, so every index below addresses cleaned/errors directly
+    is_str = np.fromiter((isinstance(v, str) for v in values), dtype=bool, count=count)
+    text = pd.Series([v for v in values if isinstance(v, str)], index=np.flatnonzero(is_str), dtype=object).str.strip()
+    empty = ((text == "") | text.str.lower().isin(NULL_TOKENS)).to_numpy()
+    errors[text.index[empty]] = "Empty or invalid value"
+    text = text[~empty]
+
+    if is_date_column(target_column):
+        unsettled = date_parser.parse(text, cleaned, errors) if date_parser else _clean_dates(text, cleaned, errors)
+    elif target_column in AMOUNT_COLUMNS:
+        unsettled = _clean_amounts(text, cleaned, errors)
+    elif target_column == "gender":
+        unsettled = _clean_gender(text, cleaned, errors)
+    else:
+        cleaned[text.index] = text.to_numpy()
+        unsettled = []
+
+    # Per-cell fallback keeps the exact semantics (and messages) for everything else
+    for i in chain(np.flatnonzero(~is_null & ~is_str), unsettled):
+        cleaned[i], errors[i] = clean_field_value(target_column, values[i])
+    return cleaned.tolist(), errors.tolist()
+
+
+def _clean_dates(text: pd.Series, cleaned: np.ndarray, errors: np.ndarray) -> List[int]:
+    iso = text.str.contains("T", regex=False).to_numpy()
+    remaining = text[~iso]
+    for fmt in DATE_FORMATS:
+        if remaining.empty:
+            break
+        parsed = pd.to_datetime(remaining, format=fmt, errors="coerce")
+        ok = parsed.notna().to_numpy()
+        cleaned[remaining.index[ok]] = parsed[ok].dt.date.to_numpy()
+        remaining = remaining[~ok]
+    # ISO timestamps, values out of pandas' range and genuine errors are decided per cell
+    return text.index[iso].tolist() + remaining.index.tolist()
+
+
+def _clean_amounts(text: pd.Series, cleaned: np.ndarray, errors: np.ndarray) -> List[int]:
+    # Remove currency symbols and thousands separators
+    digits = text.str.replace(r"[^\d.]", "", regex=True)
+    valid = digits.str.fullmatch(_AMOUNT).to_numpy()
+    cleaned[digits.index[valid]] = [Decimal(v) for v in digits[valid]]
+    bad = digits[~valid]
+    errors[bad.index] = ("Invalid numeric value: " + bad).to_numpy()
+    return []
+
+
+def _clean_gender(text: pd.Series, cleaned: np.ndarray, errors: np.ndarray) -> List[int]:
+    normalized = text.str.lower().map(GENDER_MAP)
+    valid = normalized.notna().to_numpy()
+    cleaned[text.index[valid]] = normalized[valid].to_numpy()
+    bad = text[~valid]
+    errors[bad.index] = ("Invalid gender value: " + bad).to_numpy()
+    return []
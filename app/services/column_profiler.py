@@ -0,0 +1,105 @@
+from datetime import date, datetime
+from typing import List, Dict, Any
+
+import numpy as np
+import pandas as pd
+
+# Rows of the sample that are profiled
+PROFILE_SAMPLE_ROWS = 200
+
+# Distinct example values kept per column, and their maximum length
+PROFILE_EXAMPLES = 3
+EXAMPLE_MAX_CHARS = 40
+
+# A column gets a type when at least this share of its non-null values fit the pattern
+TYPE_MATCH_RATE = 0.8
+
+_DATE_PATTERNS = [
+    r"\d{4}-\d{1,2}-\d{1,2}(?:[T ]\d{2}:\d{2}(?::\d{2})?.*)?",  # ISO
+    r"\d{1,2}/\d{1,2}/\d{2,4}",                               # 01/31/2024
+    r"\d{1,2}-[A-Za-z]{3}-\d{4}",                              # 31-Jan-2024
+    r"[A-Za-z]{3,9} \d{1,2}, \d{4}",                           # Jan 31, 2024
+    r"(?:19|20)\d{2}(?:0[1-9]|1[0-2])(?:0[1-9]|[12]\d|3[01])",  # 20240131
+]
+
+# Detectors in priority order: the first one most values satisfy names the column type
+_PATTERNS = {
+    "icd10": r"[A-TV-Z][0-9][0-9A-Z](?:\.?[0-9A-Z]{1,4})?",
+    "email": r"[^@\s]+@[^@\s]+\.[A-Za-z]{2,}",
+    "phone": r"\+?1?[\s.-]?\(?\d{3}\)?[\s.-]?\d{3}[\s.-]?\d{4}",
+    "date": "(?:" + "|".join(_DATE_PATTERNS) + ")",
+    "policy_number": r"[A-Z]{2,5}[-/]?\d{5,12}",
+    # Needs a currency symbol, thousands separators or cents, so plain integer IDs stay "integer"
+    "currency": r"[$€£]\s?-?[\d,]+(?:\.\d{1,2})?|-?(?:\d{1,3}(?:,\d{3})+|\d+)\.\d{1,2}|-?\d{1,3}(?:,\d{3})+",
+    "integer": r"-?\d+",
+}
+_TYPE_PRIORITY = ["npi", "icd10", "email", "gender", "date", "phone", "policy_number", "currency", "integer"]
+
+_GENDER_TOKENS = {"m", "f", "o", "u", "male", "female", "other", "unknown"}
+
+
+def npi_luhn_valid(values: pd.Series) -> pd.Series:
+    """
+    Vectorized NPI check: 10 digits whose last digit is the Luhn check digit
+    computed with the '80840' health-industry prefix.
+    """
+    is_ten_digits = values.str.fullmatch(r"\d{10}").fillna(False).to_numpy(dtype=bool)
+    result = np.zeros(len(values), dtype=bool)
+    if not is_ten_digits.any():
+        return pd.Series(result, index=values.index)
+
+    digits = np.array([list(v) for v in values[is_ten_digits]], dtype=np.int64)
+    body, check = digits[:, :9], digits[:, 9]
+    doubled = body[:, ::2] * 2  # every other digit from the right of the 9-digit body
+    doubled = np.where(doubled > 9, doubled - 9, doubled)
+    total = 24 + doubled.sum(axis=1) + body[:, 1::2].sum(axis=1)  # 24 is the prefix's contribution
+    result[is_ten_digits] = (10 - total % 10) % 10 == check
+    return pd.Series(result, index=values.index)
+
+
+def _match_rates(values: pd.Series, native_dates: int) -> Dict[str, float]:
+    count = len(values) + native_dates
+    rates = {name: values.str.fullmatch(pattern, case=False).sum() / count for name, pattern in _PATTERNS.items()}
+    rates["date"] += native_dates / count
+    rates["npi"] = npi_luhn_valid(values).sum() / count
+    rates["gender"] = values.str.lower().isin(_GENDER_TOKENS).sum() / count
+    return rates
+
+
+def profile_column(series: pd.Series) -> Dict[str, Any]:
+    """Compact type signature for one column's sample values"""
+    non_null = series.dropna()
+    non_null = non_null[non_null.astype(str).str.strip() != ""]
+    profile = {
+        "type": "empty",
+        "match_rate": 0.0,
+        "null_rate": round(1 - len(non_null) / len(series), 2) if len(series) else 1.0,
+        "distinct": int(non_null.astype(str).nunique()),
+        "examples": [v[:EXAMPLE_MAX_CHARS] for v in non_null.astype(str).str.strip().unique()[:PROFILE_EXAMPLES]],
+    }
+    if non_null.empty:
+        return profile
+
+    is_native_date = non_null.map(lambda v: isinstance(v, (date, datetime, pd.Timestamp)))
+    values = non_null[~is_native_date].astype(str).str.strip()
+    rates = _match_rates(values, int(is_native_date.sum()))
+
+    for name in _TYPE_PRIORITY:
+        if rates[name] >= TYPE_MATCH_RATE:
+            profile["type"], profile["match_rate"] = name, round(float(rates[name]), 2)
+            return profile
+    profile["type"] = "text"
+    return profile
+
+
+def profile_columns(headers: List, samples: List[dict]) -> Dict[Any, Dict[str, Any]]:
+    """Type signatures for every column of the sample rows"""
+    df = pd.DataFrame(samples[:PROFILE_SAMPLE_ROWS], columns=headers)
+    return {header: profile_column(df[header]) for header in headers}
+
+
+def signature_text(profile: Dict[str, Any]) -> str:
+    """'npi 100%, 0% null, 5 distinct' style summary for prompts and logs"""
+    if profile["type"] in ("empty", "text"):
+        return f"{profile['type']}, {profile['null_rate']:.0%} null, {profile['distinct']} distinct"
+    return f"{profile['type']} {profile['match_rate']:.0%}, {profile['null_rate']:.0%} null, {profile['distinct']} distinct"
@@ -0,0 +1,283 @@
+from fastapi import HTTPException
+from io import BytesIO
+from typing import List, Dict, Any, Optional
+
+# PDF processing imports
+import PyPDF2
+import pdfplumber
+from pdfminer.high_level import extract_text as pdfminer_extract_text
+
+# DOCX processing imports
+import docx
+from docx import Document
+import xml.etree.ElementTree as ET
+
+# Additional imports for table extraction
+import tabula
+import camelot
+
+
+def extract_form_data_from_text(text: str) -> Dict[str, Any]:
+    """
+    Extract form-like data from text content
+    Looks for key-value pairs, labels, and form fields
+    """
+    form_data = {
+        "headers": [],
+        "sample_data": [],
+        "form_fields": {}
+    }
+    
+    import re
+    
+    # Common form patterns
+    patterns = [
+        r'([A-Za-z\s]+):\s*([^\n\r]+)',  # Label: Value
+        r'([A-Za-z\s]+)\s*=\s*([^\n\r]+)',  # Label = Value
+        r'([A-Za-z\s]+)\s*-\s*([^\n\r]+)',  # Label - Value
+        r'([A-Za-z\s]+)\s*\|\s*([^\n\r]+)',  # Label | Value
+        r'([A-Za-z\s]+)\s*\.\s*([^\n\r]+)',  # Label . Value
+    ]
+    
+    found_fields = {}
+    
+    for pattern in patterns:
+        matches = re.findall(pattern, text, re.MULTILINE)
+        for match in matches:
+            key = match[0].strip()
+            value = match[1].strip()
+            
+            # Filter out likely non-form content
+            if (len(key) > 2 and len(key) < 50 and 
+                len(value) > 0 and len(value) < 200 and
+                not key.lower().startswith(('page', 'figure', 'table', 'section'))):
+                found_fields[key] = value
+    
+    if found_fields:
+        form_data["headers"] = list(found_fields.keys())
+        form_data["sample_data"] = [found_fields]
+        form_data["form_fields"] = found_fields
+    
+    return form_data
+
+
+# Tiers of the PDF/DOCX extraction cascade, in default priority order
+EXTRACTION_TIERS = ["form_extraction", "structured_text", "table_extraction", "raw_text"]
+
+
+def extraction_tier_order(preferred_method: Optional[str] = None) -> List[str]:
+    """Default cascade order, or the source's known-good tier first when its profile has one"""
+    if preferred_method in EXTRACTION_TIERS:
+        return [preferred_method] + [tier for tier in EXTRACTION_TIERS if tier != preferred_method]
+    return list(EXTRACTION_TIERS)
+
+
+def _form_tier(text: str) -> Optional[Dict[str, Any]]:
+    form_data = extract_form_data_from_text(text)
+    if form_data["headers"]:
+        return {
+            "headers": form_data["headers"],
+            "sample_data": form_data["sample_data"],
+            "form_fields": form_data["form_fields"]
+        }
+    return None
+
+
+def _structured_tier(text: str, markers: List[str]) -> Optional[Dict[str, Any]]:
+    # Look for structured text patterns (not form-like)
+    lines = [line.strip() for line in text.split('\n') if line.strip()]
+    structured_content = [line for line in lines if len(line) > 10 and any(char in line for char in markers)]
+    if structured_content:
+        return {
+            "headers": ["structured_content"],
+            "sample_data": [{"structured_content": '\n'.join(structured_content[:5])}]
+        }
+    return None
+
+
+def _table_tier(tables: List[List[List[Any]]]) -> Optional[Dict[str, Any]]:
+    if not tables or len(tables[0]) == 0:
+        return None
+    first_table = tables[0]
+    headers = [str(cell).strip() if cell else f"Column_{i}"
+               for i, cell in enumerate(first_table[0])]
+
+    # Get sample rows (skip header row)
+    sample_rows = []
+    for row in first_table[1:6]:  # Get up to 5 sample rows
+        row_dict = {}
+        for i, cell in enumerate(row):
+            if i < len(headers):
+                row_dict[headers[i]] = str(cell).strip() if cell else None
+        sample_rows.append(row_dict)
+    return {"headers": headers, "sample_data": sample_rows}
+
+
+def _raw_tier(text: str) -> Dict[str, Any]:
+    return {"headers": ["extracted_text"], "sample_data": [{"extracted_text": text[:1000]}]}
+
+
+def _empty_extraction() -> Dict[str, Any]:
+    return {
+        "text_content": "",
+        "tables": [],
+        "headers": [],
+        "sample_data": [],
+        "form_fields": {},
+        "extraction_method": ""
+    }
+
+
+def extract_pdf_content(file_contents: bytes, preferred_method: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Extract content from PDF files with priority order:
+    1. Form data extraction
+    2. General text content
+    3. Table extraction (last resort)
+    When the source's profile names a tier that worked before, that tier is tried first.
+    """
+    pdf_data = _empty_extraction()
+    
+    try:
+        # Step 1: Extract all text content first
+        with pdfplumber.open(BytesIO(file_contents)) as pdf:
+            full_text = ""
+            for page in pdf.pages:
+                page_text = page.extract_text()
+                if page_text:
+                    full_text += page_text + "\n"
+            pdf_data["text_content"] = full_text
+            
+            # Step 2: Walk the cascade until a tier produces data
+            for tier in extraction_tier_order(preferred_method):
+                if tier == "table_extraction":
+                    # Table detection is the expensive pass, so only run it once this tier is reached
+                    tables = []
+                    for page in pdf.pages:
+                        page_tables = page.extract_tables()
+                        if page_tables:
+                            tables.extend(page_tables)
+                    pdf_data["tables"] = tables
+                    extracted = _table_tier(tables)
+                elif not full_text.strip():
+                    continue
+                elif tier == "form_extraction":
+                    extracted = _form_tier(full_text)
+                elif tier == "structured_text":
+                    extracted = _structured_tier(full_text, [',', '|', '\t'])
+                else:
+                    extracted = _raw_tier(full_text)
+                
+                if extracted:
+                    pdf_data.update(extracted)
+                    pdf_data["extraction_method"] = tier
+                    print(f"PDF content extracted using {tier}: {len(extracted['headers'])} headers")
+                    return pdf_data
+            
+    except Exception as e:
+        print(f"pdfplumber failed: {e}")
+        
+        # Fallback methods
+        extract_pdf_text_fallback(file_contents, pdf_data)
+    
+    return pdf_data
+
+
+def extract_pdf_text_fallback(file_contents: bytes, pdf_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Text-only PDF extraction with PyPDF2, then pdfminer.
+    Much cheaper than pdfplumber's layout and table analysis, so it is also the next
+    tier when pdfplumber exceeds its resource limits.
+    """
+    if pdf_data is None:
+        pdf_data = _empty_extraction()
+    
+    try:
+        pdf_reader = PyPDF2.PdfReader(BytesIO(file_contents))
+        text_content = ""
+        for page in pdf_reader.pages:
+            text_content += page.extract_text() + "\n"
+        
+        if text_content.strip():
+            # Try form extraction on fallback text
+            form_data = extract_form_data_from_text(text_content)
+            if form_data["headers"]:
+                pdf_data["headers"] = form_data["headers"]
+                pdf_data["sample_data"] = form_data["sample_data"]
+                pdf_data["form_fields"] = form_data["form_fields"]
+                pdf_data["extraction_method"] = "form_extraction_fallback"
+            else:
+                pdf_data["headers"] = ["extracted_text"]
+                pdf_data["sample_data"] = [{"extracted_text": text_content[:1000]}]
+                pdf_data["extraction_method"] = "raw_text_fallback"
+            
+            pdf_data["text_content"] = text_content
+            
+    except Exception as e2:
+        print(f"PyPDF2 failed: {e2}")
+        
+        try:
+            text_content = pdfminer_extract_text(BytesIO(file_contents))
+            pdf_data["text_content"] = text_content
+            pdf_data["headers"] = ["extracted_text"]
+            pdf_data["sample_data"] = [{"extracted_text": text_content[:1000]}]
+            pdf_data["extraction_method"] = "raw_text_pdfminer"
+        except Exception as e3:
+            print(f"All PDF extraction methods failed: {e3}")
+            raise HTTPException(status_code=500, detail="Failed to extract content from PDF")
+    
+    return pdf_data
+
+
+def extract_docx_content(file_contents: bytes, preferred_method: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Extract content from DOCX files with priority order:
+    1. Form data extraction
+    2. General text content
+    3. Table extraction (last resort)
+    When the source's profile names a tier that worked before, that tier is tried first.
+    """
+    docx_data = _empty_extraction()
+    
+    try:
+        doc = Document(BytesIO(file_contents))
+        
+        # Extract all text content first
+        full_text = []
+        for paragraph in doc.paragraphs:
+            if paragraph.text.strip():
+                full_text.append(paragraph.text.strip())
+        
+        text_content = "\n".join(full_text)
+        docx_data["text_content"] = text_content
+        
+        for tier in extraction_tier_order(preferred_method):
+            if tier == "table_extraction":
+                tables_data = []
+                for table in doc.tables:
+                    table_data = []
+                    for row in table.rows:
+                        table_data.append([cell.text.strip() for cell in row.cells])
+                    tables_data.append(table_data)
+                docx_data["tables"] = tables_data
+                extracted = _table_tier(tables_data)
+            elif not text_content.strip():
+                continue
+            elif tier == "form_extraction":
+                extracted = _form_tier(text_content)
+            elif tier == "structured_text":
+                extracted = _structured_tier(text_content, [',', '|', '\t', ':'])
+            else:
+                extracted = _raw_tier(text_content)
+            
+            if extracted:
+                docx_data.update(extracted)
+                docx_data["extraction_method"] = tier
+                print(f"DOCX content extracted using {tier}: {len(extracted['headers'])} headers")
+                return docx_data
+    
+    except Exception as e:
+        print(f"DOCX extraction failed: {e}")
+        raise HTTPException(status_code=500, detail="Failed to extract content from DOCX file")
+    
+    return docx_data
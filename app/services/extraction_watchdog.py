@@ -0,0 +1,96 @@
+import multiprocessing
+import signal
+from typing import Any, Callable, Tuple
+from app.core.config import EXTRACTION_CPU_SECONDS, EXTRACTION_WALL_SECONDS, EXTRACTION_MEMORY_MB
+
+try:
+    import resource  # POSIX only; on Windows only the wall-clock limit applies
+except ImportError:
+    resource = None
+
+# Outcomes reported by run_with_limits
+OK = "ok"
+ERROR = "error"
+TIMEOUT = "timeout"
+CPU_LIMIT = "cpu_limit"
+MEMORY_LIMIT = "memory_limit"
+CRASHED = "crashed"
+
+# Workers never fork the API process itself: it is multi-threaded and has grpc loaded, and a forked
+# child can deadlock on a lock some other thread held. forkserver forks them from a small clean
+# server process (with the extraction libraries preloaded); spawn starts each one from scratch.
+if "forkserver" in multiprocessing.get_all_start_methods():
+    _context = multiprocessing.get_context("forkserver")
+    _context.set_forkserver_preload(["app.services.document_extraction"])
+else:
+    _context = multiprocessing.get_context("spawn")
+
+# Exit codes of a worker killed for exceeding RLIMIT_CPU (soft limit, then hard limit)
+_CPU_LIMIT_EXITCODES = {-getattr(signal, name) for name in ("SIGXCPU", "SIGKILL") if hasattr(signal, name)}
+
+
+def _apply_limits(cpu_seconds: int, memory_mb: int):
+    if resource is None:
+        return
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+    # The worker is a fresh interpreter (not a fork of the API), so the cap is absolute
+    memory_bytes = memory_mb * 1024 * 1024
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    except (ValueError, OSError):
+        pass  # some platforms (macOS) refuse address-space limits
+
+
+def _run_limited(conn, func: Callable, args: tuple, cpu_seconds: int, memory_mb: int):
+    """Worker-process entry point: apply rlimits, run the extraction, send back (status, payload)"""
+    _apply_limits(cpu_seconds, memory_mb)
+    try:
+        conn.send((OK, func(*args)))
+    except MemoryError:
+        conn.send((MEMORY_LIMIT, None))
+    except Exception as e:
+        conn.send((ERROR, str(getattr(e, "detail", e))))
+    finally:
+        conn.close()
+
+
+def run_with_limits(
+    func: Callable,
+    *args,
+    cpu_seconds: int = EXTRACTION_CPU_SECONDS,
+    wall_seconds: int = EXTRACTION_WALL_SECONDS,
+    memory_mb: int = EXTRACTION_MEMORY_MB,
+) -> Tuple[str, Any]:
+    """
+    Run func(*args) in a separate process under CPU-time, wall-clock and memory limits.
+    func must be a module-level function (it is pickled to the worker), and memory_mb caps the
+    worker's whole address space, interpreter and libraries included.
+    Returns (status, payload): (OK, result) on success, otherwise one of the limit/error
+    statuses with an error message or None. The worker is always reaped before returning.
+    """
+    receiver, sender = _context.Pipe(duplex=False)
+    worker = _context.Process(
+        target=_run_limited,
+        args=(sender, func, args, cpu_seconds, memory_mb),
+        daemon=True,
+    )
+    worker.start()
+    sender.close()
+
+    try:
+        if receiver.poll(wall_seconds):
+            try:
+                return receiver.recv()
+            except EOFError:
+                # The worker died without reporting: killed by the CPU/memory rlimit or crashed
+                worker.join(1)
+                if worker.exitcode in _CPU_LIMIT_EXITCODES:
+                    return CPU_LIMIT, None
+                return CRASHED, f"exit code {worker.exitcode}"
+        return TIMEOUT, None
+    finally:
+        receiver.close()
+        worker.join(0.5)
+        if worker.is_alive():
+            worker.kill()
+            worker.join()
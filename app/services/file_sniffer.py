@@ -0,0 +1,189 @@
+import csv
+import io
+from collections import Counter
+from typing import Dict, Any, List, Optional, Tuple
+
+import pandas as pd
+
+# Only this much of the stored file is inspected to decide how to parse it
+SNIFF_BYTES = 256 * 1024
+
+CANDIDATE_DELIMITERS = [",", "\t", ";", "|"]
+CANDIDATE_QUOTECHARS = ['"', "'"]
+DEFAULT_DELIMITERS = {"csv": ",", "tsv": "\t"}
+
+# Number of leading records considered when looking for the real header row
+HEADER_SCAN_ROWS = 30
+
+_BOMS = [
+    (b"\xef\xbb\xbf", "utf-8-sig"),
+    (b"\xff\xfe", "utf-16"),
+    (b"\xfe\xff", "utf-16"),
+]
+
+
+def detect_encoding(prefix: bytes) -> str:
+    """Detect the file encoding from its BOM, falling back to UTF-8 / charset detection / cp1252"""
+    for bom, encoding in _BOMS:
+        if prefix.startswith(bom):
+            return encoding
+
+    # The prefix may cut a multi-byte character in half, so allow a short undecodable tail
+    try:
+        prefix.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError as e:
+        if e.start >= len(prefix) - 3 and e.reason == "unexpected end of data":
+            return "utf-8"
+
+    try:
+        from charset_normalizer import from_bytes  # optional, better guesses for legacy encodings
+        best = from_bytes(prefix).best()
+        if best is not None:
+            return best.encoding
+    except ImportError:
+        pass
+
+    try:
+        prefix.decode("cp1252")
+        return "cp1252"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+
+def _records(text: str, delimiter: str, quotechar: str, limit: int) -> List[Tuple[int, List[str]]]:
+    """Parse up to `limit` records, keeping the physical line each one starts on"""
+    reader = csv.reader(io.StringIO(text), delimiter=delimiter, quotechar=quotechar)
+    records = []
+    start_line = 0
+    try:
+        for row in reader:
+            records.append((start_line, row))
+            start_line = reader.line_num
+            if len(records) >= limit:
+                break
+    except csv.Error:
+        pass
+    return records
+
+
+def detect_delimiter(text: str, extension: str) -> str:
+    """Pick the delimiter that splits the most records into the same number (>1) of fields"""
+    default = DEFAULT_DELIMITERS.get(extension, ",")
+    best, best_score = default, (0, 0, False)
+    for delimiter in CANDIDATE_DELIMITERS:
+        counts = [len(row) for _, row in _records(text, delimiter, '"', 200) if len(row) > 1]
+        if not counts:
+            continue
+        width, frequency = Counter(counts).most_common(1)[0]
+        # Ties go to the wider split, then to the extension's usual delimiter
+        score = (frequency, width, delimiter == default)
+        if score > best_score:
+            best, best_score = delimiter, score
+    return best
+
+
+def detect_quotechar(text: str, delimiter: str) -> str:
+    """Pick the quote character that actually wraps fields next to the delimiter"""
+    counts = {
+        quote: text.count(f"{delimiter}{quote}") + text.count(f"{quote}{delimiter}")
+        for quote in CANDIDATE_QUOTECHARS
+    }
+    best = max(counts, key=counts.get)
+    return best if counts[best] > counts['"'] else '"'
+
+
+def _header_position(rows: List[List[str]]) -> int:
+    """
+    Return the index of the header among the given rows.
+    Banner/title rows have fewer populated fields than the table, so the header
+    is the first row that is as wide as the table and mostly non-numeric.
+    """
+    populated = [[cell.strip() for cell in row if cell.strip()] for row in rows]
+    widths = Counter(len(cells) for cells in populated if cells)
+    if not widths:
+        return 0
+    table_width = widths.most_common(1)[0][0]
+
+    for position, cells in enumerate(populated[:HEADER_SCAN_ROWS]):
+        if not cells or len(cells) < table_width:
+            continue
+        numeric = sum(1 for cell in cells if cell.replace(".", "", 1).replace("-", "", 1).isdigit())
+        if numeric <= len(cells) / 2:
+            return position
+    return 0
+
+
+def detect_header_row(text: str, delimiter: str, quotechar: str) -> int:
+    """Return the number of physical lines above the header row"""
+    records = [(line, row) for line, row in _records(text, delimiter, quotechar, HEADER_SCAN_ROWS + 200) if row]
+    if not records:
+        return 0
+    return records[_header_position([row for _, row in records])][0]
+
+
+def detect_excel_layout(path: str) -> Dict[str, Any]:
+    """Find the engine that opens the workbook, the first sheet holding data, and its header row"""
+    try:
+        workbook, engine = pd.ExcelFile(path, engine="openpyxl"), "openpyxl"
+    except Exception:
+        workbook, engine = pd.ExcelFile(path, engine="xlrd"), "xlrd"
+
+    for sheet_name in workbook.sheet_names:
+        preview = workbook.parse(sheet_name, header=None, nrows=HEADER_SCAN_ROWS + 200)
+        if preview.dropna(how="all").empty:
+            continue
+        rows = [["" if pd.isna(cell) else str(cell) for cell in row] for row in preview.itertuples(index=False)]
+        return {"engine": engine, "sheet_name": sheet_name, "header_row": _header_position(rows)}
+
+    return {"engine": engine, "sheet_name": 0, "header_row": 0}
+
+
+def read_excel_file(path: str, settings: Dict[str, Any], nrows: Optional[int] = None) -> pd.DataFrame:
+    """Read a workbook with previously detected (or profiled) settings (only the first `nrows` rows when set)"""
+    return pd.read_excel(
+        path,
+        engine=settings["engine"],
+        sheet_name=settings["sheet_name"],
+        header=settings["header_row"],
+        nrows=nrows,
+    )
+
+
+def sniff_text_file(path: str, extension: str) -> Dict[str, Any]:
+    """
+    Inspect a bounded prefix of a stored delimited file and work out how to parse it:
+    encoding/BOM, delimiter, quote character and the header row offset.
+    """
+    with open(path, "rb") as f:
+        prefix = f.read(SNIFF_BYTES)
+
+    encoding = detect_encoding(prefix)
+    text = prefix.decode(encoding, errors="replace")
+    if len(prefix) == SNIFF_BYTES and "\n" in text:
+        text = text[:text.rfind("\n") + 1]  # drop the partial last line
+
+    delimiter = detect_delimiter(text, extension)
+    quotechar = detect_quotechar(text, delimiter)
+
+    return {
+        "encoding": encoding,
+        "delimiter": delimiter,
+        "quotechar": quotechar,
+        "header_row": detect_header_row(text, delimiter, quotechar),
+    }
+
+
+def read_csv_kwargs(settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Translate sniffed settings into pandas.read_csv arguments"""
+    return {
+        "encoding": settings["encoding"],
+        "sep": settings["delimiter"],
+        "quotechar": settings["quotechar"],
+        "skiprows": settings["header_row"],
+    }
+
+
+def open_csv_reader(path: str, settings: Dict[str, Any], chunksize: Optional[int] = None, **overrides):
+    """Open the stored file once with the sniffed settings (a chunk iterator when chunksize is set)"""
+    return pd.read_csv(path, chunksize=chunksize, **{**read_csv_kwargs(settings), **overrides})
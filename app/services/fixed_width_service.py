@@ -0,0 +1,147 @@
+import os
+from decimal import Decimal, InvalidOperation
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Any, Optional
+
+# Extensions treated as fixed-width mainframe extracts
+FIXED_WIDTH_EXTENSIONS = ("dat", "fwf", "txt")
+
+# How far to scan for the header/record line terminators
+_PREFIX_SCAN_BYTES = 1024 * 1024
+_NEWLINE = 0x0A
+
+
+def validate_layout_fields(fields: List[Dict[str, Any]], allowed_targets: List[str]) -> List[str]:
+    """Return a list of problems with a layout's field specs (empty when valid)"""
+    problems = []
+    names = [f["name"] for f in fields]
+    if not fields:
+        problems.append("Layout must define at least one field")
+    if len(names) != len(set(names)):
+        problems.append("Layout has duplicate field names")
+    for f in fields:
+        target = f.get("target_column")
+        if target and target not in allowed_targets:
+            problems.append(f"Field '{f['name']}' targets unknown column '{target}'")
+        if f.get("type") == "date" and not f.get("format"):
+            problems.append(f"Date field '{f['name']}' needs a format")
+    return problems
+
+
+def layout_mapping_result(fields: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Build a mapping result straight from the layout's target columns (no LLM needed)"""
+    return [
+        {
+            "header": f["name"],
+            "matched_column": f.get("target_column") or "Unmapped",
+            "llm_suggestion": f.get("target_column") or "Unmapped",
+            "confidence_score": 1.0 if f.get("target_column") else 0.0,
+        }
+        for f in fields
+    ]
+
+
+def _to_decimal(raw: str, scale: int) -> Optional[Decimal]:
+    """'0001050' with 2 implied decimal places -> Decimal('10.50'), exactly; None when not a number"""
+    try:
+        number = Decimal(raw)
+    except InvalidOperation:
+        return None
+    if not number.is_finite():
+        return None
+    return number.scaleb(-scale) if scale else number
+
+
+def _convert_field(values: pd.Series, field: Dict[str, Any]) -> pd.Series:
+    """Convert a column of stripped strings to the field's declared type"""
+    values = values.where(values != "", None)
+    field_type = field.get("type", "str")
+
+    if field_type == "int":
+        numbers = pd.to_numeric(values, errors="coerce")
+        numbers = numbers.where(numbers % 1 == 0)
+        return numbers.astype("Int64").astype(object).where(numbers.notna(), None)
+    if field_type == "decimal":
+        # Amounts stay exact: no float round trip, implied decimals shift the exponent
+        scale = field.get("scale") or 0
+        return values.map(lambda raw: None if raw is None else _to_decimal(raw, scale)).astype(object)
+    if field_type == "date":
+        dates = pd.to_datetime(values, format=field["format"], errors="coerce")
+        return dates.dt.date.astype(object).where(dates.notna(), None)
+    return values
+
+
+def _slice_field(records: np.ndarray, offset: int, length: int, encoding: str) -> np.ndarray:
+    """Slice one field out of every record at once and decode it"""
+    block = np.ascontiguousarray(records[:, offset:offset + length])
+    raw = block.view(f"S{length}").ravel()
+    return np.char.strip(np.char.decode(raw, encoding, errors="replace"))
+
+
+def _read_with_pandas(path: str, fields: List[Dict[str, Any]], header_lines: int, encoding: str,
+                      nrows: Optional[int] = None) -> pd.DataFrame:
+    """Fallback for files whose lines are not all the same length (e.g. trimmed trailing blanks)"""
+    df = pd.read_fwf(
+        path,
+        colspecs=[(f["offset"], f["offset"] + f["length"]) for f in fields],
+        names=[f["name"] for f in fields],
+        header=None,
+        skiprows=header_lines,
+        dtype=str,
+        keep_default_na=False,
+        encoding=encoding,
+        nrows=nrows,
+    )
+    return pd.DataFrame({f["name"]: _convert_field(df[f["name"]].str.strip(), f) for f in fields})
+
+
+def read_fixed_width(path: str, fields: List[Dict[str, Any]], header_lines: int = 0, encoding: str = "latin-1",
+                     nrows: Optional[int] = None) -> pd.DataFrame:
+    """
+    Read a fixed-width file according to a layout spec (only the first `nrows` records when set).
+    The file is memory-mapped and viewed as a 2-D (records x record_length) byte array,
+    so each field is sliced for all records in a single numpy operation.
+    """
+    names = [f["name"] for f in fields]
+    if os.path.getsize(path) == 0:
+        return pd.DataFrame(columns=names)
+
+    buffer = np.memmap(path, dtype=np.uint8, mode="r")
+    line_ends = np.flatnonzero(buffer[:_PREFIX_SCAN_BYTES] == _NEWLINE)
+
+    if header_lines and len(line_ends) < header_lines:
+        return pd.DataFrame(columns=names)
+    start = int(line_ends[header_lines - 1]) + 1 if header_lines else 0
+
+    body = buffer[start:]
+    if len(body) == 0:
+        return pd.DataFrame(columns=names)
+    following = line_ends[line_ends >= start]
+    record_length = int(following[0]) - start + 1 if len(following) else len(body)
+    terminator = 2 if record_length > 1 and body[record_length - 2] == 0x0D else 1
+    width = record_length - terminator if len(following) else record_length
+
+    if max(f["offset"] + f["length"] for f in fields) > width:
+        raise ValueError(f"Layout is wider than the {width}-byte records in this file")
+
+    full_records = len(body) // record_length
+    records = body[:full_records * record_length].reshape(full_records, record_length)
+    tail = body[full_records * record_length:]
+    if nrows is not None and full_records >= nrows:
+        records, tail = records[:nrows], tail[:0]
+
+    # Every full record must end exactly at a line terminator, otherwise lines vary in length
+    if len(following) and full_records and not np.all(records[:, -1] == _NEWLINE):
+        return _read_with_pandas(path, fields, header_lines, encoding, nrows)
+    if len(tail) and len(tail) != width:
+        return _read_with_pandas(path, fields, header_lines, encoding, nrows)
+
+    columns = {}
+    for f in fields:
+        values = _slice_field(records, f["offset"], f["length"], encoding)
+        if len(tail):
+            values = np.concatenate([values, _slice_field(tail.reshape(1, -1), f["offset"], f["length"], encoding)])
+        columns[f["name"]] = _convert_field(pd.Series(values, dtype=object), f)
+
+    return pd.DataFrame(columns, columns=names)
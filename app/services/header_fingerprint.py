@@ -0,0 +1,16 @@
+import hashlib
+import re
+from typing import Iterable
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]")
+
+
+def normalize_header(header) -> str:
+    """Lowercase a header and drop spacing/punctuation so 'Member ID' == 'member_id' == 'MemberID'"""
+    return _NON_ALNUM.sub("", str(header).lower())
+
+
+def header_fingerprint(headers: Iterable) -> str:
+    """Order-insensitive fingerprint of a header set"""
+    normalized = sorted({normalize_header(h) for h in headers})
+    return hashlib.sha1("|".join(normalized).encode("utf-8")).hexdigest()
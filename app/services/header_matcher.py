@@ -0,0 +1,183 @@
+import re
+from collections import Counter
+from functools import lru_cache
+from difflib import SequenceMatcher
+from typing import List, Dict, Any, Tuple, Optional
+from app.core.config import LOCAL_MATCH_THRESHOLD
+from app.services.llm_service import PREDEFINED_COLUMNS
+
+# Common abbreviations in payer/provider extracts, expanded before matching
+ABBREVIATIONS = {
+    "amt": "amount", "amnt": "amount",
+    "no": "number", "num": "number", "nbr": "number", "nr": "number",
+    "dt": "date", "dte": "date",
+    "adm": "admission", "admit": "admission", "admitted": "admission",
+    "dis": "discharge", "disch": "discharge", "discharged": "discharge",
+    "dx": "diagnosis", "diag": "diagnosis", "icd": "diagnosis",
+    "desc": "description", "descr": "description",
+    "prov": "provider", "dr": "doctor",
+    "mem": "member", "mbr": "member", "subscriber": "member",
+    "pol": "policy", "grp": "group",
+    "fname": "first name", "lname": "last name",
+    "addr": "address", "tel": "phone", "ph": "phone", "mobile": "phone",
+    "clm": "claim", "stat": "status", "sts": "status",
+    "appr": "approved", "apprvd": "approved",
+    "rej": "rejection", "reject": "rejection", "rejected": "rejection", "denial": "rejection",
+}
+
+# Phrasings seen for each predefined column (already in normalized, expanded form)
+SYNONYMS = {
+    "member_id": ["member id", "member number", "patient id", "insured id", "mrn", "medical record number"],
+    "first_name": ["first name", "given name", "patient first name", "member first name", "forename"],
+    "last_name": ["last name", "surname", "family name", "patient last name", "member last name"],
+    "dob": ["dob", "date of birth", "birth date", "birthdate", "patient dob", "member dob"],
+    "gender": ["gender", "sex", "patient gender", "patient sex"],
+    "email": ["email", "email address", "e mail", "patient email"],
+    "phone": ["phone", "phone number", "telephone", "contact number", "patient phone", "cell phone"],
+    "address": ["address", "street address", "home address", "patient address", "mailing address"],
+    "npi_number": ["npi", "npi number", "provider npi", "national provider identifier", "rendering npi", "billing npi"],
+    "provider_name": ["provider name", "provider", "physician name", "doctor name", "rendering provider", "facility name"],
+    "policy_number": ["policy number", "policy id", "policy", "insurance policy number"],
+    "plan_name": ["plan name", "plan", "insurance plan", "health plan", "plan type"],
+    "group_number": ["group number", "group id", "group", "employer group"],
+    "policy_start_date": ["policy start date", "coverage start date", "effective date", "policy effective date", "start date"],
+    "policy_end_date": ["policy end date", "coverage end date", "termination date", "expiration date", "end date"],
+    "claim_date": ["claim date", "date of service", "service date", "dos", "claim submission date", "submitted date"],
+    "admission_date": ["admission date", "date of admission"],
+    "discharge_date": ["discharge date", "date of discharge"],
+    "amount_claimed": ["amount claimed", "claim amount", "billed amount", "charge amount", "total charges", "claimed amount"],
+    "amount_approved": ["amount approved", "approved amount", "paid amount", "allowed amount", "amount paid"],
+    "claim_status": ["claim status", "status"],
+    "rejection_reason": ["rejection reason", "reason for rejection", "rejection code reason"],
+    "diagnosis_code": ["diagnosis code", "diagnosis", "primary diagnosis code", "diagnosis 10 code", "diagnosis10"],
+    "diagnosis_description": ["diagnosis description", "diagnosis name", "diagnosis text"],
+}
+
+# Columns a value type (from the column profiler) is consistent with
+TYPE_COLUMNS = {
+    "npi": {"npi_number"},
+    "icd10": {"diagnosis_code"},
+    "email": {"email"},
+    "phone": {"phone"},
+    "gender": {"gender"},
+    "date": {"dob", "policy_start_date", "policy_end_date", "claim_date", "admission_date", "discharge_date"},
+    "currency": {"amount_claimed", "amount_approved"},
+    "policy_number": {"policy_number", "member_id", "group_number"},
+}
+
+# Minimum share of matching values before the value type is allowed to override the header
+EVIDENCE_MATCH_RATE = 0.9
+
+# A header scoring at least this (an exact or spacing-only synonym match) is never redirected by
+# its values; member IDs like "M001" also look like ICD-10 codes
+EXACT_HEADER_SCORE = 0.98
+
+# Distinct (header spelling, allowed columns) scores remembered
+SCORE_CACHE_SIZE = 8192
+
+_CAMEL_BOUNDARY = re.compile(r"(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])")
+_SEPARATORS = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_phrase(header) -> str:
+    """'MemberID' / 'member_id' / 'Member #' -> 'member id' / 'member id' / 'member'; abbreviations expanded"""
+    text = _CAMEL_BOUNDARY.sub(" ", str(header)).lower()
+    tokens = [ABBREVIATIONS.get(token, token) for token in _SEPARATORS.split(text) if token]
+    return " ".join(tokens)
+
+
+def _build_index() -> List[Tuple[str, str, str, frozenset, Counter]]:
+    index = []
+    for column in PREDEFINED_COLUMNS:
+        phrases = {normalize_phrase(column)} | {normalize_phrase(s) for s in SYNONYMS.get(column, [])}
+        for phrase in phrases:
+            compact = phrase.replace(" ", "")
+            index.append((column, phrase, compact, frozenset(phrase.split()), Counter(compact)))
+    return index
+
+
+def _ratio_bound(compact: str, counts: Counter, synonym_compact: str, synonym_counts: Counter) -> float:
+    """Upper bound of SequenceMatcher.ratio() from shared characters (difflib's quick_ratio)"""
+    return 2 * sum((counts & synonym_counts).values()) / (len(compact) + len(synonym_compact))
+
+
+_INDEX = _build_index()
+
+
+def score_header(header, allowed: Optional[set] = None) -> Tuple[str, float]:
+    """Best predefined column for a header (optionally among `allowed` columns) and a 0-1 confidence"""
+    phrase = normalize_phrase(header)
+    if not phrase:
+        return "Unmapped", 0.0
+    return _score_phrase(phrase, frozenset(allowed) if allowed is not None else None)
+
+
+# Recurring feeds send the same spellings again and again
+@lru_cache(maxsize=SCORE_CACHE_SIZE)
+def _score_phrase(phrase: str, allowed: Optional[frozenset]) -> Tuple[str, float]:
+    compact = phrase.replace(" ", "")
+    tokens = frozenset(phrase.split())
+    counts = Counter(compact)
+
+    best_column, best_score = "Unmapped", 0.0
+    for column, synonym, synonym_compact, synonym_tokens, synonym_counts in _INDEX:
+        if allowed is not None and column not in allowed:
+            continue
+        if phrase == synonym:
+            return column, 1.0
+        if compact == synonym_compact:
+            score = 0.98
+        else:
+            overlap = len(tokens & synonym_tokens) / len(tokens | synonym_tokens)
+            score = 0.95 * overlap
+            # The full diff only runs when its result could still beat both the overlap and the best so far
+            if 0.95 * _ratio_bound(compact, counts, synonym_compact, synonym_counts) > max(score, best_score):
+                score = 0.95 * max(SequenceMatcher(None, compact, synonym_compact).ratio(), overlap)
+        if score > best_score:
+            best_column, best_score = column, score
+    return best_column, round(best_score, 2)
+
+
+def apply_value_evidence(header, column: str, confidence: float, profile: Dict[str, Any]) -> Tuple[str, float]:
+    """Let what the values look like confirm, redirect or weaken the header-based guess"""
+    candidates = TYPE_COLUMNS.get(profile["type"])
+    if not candidates or profile["match_rate"] < EVIDENCE_MATCH_RATE:
+        return column, confidence
+    if column in candidates:
+        return column, min(1.0, round(confidence + 0.05, 2))
+    if confidence >= EXACT_HEADER_SCORE:
+        return column, confidence
+    if len(candidates) == 1:
+        # Values like NPIs, ICD-10 codes or emails identify the column on their own
+        typed_column, typed_confidence = score_header(header, allowed=candidates)
+        return typed_column, max(typed_confidence, 0.9)
+    # Otherwise re-score among the columns the values fit; a weak result is left to the LLM
+    return score_header(header, allowed=candidates)
+
+
+def match_headers(
+    headers: List,
+    threshold: float = LOCAL_MATCH_THRESHOLD,
+    profiles: Optional[Dict[Any, Dict[str, Any]]] = None
+) -> Tuple[List[Dict[str, Any]], List]:
+    """
+    Match headers locally. Returns (matched, unresolved): mapping entries for headers scoring at
+    least `threshold`, in the same shape the LLM produces, and the headers left for the LLM.
+    Column profiles, when given, let value types confirm or correct the header match.
+    """
+    matched, unresolved = [], []
+    for header in headers:
+        column, confidence = score_header(header)
+        if profiles and header in profiles:
+            column, confidence = apply_value_evidence(header, column, confidence, profiles[header])
+        if confidence >= threshold:
+            matched.append({
+                "header": header,
+                "matched_column": column,
+                "llm_suggestion": column,
+                "confidence_score": confidence,
+                "mapping_source": "local",
+            })
+        else:
+            unresolved.append(header)
+    return matched, unresolved
@@ -0,0 +1,49 @@
+from app.models.file_import import FileImport
+
+UPLOADED = "Uploaded"
+MAPPING = "Mapping"
+QUEUED = "Queued"
+PROCESSING = "Processing"
+SUCCESS = "Success"
+FAILED = "Failed"
+
+PROCESSING_STATUSES = [UPLOADED, MAPPING, QUEUED, PROCESSING, SUCCESS, FAILED]
+
+# Uploaded -> Mapping (mappings confirmed) -> [Queued (background job)] -> Processing -> Success | Failed.
+# Mappings may be re-submitted until the insert starts. A failed import can be mapped and run again:
+# chunks commit one at a time, so record_mappings first discards the rows the failed run committed.
+# A successful one is final.
+ALLOWED_TRANSITIONS = {
+    UPLOADED: {MAPPING, FAILED},
+    MAPPING: {MAPPING, QUEUED, PROCESSING, FAILED},
+    QUEUED: {PROCESSING, FAILED},
+    PROCESSING: {SUCCESS, FAILED},
+    SUCCESS: set(),
+    FAILED: {MAPPING},
+}
+
+FINISHED_STATUSES = [SUCCESS, FAILED]
+
+
+class InvalidStatusTransition(ValueError):
+    def __init__(self, current: str, requested: str):
+        super().__init__(f"File import cannot move from {current} to {requested}")
+        self.current = current
+        self.requested = requested
+
+
+def can_transition(file_import: FileImport, status: str) -> bool:
+    return status in ALLOWED_TRANSITIONS.get(file_import.processing_status, set())
+
+
+def transition(file_import: FileImport, status: str):
+    """Move the import to `status` or raise InvalidStatusTransition; the caller commits"""
+    if not can_transition(file_import, status):
+        raise InvalidStatusTransition(file_import.processing_status, status)
+    file_import.processing_status = status
+
+
+def mark_failed(file_import: FileImport):
+    """Fail an import that has not finished yet (no-op otherwise); the caller commits"""
+    if file_import.processing_status not in FINISHED_STATUSES:
+        transition(file_import, FAILED)
@@ -0,0 +1,124 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from uuid import uuid4
+
+from app.services.import_status import QUEUED, PROCESSING, SUCCESS, FAILED, FINISHED_STATUSES
+
+# Jobs live in this process only: /process/jobs/{id}, /events and /ws answer 404 from any other
+# worker, so the API must run as a single worker process (uvicorn without --workers > 1).
+# The import's processing_status in the database stays correct either way.
+
+# Finished jobs kept for late subscribers; running jobs are never evicted
+INGEST_JOBS_KEPT = 200
+
+
+class IngestJob:
+    """
+    One background ingest: its status (the import's processing_status while the job owns it),
+    the latest progress snapshot, and the final result or error. Events are published from
+    the worker thread and fanned out to every subscriber's event loop.
+    """
+
+    def __init__(self, import_id):
+        self.job_id = str(uuid4())
+        self.import_id = str(import_id)
+        self.status = QUEUED
+        self.progress: Dict[str, Any] = {}
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.now(timezone.utc)
+        self.updated_at = self.created_at
+        self._lock = threading.Lock()
+        self._subscribers = []  # (loop, asyncio.Queue)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "import_id": self.import_id,
+            "status": self.status,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat(),
+        }
+
+    def started(self):
+        self._publish("status", status=PROCESSING)
+
+    def report_progress(self, progress: Dict[str, Any]):
+        self._publish("progress", progress=progress)
+
+    def succeeded(self, result: Dict[str, Any]):
+        # ingest_rows decides Success or Failed from the field success rate
+        status = result.get("processing_status", SUCCESS)
+        self._publish("done", status=status, result=result)
+
+    def failed(self, error: str):
+        self._publish("error", status=FAILED, error=error)
+
+    def _publish(self, event: str, **changes):
+        with self._lock:
+            for name, value in changes.items():
+                setattr(self, name, value)
+            self.updated_at = datetime.now(timezone.utc)
+            data = self.snapshot()
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, (event, data))
+            except RuntimeError:  # the subscriber's loop is gone
+                self._unsubscribe(loop, queue)
+
+    def _unsubscribe(self, loop, queue):
+        with self._lock:
+            if (loop, queue) in self._subscribers:
+                self._subscribers.remove((loop, queue))
+
+    async def events(self) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        The current state as a "status" event, then every event until the job finishes
+        ("done" or "error"). Safe to call from any number of connections.
+        """
+        loop, queue = asyncio.get_running_loop(), asyncio.Queue()
+        with self._lock:
+            # Registered under the lock, so no event falls between the snapshot and the queue
+            self._subscribers.append((loop, queue))
+            current, finished = self.snapshot(), self.finished
+        try:
+            yield ("done" if current["result"] else "error" if current["error"] else "status"), current
+            if finished:
+                return
+            while True:
+                event, data = await queue.get()
+                yield event, data
+                if event in ("done", "error"):
+                    return
+        finally:
+            self._unsubscribe(loop, queue)
+
+
+_jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+_jobs_lock = threading.Lock()
+
+
+def create_job(import_id) -> IngestJob:
+    job = IngestJob(import_id)
+    with _jobs_lock:
+        _jobs[job.job_id] = job
+        finished = [job_id for job_id, j in _jobs.items() if j.finished]
+        for job_id in finished[:max(0, len(_jobs) - INGEST_JOBS_KEPT)]:
+            del _jobs[job_id]
+    return job
+
+
+def get_job(job_id: str) -> Optional[IngestJob]:
+    with _jobs_lock:
+        return _jobs.get(job_id)
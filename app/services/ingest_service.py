@@ -0,0 +1,455 @@
+from sqlalchemy.orm import Session
+from app.core.database import SessionLocal
+from app.models.file_import import FileImport
+from app.models.processing_log import ProcessingLog
+from app.models.claim_model import Claim
+from app.models.claim_diagnose_model import ClaimDiagnose
+from app.models.patient_model import Patient
+from app.models.provider_model import Provider
+from app.models.policy_model import Policy
+from app.services.mapping_cache import store_mapping
+from app.services.mapping_history_index import get_history_index
+
+from app.services.stored_rows import iter_stored_rows
+from app.services.bulk_writer import BulkWriter
+from app.services.ingest_jobs import IngestJob
+from app.services.routing_plan import RoutingPlan
+from app.services.source_profile_service import find_source_profile, record_source_profile
+from app.services.import_status import transition, mark_failed, MAPPING, PROCESSING, SUCCESS, FAILED
+from app.core.config import INGEST_BATCH_ROWS
+
+from collections import defaultdict
+from itertools import chain, islice
+from typing import Optional, List, Dict, Any, Tuple, Iterable, Iterator, Callable
+
+# Failed rows kept for the response
+FAILED_RECORDS_SAMPLE = 5
+
+# Table name -> key in the response's entity counts
+ENTITY_COUNT_KEYS = {
+    "patient": "patients",
+    "provider": "providers",
+    "policy": "policies",
+    "claim": "claims",
+    "claim_diagnose": "diagnoses",
+}
+
+
+def record_mappings(db: Session, file_import: FileImport, mappings: List[dict], confirmed: bool = True):
+    """
+    Log the final mappings for an import and make them available to future uploads.
+    `confirmed` is False when they were applied without review (straight-through), so they are
+    logged but never become new evidence for the cache or the history matcher.
+    """
+    rerun = file_import.processing_status == FAILED
+    # Raises InvalidStatusTransition for imports that were already inserted
+    transition(file_import, MAPPING)
+    if rerun:
+        # Chunks commit one at a time, so a failed run may have left rows; the re-run inserts the whole file again
+        discarded = discard_import_rows(db, file_import)
+        print(f"Re-running failed import {file_import.import_id}: removed {discarded} claims of the earlier run")
+
+    # Process mappings and log them
+    for mapping in mappings:
+        log = ProcessingLog(
+            import_id=file_import.import_id,
+            header=mapping["header"],
+            llm_suggestion=mapping.get("llm_suggestion"),
+            final_mapping=mapping["final_mapping"],
+            confidence_score=mapping.get("confidence_score"),
+            user_edited_mapping=mapping.get('user_edited_mapping', False),
+            user_confirmed=confirmed
+        )
+        db.add(log)
+
+    db.commit()
+    if not confirmed:
+        return
+
+    # Confirmed mappings answer future uploads with the same header set
+    store_mapping(db, [m["header"] for m in mappings], [
+        {
+            "header": m["header"],
+            "matched_column": m.get("final_mapping") or "Unmapped",
+            "llm_suggestion": m.get("llm_suggestion"),
+            "confidence_score": 1.0 if m.get("user_edited_mapping") else m.get("confidence_score")
+        }
+        for m in mappings
+    ], confirmed=True)
+    # Make the new confirmed labels available to the history matcher right away
+    get_history_index(db, force_refresh=True)
+
+
+# Entities without a natural key are created per row: (model, its key, the claim column pointing at it,
+# other columns referencing it). Policies come before providers, a policy references its provider.
+_KEYLESS_ENTITIES = [
+    (Patient, Patient.member_id, Claim.patient_id, []),
+    (Policy, Policy.policy_number, Claim.policy_id, []),
+    (Provider, Provider.npi_number, Claim.provider_id, [Policy.provider_id]),
+]
+
+
+def discard_import_rows(db: Session, file_import: FileImport) -> int:
+    """
+    Delete the claims (and their diagnoses) an import inserted, plus the patients, providers and
+    policies without a natural key that only those claims used. Entities with a natural key are
+    shared across imports and upserted again on re-run, so they stay. The caller commits.
+    """
+    of_import = Claim.import_id == file_import.import_id
+    keyless = [
+        (model, claim_column, others, [row[0] for row in db.query(claim_column).join(model).filter(of_import, key.is_(None))])
+        for model, key, claim_column, others in _KEYLESS_ENTITIES
+    ]
+
+    claim_ids = db.query(Claim.claim_id).filter(of_import).scalar_subquery()
+    db.query(ClaimDiagnose).filter(ClaimDiagnose.claim_id.in_(claim_ids)).delete(synchronize_session=False)
+    discarded = db.query(Claim).filter(of_import).delete(synchronize_session=False)
+
+    for model, claim_column, others, ids in keyless:
+        if not ids:
+            continue
+        still_used = set()
+        for column in [claim_column, *others]:
+            still_used.update(row[0] for row in db.query(column).filter(column.in_(ids)))
+        orphans = [i for i in ids if i not in still_used]
+        if orphans:
+            primary_key = model.__table__.primary_key.columns.values()[0]
+            db.query(model).filter(primary_key.in_(orphans)).delete(synchronize_session=False)
+    return discarded
+
+
+def write_with_bisection(db: Session, writer: BulkWriter, items: List[Tuple[Any, Any, list]]):
+    """
+    Write staged rows (row, row_errors, entities) in one savepoint; if that fails, split the rows
+    in halves and retry each half in its own savepoint, down to single rows, so only genuinely
+    bad rows are rejected. Returns (rows written per table, [(item, error)] for rejected rows).
+    """
+    written, rejected = defaultdict(int), []
+    pending = [items]
+    while pending:
+        part = pending.pop()
+        for _, _, entities in part:
+            for model, values in entities:
+                writer.add(model, values)
+        try:
+            with db.begin_nested():
+                counts = writer.flush()
+        except Exception as e:
+            writer.discard()
+            if len(part) == 1:
+                rejected.append((part[0], e))
+            else:
+                middle = len(part) // 2
+                pending.extend([part[middle:], part[:middle]])
+        else:
+            writer.accept()
+            for table, count in counts.items():
+                written[table] += count
+    return written, rejected
+
+
+class _RowChunk:
+    """A chunk of row dicts, as posted by the browser or read back from storage"""
+
+    def __init__(self, rows: List[dict]):
+        self.rows = rows
+        self.size = len(rows)
+        self.headers = list(dict.fromkeys(chain.from_iterable(rows)))
+
+    def column(self, header) -> List[Any]:
+        return [row.get(header) for row in self.rows]
+
+    def present(self, header) -> Optional[List[bool]]:
+        """Which rows have the header at all; None when every row does"""
+        mask = [header in row for row in self.rows]
+        return None if all(mask) else mask
+
+    def width(self, index: int) -> int:
+        return len(self.rows[index])
+
+    def row(self, index: int) -> dict:
+        return self.rows[index]
+
+
+class _ColumnChunk:
+    """A chunk of a columnar payload: every row has every header, row dicts are only built for failures"""
+
+    def __init__(self, headers: List, columns: List[List[Any]], start: int, stop: int):
+        self._columns = {header: values[start:stop] for header, values in zip(headers, columns)}
+        self.headers = list(self._columns)
+        self.size = stop - start
+
+    def column(self, header) -> List[Any]:
+        return self._columns[header]
+
+    def present(self, header) -> Optional[List[bool]]:
+        return None
+
+    def width(self, index: int) -> int:
+        return len(self._columns)
+
+    def row(self, index: int) -> dict:
+        return {header: values[index] for header, values in self._columns.items()}
+
+
+def _row_chunks(rows: Iterable[dict]) -> Iterator[_RowChunk]:
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, INGEST_BATCH_ROWS))
+        if not chunk:
+            return
+        yield _RowChunk(chunk)
+
+
+def _column_chunks(headers: List, columns: List[List[Any]]) -> Iterator[_ColumnChunk]:
+    row_count = len(columns[0]) if columns else 0
+    for start in range(0, row_count, INGEST_BATCH_ROWS):
+        yield _ColumnChunk(headers, columns, start, min(start + INGEST_BATCH_ROWS, row_count))
+
+
+def ingest_rows(
+    db: Session,
+    file_import: FileImport,
+    mappings: List[dict],
+    rows: Iterable[dict],
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """
+    Clean and insert mapped rows, finalize the import's counts and status, and return the statistics.
+    `rows` may be a generator (rows streamed from the stored file); it is consumed once.
+    `progress` is called with running totals after every committed batch.
+    """
+    return _ingest_chunks(db, file_import, mappings, _row_chunks(rows), progress)
+
+
+def ingest_columns(
+    db: Session,
+    file_import: FileImport,
+    mappings: List[dict],
+    headers: List,
+    columns: List[List[Any]],
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """ingest_rows for a columnar payload: one list of cells per header, all of the same length"""
+    return _ingest_chunks(db, file_import, mappings, _column_chunks(headers, columns), progress)
+
+
+def _ingest_chunks(db: Session, file_import: FileImport, mappings: List[dict], chunks: Iterable, progress=None) -> Dict[str, Any]:
+    transition(file_import, PROCESSING)
+    db.commit()
+    try:
+        return _insert_chunks(db, file_import, mappings, chunks, progress)
+    except Exception:
+        # Batches committed so far stay; the import must not be left in Processing
+        db.rollback()
+        mark_failed(file_import)
+        db.commit()
+        raise
+
+
+def _insert_chunks(db: Session, file_import: FileImport, mappings: List[dict], chunks: Iterable, progress) -> Dict[str, Any]:
+    import_id = file_import.import_id
+
+    # Initialize counters
+    stats = {
+        'total_fields': 0,
+        'processed_fields': 0,
+        'failed_fields': 0,
+        'total_rows': 0,
+        'processed_rows': 0,
+        'failed_rows': 0,
+        'entity_counts': {
+            'patients': 0,
+            'providers': 0,
+            'policies': 0,
+            'claims': 0,
+            'diagnoses': 0
+        }
+    }
+
+    # Filter valid mappings
+    valid_mappings = [m for m in mappings if m.get("final_mapping")]
+    column_mapping = {str(m['header']): m['final_mapping'] for m in valid_mappings}
+
+    # Entity, slot and converter of every mapped header, worked out once for the whole file;
+    # date columns start from the formats this source's earlier imports were parsed with
+    profile = find_source_profile(db, file_import.filename, [m['header'] for m in mappings])
+    plan = RoutingPlan(column_mapping, profile.date_formats if profile else None)
+
+    failed_records = []
+    writer = BulkWriter(db)
+    batch = []  # ((chunk, index), row_errors, entities) waiting for the next bulk write
+
+    def record_failure(source, row_errors):
+        # Only a sample of failures is returned, so a bad million-row file does not hold every row
+        if len(failed_records) < FAILED_RECORDS_SAMPLE:
+            chunk, index = source
+            failed_records.append({
+                "import_id": import_id,
+                "row_data": chunk.row(index),
+                "errors": row_errors
+            })
+
+    def flush_batch():
+        # Each chunk is committed on its own, so a failure later in the file never undoes it
+        written, rejected = write_with_bisection(db, writer, batch)
+        db.commit()
+        for table, count in written.items():
+            stats['entity_counts'][ENTITY_COUNT_KEYS[table]] += count
+
+        rejected_ids = {id(item) for item, _ in rejected}
+        for item, row_error in rejected:
+            source, row_errors, _ = item
+            row_error = getattr(row_error, "orig", row_error)  # the driver's message, without the SQL echo
+            print(f"Error processing row: {row_error}")
+            record_failure(source, row_errors + [f"Database insertion error: {str(row_error)}"])
+        stats['failed_rows'] += len(rejected)
+        stats['processed_rows'] += len(batch) - len(rejected)
+        for item in batch:
+            if id(item) not in rejected_ids and item[1]:
+                record_failure(item[0], item[1])
+        batch.clear()
+
+        if progress:
+            progress({
+                "rows": {
+                    "total": stats['total_rows'],
+                    "successful": stats['processed_rows'],
+                    "failed": stats['failed_rows']
+                },
+                "fields": {
+                    "total": stats['total_fields'],
+                    "successful": stats['processed_fields'],
+                    "failed": stats['failed_fields']
+                },
+                "entities_created": dict(stats['entity_counts']),
+                "failed_records_sample": list(failed_records)
+            })
+
+    for chunk in chunks:
+        # Convert the chunk column by column; cells of headers a row lacks are computed but never read
+        columns = [
+            (route, chunk.present(route.header), *route.convert(chunk.column(route.header)))
+            for route in plan.bind(chunk.headers)
+        ]
+
+        for index in range(chunk.size):
+            stats['total_rows'] += 1
+            stats['total_fields'] += chunk.width(index)
+            row_errors = []
+            staged = plan.new_row()
+
+            for route, present, cleaned, errors in columns:
+                if present is not None and not present[index]:
+                    continue
+                error = errors[index]
+                if error:
+                    row_errors.append(f"{route.header}: {error}")
+                    stats['failed_fields'] += 1
+                    continue
+
+                stats['processed_fields'] += 1
+                plan.put(staged, route, cleaned[index])
+
+            if staged:
+                batch.append(((chunk, index), row_errors, plan.stage(import_id, staged)))
+                if len(batch) >= INGEST_BATCH_ROWS:
+                    flush_batch()
+            else:
+                stats['failed_rows'] += 1
+                record_failure((chunk, index), row_errors + ["No valid data fields found in row"])
+
+    if batch:
+        flush_batch()
+
+    date_formats = {
+        header: {"format": parser.date_format, "fallback_cells": parser.fallback_cells}
+        for header, parser in plan.date_parsers.items()
+    }
+    for header, detected in date_formats.items():
+        if detected["fallback_cells"]:
+            print(f"Date column {header}: {detected['fallback_cells']} cells did not match {detected['format']}")
+
+    # Update file import status
+    finalize_status = (stats['processed_fields'] / stats['total_fields'])*100 if stats['total_fields'] else 0
+    if finalize_status >= 70:
+        transition(file_import, SUCCESS)
+    else:
+        transition(file_import, FAILED)
+    file_import.records_extracted_from_file = stats['total_fields']
+    file_import.records_inserted_count = stats['processed_fields']
+    file_import.records_failed_to_insert_count = stats['failed_fields']
+    db.commit()
+
+    if file_import.processing_status == SUCCESS:
+        # The source's next delivery parses its date columns with the formats that worked here
+        record_source_profile(
+            db,
+            file_import.filename,
+            None,
+            date_formats={header: detected["format"] for header, detected in date_formats.items() if detected["format"]},
+            ingested=True
+        )
+
+    return {
+        "message": "Data processing completed",
+        "import_id": import_id,
+        "processing_status": file_import.processing_status,
+        "statistics": {
+            "fields": {
+                "total": stats['total_fields'],
+                "successful": stats['processed_fields'],
+                "failed": stats['failed_fields'],
+                "success_rate": f"{(stats['processed_fields']/stats['total_fields'])*100:.2f}%" if stats['total_fields'] > 0 else "0%"
+            },
+            "rows": {
+                "total": stats['total_rows'],
+                "successful": stats['processed_rows'],
+                "failed": stats['failed_rows'],
+                "success_rate": f"{(stats['processed_rows']/stats['total_rows'])*100:.2f}%" if stats['total_rows'] > 0 else "0%"
+            },
+            "entities_created": stats['entity_counts'],
+            "date_formats": date_formats
+        },
+        "failed_records_sample": failed_records  # Return sample of failures
+    }
+
+
+def run_ingest_job(
+    job: IngestJob,
+    mappings: List[dict],
+    rows: Optional[Iterable[dict]] = None,
+    columns: Optional[Tuple[List, List[List[Any]]]] = None
+):
+    """
+    Background variant with its own session, for ingests that outlive the request. The caller
+    has recorded the mappings and queued the import; rows come from `rows`, from `columns`
+    (headers, cells per header) or, with neither, from the stored file. Progress and the
+    outcome are published on `job`.
+    """
+    db = SessionLocal()
+    try:
+        file_import = db.query(FileImport).filter(FileImport.import_id == job.import_id).first()
+        if not file_import:
+            print(f"Ingest job: file import {job.import_id} not found")
+            job.failed("File import record not found")
+            return
+        job.started()
+        if columns is not None:
+            result = ingest_columns(db, file_import, mappings, *columns, progress=job.report_progress)
+        else:
+            if rows is None:
+                rows = chain.from_iterable(iter_stored_rows(db, file_import))
+            result = ingest_rows(db, file_import, mappings, rows, progress=job.report_progress)
+        print(f"Ingest job for {job.import_id} finished: {result['statistics']}")
+        job.succeeded(result)
+    except Exception as e:
+        db.rollback()
+        print(f"Ingest job for {job.import_id} failed: {e}")
+        file_import = db.query(FileImport).filter(FileImport.import_id == job.import_id).first()
+        if file_import:
+            mark_failed(file_import)
+            db.commit()
+        job.failed(str(getattr(e, "detail", e)))
+    finally:
+        db.close()
@@ -0,0 +1,158 @@
+import asyncio
+import hashlib
+import random
+import time
+from typing import Dict, List, Optional
+
+import google.generativeai as genai
+from app.core.config import (
+    GEMINI_MODEL,
+    LLM_TIMEOUT_SECONDS,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BASE_SECONDS,
+    LLM_MAX_CONCURRENCY,
+    LLM_CIRCUIT_FAILURES,
+    LLM_CIRCUIT_RESET_SECONDS,
+)
+from app.services.llm_providers import MappingProvider, create_provider
+
+try:
+    from google.api_core import exceptions as google_exceptions
+    _RETRYABLE = (
+        asyncio.TimeoutError,
+        ConnectionError,
+        google_exceptions.ResourceExhausted,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.DeadlineExceeded,
+        google_exceptions.InternalServerError,
+    )
+except ImportError:
+    _RETRYABLE = (asyncio.TimeoutError, ConnectionError)
+
+
+class LLMUnavailableError(RuntimeError):
+    """The LLM could not answer usefully: circuit open, retries exhausted, or a failed / unusable call"""
+
+
+_model = None
+
+
+def get_model():
+    """Shared GenerativeModel handle, created once per process"""
+    global _model
+    if _model is None:
+        _model = genai.GenerativeModel(GEMINI_MODEL)
+    return _model
+
+
+class AsyncLLMClient:
+    """
+    Async mapping-prompt client with a per-call deadline, jittered exponential retries, a circuit
+    breaker, a concurrency cap, and coalescing of identical in-flight prompts. Prompts are answered
+    by a MappingProvider (Gemini unless MAPPING_PROVIDER says otherwise).
+    """
+
+    def __init__(
+        self,
+        provider: Optional[MappingProvider] = None,
+        timeout: float = LLM_TIMEOUT_SECONDS,
+        max_retries: int = LLM_MAX_RETRIES,
+        retry_base: float = LLM_RETRY_BASE_SECONDS,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        circuit_failures: int = LLM_CIRCUIT_FAILURES,
+        circuit_reset: float = LLM_CIRCUIT_RESET_SECONDS,
+    ):
+        self._provider = provider
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.max_concurrency = max_concurrency
+        self.circuit_failures = circuit_failures
+        self.circuit_reset = circuit_reset
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+
+    @property
+    def provider(self) -> MappingProvider:
+        if self._provider is None:
+            self._provider = create_provider()
+        return self._provider
+
+    def set_provider(self, provider: MappingProvider):
+        """Swap the provider (benchmarks, tests) and start from a closed circuit"""
+        self._provider = provider
+        self._consecutive_failures = 0
+        self._opened_at = None
+
+    @property
+    def circuit_open(self) -> bool:
+        return self._opened_at is not None and time.monotonic() - self._opened_at < self.circuit_reset
+
+    async def generate(self, prompt: str, headers: Optional[List] = None) -> str:
+        """Return the model's text for a prompt; concurrent identical prompts share one call"""
+        key = hashlib.sha1(prompt.encode("utf-8")).hexdigest()
+        pending = self._inflight.get(key)
+        if pending is not None:
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise  # this caller was cancelled itself
+                # The leading call was cancelled (say, its SSE client went away): make the call here
+                return await self.generate(prompt, headers)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            text = await self._call_with_retries(prompt, headers or [])
+            future.set_result(text)
+            return text
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else was waiting
+            raise
+        finally:
+            if not future.done():
+                future.cancel()  # cancelled leader: release the callers waiting on it
+            del self._inflight[key]
+
+    def _record_failure(self):
+        self._consecutive_failures += 1
+        if self._consecutive_failures >= self.circuit_failures:
+            self._opened_at = time.monotonic()
+            print(f"LLM circuit breaker opened for {self.circuit_reset}s")
+
+    async def _call_with_retries(self, prompt: str, headers: List) -> str:
+        if self.circuit_open:
+            raise LLMUnavailableError("LLM circuit breaker is open")
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            # asyncio primitives belong to one event loop; scripts may run several in turn
+            self._semaphore, self._semaphore_loop = asyncio.Semaphore(self.max_concurrency), loop
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    text = await asyncio.wait_for(self.provider.generate(prompt, headers), self.timeout)
+                self._consecutive_failures = 0
+                self._opened_at = None
+                return text
+            except _RETRYABLE as e:
+                print(f"LLM call failed (attempt {attempt + 1}/{self.max_retries + 1}): {e!r}")
+                if attempt < self.max_retries:
+                    # Full jitter keeps a burst of retries from hitting the quota in lockstep
+                    await asyncio.sleep(random.uniform(0, self.retry_base * 2 ** attempt))
+            except Exception as e:
+                # Not worth retrying (bad request, missing fixture, ...), but still a failed call
+                print(f"LLM call failed: {e!r}")
+                self._record_failure()
+                raise LLMUnavailableError(f"LLM call failed: {e}") from e
+
+        self._record_failure()
+        raise LLMUnavailableError(f"LLM call failed after {self.max_retries + 1} attempts")
+
+
+llm_client = AsyncLLMClient()
@@ -0,0 +1,136 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+from typing import List, Optional
+
+from app.core.config import (
+    MAPPING_PROVIDER,
+    MAPPING_FIXTURES_DIR,
+    FAKE_LLM_LATENCY_MS,
+    FAKE_LLM_JITTER_MS,
+    FAKE_LLM_ERROR_RATE,
+    FAKE_LLM_SEED,
+)
+
+
+class FixtureMissingError(LookupError):
+    """Replay mode found no recorded response for a prompt"""
+
+
+def prompt_key(prompt: str) -> str:
+    return hashlib.sha1(prompt.encode("utf-8")).hexdigest()
+
+
+class MappingProvider:
+    """
+    Where mapping prompts are answered. `generate` returns the raw model text for a prompt;
+    `headers` are the file headers the prompt asks about, for providers that do not read prompts.
+    Retries, deadlines and the circuit breaker stay in AsyncLLMClient, around any provider.
+    """
+
+    name = "base"
+
+    async def generate(self, prompt: str, headers: List) -> str:
+        raise NotImplementedError
+
+
+class GeminiProvider(MappingProvider):
+    name = "gemini"
+
+    async def generate(self, prompt: str, headers: List) -> str:
+        from app.services.llm_client import get_model
+        response = await get_model().generate_content_async(prompt)
+        return response.text
+
+
+class FakeProvider(MappingProvider):
+    """
+    In-process stand-in: answers with the local header matcher's best guess after a simulated
+    latency, and fails a configurable share of calls with a retryable ConnectionError.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        latency_ms: float = FAKE_LLM_LATENCY_MS,
+        jitter_ms: float = FAKE_LLM_JITTER_MS,
+        error_rate: float = FAKE_LLM_ERROR_RATE,
+        seed: Optional[int] = FAKE_LLM_SEED
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self.calls = 0
+
+    async def generate(self, prompt: str, headers: List) -> str:
+        from app.services.header_matcher import score_header
+        self.calls += 1
+        await asyncio.sleep(max(0.0, self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000)
+        if self._random.random() < self.error_rate:
+            raise ConnectionError("Injected fake LLM failure")
+
+        mappings = []
+        for header in headers:
+            column, confidence = score_header(header)
+            if confidence < 0.6:
+                column, confidence = "Unmapped", 0.0
+            mappings.append({
+                "header": header,
+                "matched_column": column,
+                "llm_suggestion": column,
+                "confidence_score": confidence,
+            })
+        return json.dumps(mappings)
+
+
+class RecordingProvider(MappingProvider):
+    """Passes prompts to another provider and saves each response as a fixture for replay"""
+
+    name = "record"
+
+    def __init__(self, inner: MappingProvider, fixtures_dir: str = MAPPING_FIXTURES_DIR):
+        self.inner = inner
+        self.fixtures_dir = fixtures_dir
+
+    async def generate(self, prompt: str, headers: List) -> str:
+        text = await self.inner.generate(prompt, headers)
+        os.makedirs(self.fixtures_dir, exist_ok=True)
+        with open(os.path.join(self.fixtures_dir, f"{prompt_key(prompt)}.json"), "w", encoding="utf-8") as f:
+            json.dump({"provider": self.inner.name, "headers": [str(h) for h in headers], "prompt": prompt, "response": text}, f, indent=2)
+        return text
+
+
+class ReplayProvider(MappingProvider):
+    """Answers from recorded fixtures only; an unrecorded prompt goes to `fallback` or raises FixtureMissingError"""
+
+    name = "replay"
+
+    def __init__(self, fixtures_dir: str = MAPPING_FIXTURES_DIR, fallback: Optional[MappingProvider] = None):
+        self.fixtures_dir = fixtures_dir
+        self.fallback = fallback
+
+    async def generate(self, prompt: str, headers: List) -> str:
+        path = os.path.join(self.fixtures_dir, f"{prompt_key(prompt)}.json")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)["response"]
+        if self.fallback is not None:
+            return await self.fallback.generate(prompt, headers)
+        raise FixtureMissingError(f"No recorded response for prompt {prompt_key(prompt)} in {self.fixtures_dir}")
+
+
+def create_provider(name: str = MAPPING_PROVIDER) -> MappingProvider:
+    """Provider for MAPPING_PROVIDER: gemini, fake, record (gemini, saving fixtures) or replay"""
+    if name == "gemini":
+        return GeminiProvider()
+    if name == "fake":
+        return FakeProvider()
+    if name == "record":
+        return RecordingProvider(GeminiProvider())
+    if name == "replay":
+        return ReplayProvider()
+    raise ValueError(f"Unknown mapping provider: {name}")
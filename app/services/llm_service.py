@@ -2,6 +2,12 @@ import google.generativeai as genai
 from decouple import config
 import os 
 import json
+import hashlib
+import tempfile
+from typing import Optional
+from app.services.column_profiler import profile_columns, signature_text, PROFILE_EXAMPLES, EXAMPLE_MAX_CHARS
+from app.core.config import MAPPING_PROMPT_TOKEN_BUDGET
+from app.services.llm_client import get_model, llm_client, LLMUnavailableError
 
 
 
@@ -16,21 +22,89 @@ PREDEFINED_COLUMNS = [
     "amount_claimed", "amount_approved", "claim_status", "rejection_reason", "diagnosis_code","diagnosis_description"
 ]
 
-def generate_mapping_with_llm(headers: list, samples: list):
-    prompt = f"""
+# Example-value settings tried in order (examples per column, max characters each) until the prompt fits
+_EXAMPLE_STEPS = [(PROFILE_EXAMPLES, EXAMPLE_MAX_CHARS), (2, EXAMPLE_MAX_CHARS), (1, 24), (0, 0)]
+
+_encoder = None
+
+# tiktoken downloads this file on first use; it is only used when already cached, never fetched
+_CL100K_URL = "https://openaipublic.blob.core.windows.net/encodings/cl100k_base.tiktoken"
+
+
+def _cached_encoder():
+    """tiktoken's cl100k_base encoding if its BPE file is in tiktoken's cache, else None"""
+    cache_dir = os.environ.get("TIKTOKEN_CACHE_DIR") or os.environ.get("DATA_GYM_CACHE_DIR") \
+        or os.path.join(tempfile.gettempdir(), "data-gym-cache")
+    if not os.path.exists(os.path.join(cache_dir, hashlib.sha1(_CL100K_URL.encode()).hexdigest())):
+        return None
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Token count with tiktoken when its encoding is cached locally, else a 4-chars-per-token estimate"""
+    global _encoder
+    if _encoder is None:
+        _encoder = _cached_encoder() or False
+    if _encoder:
+        return len(_encoder.encode(text))
+    return (len(text) + 3) // 4
+
+
+def format_signatures(headers: list, signatures: dict, max_examples: int = PROFILE_EXAMPLES, max_chars: int = EXAMPLE_MAX_CHARS) -> str:
+    """One compact line per column: its value type signature plus a few distinct, truncated example values"""
+    lines = []
+    for header in headers:
+        profile = signatures.get(header)
+        if not profile:
+            lines.append(f"- {header}")
+            continue
+        line = f"- {header}: {signature_text(profile)}"
+        examples = [str(e)[:max_chars] for e in profile.get("examples", [])[:max_examples]]
+        if examples:
+            line += "; e.g. " + ", ".join(examples)
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def build_mapping_prompt(
+    headers: list,
+    samples: list,
+    signatures: Optional[dict] = None,
+    budget: int = MAPPING_PROMPT_TOKEN_BUDGET
+) -> str:
+    """
+    Mapping prompt for `headers` only (callers pass just the columns still unresolved).
+    Each column is one line of header, value signature and examples; examples are cut
+    back until the prompt fits `budget` tokens.
+    """
+    if not signatures:
+        signatures = profile_columns(headers, samples)
+
+    prompt = ""
+    for max_examples, max_chars in _EXAMPLE_STEPS:
+        prompt = _render_prompt(format_signatures(headers, signatures, max_examples, max_chars))
+        if count_tokens(prompt) <= budget:
+            return prompt
+    print(f"Mapping prompt for {len(headers)} headers exceeds the {budget}-token budget without examples")
+    return prompt
+
+
+def _render_prompt(columns: str) -> str:
+    return f"""
 
 You are a medical health insurance claim data integration assistant. Your task is to accurately map file headers to a predefined health claim insurance schema.
 
 Given the following information:
 
 **Predefined Health Claim Insurance Schema:**
-{PREDEFINED_COLUMNS}
-
-**File Headers:**
-{headers}
+{", ".join(PREDEFINED_COLUMNS)}
 
-**Sample Rows (first 5–7 for context):**
-{samples}
+**File Headers (one per line, with detected value type, share of values matching, nulls, distinct count, examples):**
+{columns}
 
 For each `header` from the provided `File Headers`, identify the single most relevant `matched_column` from the `Predefined Health Claim Insurance Schema`. Assign a `confidence_score` between 0 and 1, indicating your certainty of the match.
 
@@ -51,10 +125,10 @@ Output format:
 ]
 """
 
-    model = genai.GenerativeModel('gemini-2.0-flash')
-    response = model.generate_content(prompt)
-    
-    raw_text = response.text.strip()
+
+
+def parse_mapping_response(raw_text: str):
+    raw_text = raw_text.strip()
     
     if raw_text.startswith("```json"):
         raw_text = raw_text.strip("```json").strip("```").strip()
@@ -64,4 +138,19 @@ Output format:
         return mapping_result
     except json.JSONDecodeError as e:
         raise ValueError(f"Failed to parse JSON from Gemini: {e}\nRaw Output:\n{raw_text}")
-    
+
+
+def generate_mapping_with_llm(headers: list, samples: list, signatures: Optional[dict] = None):
+    prompt = build_mapping_prompt(headers, samples, signatures)
+    response = get_model().generate_content(prompt)
+    return parse_mapping_response(response.text)
+
+
+async def generate_mapping_async(headers: list, samples: list, signatures: Optional[dict] = None):
+    """Same as generate_mapping_with_llm, without blocking the event loop; raises LLMUnavailableError"""
+    prompt = build_mapping_prompt(headers, samples, signatures)
+    raw_text = await llm_client.generate(prompt, headers)
+    try:
+        return parse_mapping_response(raw_text)
+    except ValueError as e:
+        raise LLMUnavailableError(str(e)) from e
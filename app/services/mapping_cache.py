@@ -0,0 +1,156 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Optional, List, Dict, Any, Tuple
+from sqlalchemy.orm import Session
+from app.core.config import MAPPING_CACHE_SIZE, MAPPING_CACHE_DB_MAX
+from app.models.mapping_cache import MappingCacheEntry
+from app.services.header_fingerprint import header_fingerprint, normalize_header
+from app.services.llm_service import PREDEFINED_COLUMNS
+
+# Cached mappings are only valid for the schema they were produced against
+SCHEMA_VERSION = "v1-" + hashlib.sha1(",".join(PREDEFINED_COLUMNS).encode("utf-8")).hexdigest()[:12]
+
+_MAPPING_FIELDS = ("matched_column", "llm_suggestion", "confidence_score")
+
+
+class LRUCache:
+    """Small thread-safe LRU used as the in-process tier"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_memory_tier = LRUCache(MAPPING_CACHE_SIZE)
+
+
+def _apply_entry(entry: Dict[str, Dict[str, Any]], headers: List) -> List[Dict[str, Any]]:
+    """Re-key a cached mapping (stored by normalized header) to this file's own header spellings"""
+    result = []
+    for header in headers:
+        mapped = entry.get(normalize_header(header), {})
+        result.append({
+            "header": header,
+            "matched_column": mapped.get("matched_column", "Unmapped"),
+            "llm_suggestion": mapped.get("llm_suggestion", "Unmapped"),
+            "confidence_score": mapped.get("confidence_score", 0.0),
+        })
+    return result
+
+
+def get_cached_mapping(db: Optional[Session], headers: List) -> Optional[List[Dict[str, Any]]]:
+    """Return the mapping for a known header set from the LRU, then the DB tier; None on a miss"""
+    key = header_fingerprint(headers)
+    entry = _memory_tier.get(key)
+
+    if entry is None and db is not None:
+        row = db.query(MappingCacheEntry).filter(
+            MappingCacheEntry.fingerprint == key,
+            MappingCacheEntry.schema_version == SCHEMA_VERSION
+        ).first()
+        if row:
+            entry = row.mapping
+            row.hit_count = (row.hit_count or 0) + 1
+            row.last_used_at = datetime.now(timezone.utc)
+            db.commit()
+            _memory_tier.put(key, entry)
+
+    if entry is None:
+        return None
+    return _apply_entry(entry, headers)
+
+
+def get_mapping_template(db: Session, headers: List) -> Optional[Tuple[List[Dict[str, Any]], float]]:
+    """
+    A user-confirmed mapping for this header set and its confidence (lowest score among mapped
+    headers), or None. Only confirmed entries qualify for processing without review.
+    """
+    row = db.query(MappingCacheEntry).filter(
+        MappingCacheEntry.fingerprint == header_fingerprint(headers),
+        MappingCacheEntry.schema_version == SCHEMA_VERSION,
+        MappingCacheEntry.confirmed.is_(True)
+    ).first()
+    if row is None:
+        return None
+    mapping = _apply_entry(row.mapping, headers)
+    scores = [m["confidence_score"] or 0.0 for m in mapping if m["matched_column"] != "Unmapped"]
+    return mapping, min(scores) if scores else 0.0
+
+
+def store_mapping(db: Optional[Session], headers: List, mapping_result: List[Dict[str, Any]], confirmed: bool = False):
+    """Cache a mapping under the header-set fingerprint in both tiers"""
+    key = header_fingerprint(headers)
+    entry = {
+        normalize_header(m["header"]): {field: m.get(field) for field in _MAPPING_FIELDS}
+        for m in mapping_result if m.get("header") is not None
+    }
+    if db is None:
+        _memory_tier.put(key, entry)
+        return
+
+    row = db.query(MappingCacheEntry).filter(
+        MappingCacheEntry.fingerprint == key,
+        MappingCacheEntry.schema_version == SCHEMA_VERSION
+    ).first()
+    if row:
+        # An unconfirmed (LLM-only) mapping never overwrites a user-confirmed one
+        if row.confirmed and not confirmed:
+            return
+        row.mapping = entry
+        row.headers = [str(h) for h in headers]
+        row.confirmed = row.confirmed or confirmed
+        row.last_used_at = datetime.now(timezone.utc)
+    else:
+        db.add(MappingCacheEntry(
+            fingerprint=key,
+            schema_version=SCHEMA_VERSION,
+            headers=[str(h) for h in headers],
+            mapping=entry,
+            confirmed=confirmed,
+            hit_count=0
+        ))
+    db.commit()
+    _memory_tier.put(key, entry)
+    _evict_persisted(db)
+
+
+def _evict_persisted(db: Session):
+    """Drop rows from older schema versions and the least recently used rows beyond the cap"""
+    db.query(MappingCacheEntry).filter(
+        MappingCacheEntry.schema_version != SCHEMA_VERSION
+    ).delete(synchronize_session=False)
+
+    overflow = db.query(MappingCacheEntry).count() - MAPPING_CACHE_DB_MAX
+    if overflow > 0:
+        stale = [
+            fingerprint for (fingerprint,) in
+            db.query(MappingCacheEntry.fingerprint)
+            .order_by(MappingCacheEntry.last_used_at.asc())
+            .limit(overflow)
+            .all()
+        ]
+        db.query(MappingCacheEntry).filter(
+            MappingCacheEntry.fingerprint.in_(stale)
+        ).delete(synchronize_session=False)
+    db.commit()
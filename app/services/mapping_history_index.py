@@ -0,0 +1,153 @@
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+from typing import List, Dict, Any, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.core.config import HISTORY_MATCH_THRESHOLD, HISTORY_REFRESH_SECONDS
+from app.models.processing_log import ProcessingLog
+from app.services.header_fingerprint import normalize_header
+
+NGRAM_SIZE = 3
+
+# Posting lists longer than this are skipped when collecting lookup candidates
+CANDIDATE_POSTING_LIMIT = 64
+
+# Votes a confirmed mapping adds; a user correction is the strongest label we have
+USER_EDITED_WEIGHT = 3.0
+CONFIRMED_WEIGHT = 1.0
+
+# Logs are re-read this far behind the watermark, because a transaction that started
+# earlier can commit rows with an older timestamp after a refresh has passed them
+REFRESH_OVERLAP = timedelta(minutes=5)
+
+
+def _ngrams(normalized: str) -> frozenset:
+    padded = f"#{normalized}#"
+    if len(padded) <= NGRAM_SIZE:
+        return frozenset([padded])
+    return frozenset(padded[i:i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1))
+
+
+class MappingHistoryIndex:
+    """
+    Character n-gram index over headers from user-confirmed ProcessingLog history.
+    Each distinct normalized header keeps weighted votes for the columns it was confirmed as,
+    and lookups return the nearest known spelling by Dice similarity of n-gram sets.
+    """
+
+    def __init__(self):
+        self._votes = defaultdict(lambda: defaultdict(float))  # header -> column -> weight
+        self._grams = {}  # header -> n-gram set
+        self._postings = defaultdict(set)  # n-gram -> headers containing it
+        self._watermark = None
+        self._recent_ids = {}  # log_id -> timestamp, for logs inside the overlap window
+        self._last_refresh = 0.0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._grams)
+
+    def add(self, header: str, column: Optional[str], user_edited: bool = False):
+        normalized = normalize_header(header)
+        if not normalized or not column:
+            return
+        column = "Unmapped" if column.lower() == "unmapped" else column
+        with self._lock:
+            if normalized not in self._grams:
+                grams = _ngrams(normalized)
+                self._grams[normalized] = grams
+                for gram in grams:
+                    self._postings[gram].add(normalized)
+            self._votes[normalized][column] += USER_EDITED_WEIGHT if user_edited else CONFIRMED_WEIGHT
+
+    def refresh(self, db: Session, force: bool = False):
+        """Index ProcessingLog rows written since the last refresh"""
+        with self._refresh_lock:
+            if not force and time.monotonic() - self._last_refresh < HISTORY_REFRESH_SECONDS:
+                return
+            self._last_refresh = time.monotonic()
+            self._index_new_logs(db)
+
+    def _index_new_logs(self, db: Session):
+        query = db.query(
+            ProcessingLog.log_id,
+            ProcessingLog.log_timestamp,
+            ProcessingLog.header,
+            ProcessingLog.final_mapping,
+            ProcessingLog.user_edited_mapping
+        ).filter(
+            ProcessingLog.final_mapping.isnot(None),
+            # Straight-through imports log auto-applied mappings; learning from them would let
+            # an unreviewed mapping reinforce itself
+            ProcessingLog.user_confirmed.isnot(False)
+        )
+        if self._watermark is not None:
+            query = query.filter(ProcessingLog.log_timestamp > self._watermark - REFRESH_OVERLAP)
+
+        for log_id, timestamp, header, final_mapping, user_edited in query.order_by(ProcessingLog.log_timestamp):
+            if log_id in self._recent_ids:
+                continue
+            self.add(header, final_mapping, bool(user_edited))
+            self._recent_ids[log_id] = timestamp
+            if timestamp and (self._watermark is None or timestamp > self._watermark):
+                self._watermark = timestamp
+
+        if self._watermark is not None:
+            cutoff = self._watermark - REFRESH_OVERLAP
+            self._recent_ids = {i: t for i, t in self._recent_ids.items() if t is None or t > cutoff}
+
+    def lookup(self, header) -> Tuple[Optional[str], float]:
+        """Nearest confirmed column for a header spelling and a 0-1 confidence"""
+        normalized = normalize_header(header)
+        if not normalized:
+            return None, 0.0
+        grams = _ngrams(normalized)
+
+        with self._lock:
+            # Gather candidates from the rarest n-grams first; very common n-grams ("dat", "ate")
+            # are only used when nothing rarer matched, which keeps lookups sub-millisecond
+            candidates = set()
+            for posting in sorted((self._postings.get(gram, ()) for gram in grams), key=len):
+                if candidates and len(posting) > CANDIDATE_POSTING_LIMIT:
+                    break
+                candidates.update(posting)
+            if not candidates:
+                return None, 0.0
+
+            best, similarity = max(
+                ((c, 2 * len(grams & self._grams[c]) / (len(grams) + len(self._grams[c]))) for c in candidates),
+                key=lambda item: item[1]
+            )
+            votes = self._votes[best]
+            column = max(votes, key=votes.get)
+            agreement = votes[column] / sum(votes.values())
+        return column, round(similarity * agreement, 2)
+
+    def match_headers(self, headers: List, threshold: float = HISTORY_MATCH_THRESHOLD) -> Tuple[List[Dict[str, Any]], List]:
+        """Same (matched, unresolved) contract as the local header matcher"""
+        matched, unresolved = [], []
+        for header in headers:
+            column, confidence = self.lookup(header)
+            if column and confidence >= threshold:
+                matched.append({
+                    "header": header,
+                    "matched_column": column,
+                    "llm_suggestion": column,
+                    "confidence_score": confidence,
+                    "mapping_source": "history",
+                })
+            else:
+                unresolved.append(header)
+        return matched, unresolved
+
+
+_history_index = MappingHistoryIndex()
+
+
+def get_history_index(db: Optional[Session] = None, force_refresh: bool = False) -> MappingHistoryIndex:
+    """The process-wide index, brought up to date with new ProcessingLog rows when a session is given"""
+    if db is not None:
+        _history_index.refresh(db, force=force_refresh)
+    return _history_index
@@ -0,0 +1,186 @@
+import asyncio
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from app.core.config import MAPPING_CHUNK_SIZE
+from app.services.llm_service import generate_mapping_async
+from app.services.llm_client import LLMUnavailableError
+from app.services.mapping_cache import get_cached_mapping, store_mapping
+from app.services.header_matcher import match_headers, score_header
+from app.services.column_profiler import profile_columns
+from app.services.mapping_history_index import get_history_index
+
+# Placeholder headers for unstructured document text; their mapping depends on the content
+CONTENT_HEADERS = [["extracted_text"], ["structured_content"]]
+
+# Schema columns several file headers may map to (each diagnosis header becomes its own ClaimDiagnose)
+MULTI_VALUE_COLUMNS = {"diagnosis_code", "diagnosis_description"}
+
+# Below this, a local guess made while the LLM is unavailable is returned as Unmapped
+FALLBACK_MIN_CONFIDENCE = 0.6
+
+
+def _tag(mappings: List[Dict[str, Any]], source: str) -> List[Dict[str, Any]]:
+    for mapping in mappings:
+        mapping.setdefault("mapping_source", source)
+    return mappings
+
+
+def _in_header_order(headers: List, mappings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One entry per file header, in file order; headers nobody mapped come back Unmapped"""
+    by_header = {str(m.get("header")): m for m in mappings}
+    ordered = []
+    for header in headers:
+        mapping = by_header.get(str(header))
+        if mapping is None:
+            mapping = {
+                "header": header,
+                "matched_column": "Unmapped",
+                "llm_suggestion": "Unmapped",
+                "confidence_score": 0.0,
+                "mapping_source": "none",
+            }
+        ordered.append(mapping)
+    return ordered
+
+
+def _most_confident(headers: List, *candidates: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Per header, the highest-confidence entry across matchers (earlier matchers win ties)"""
+    best = {}
+    for mappings in candidates:
+        for mapping in mappings:
+            key = str(mapping["header"])
+            if key not in best or mapping["confidence_score"] > best[key]["confidence_score"]:
+                best[key] = mapping
+    return best
+
+
+def resolve_conflicts(mappings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    When several headers claim the same single-value column, the most confident one keeps it
+    (the earlier header on ties) and the others are returned Unmapped with the winner noted.
+    """
+    winners = {}
+    for mapping in mappings:
+        column = mapping.get("matched_column")
+        if not column or column.lower() == "unmapped" or column in MULTI_VALUE_COLUMNS:
+            continue
+        current = winners.get(column)
+        if current is None or (mapping.get("confidence_score") or 0) > (current.get("confidence_score") or 0):
+            winners[column] = mapping
+
+    conflicts = 0
+    for mapping in mappings:
+        winner = winners.get(mapping.get("matched_column"))
+        if winner is not None and winner is not mapping:
+            mapping.update({"matched_column": "Unmapped", "confidence_score": 0.0, "conflict_with": winner["header"]})
+            conflicts += 1
+    if conflicts:
+        print(f"Unmapped {conflicts} headers that lost a duplicate column claim")
+    return mappings
+
+
+def _local_fallback(headers: List) -> List[Dict[str, Any]]:
+    """Best local guesses for headers the LLM could not map, so uploads degrade instead of failing"""
+    fallback = []
+    for header in headers:
+        column, confidence = score_header(header)
+        if confidence < FALLBACK_MIN_CONFIDENCE:
+            column, confidence = "Unmapped", 0.0
+        fallback.append({
+            "header": header,
+            "matched_column": column,
+            "llm_suggestion": column,
+            "confidence_score": confidence,
+            "mapping_source": "local_fallback",
+        })
+    return fallback
+
+
+async def _llm_or_fallback(headers: List, samples: List[dict], signatures: Optional[dict] = None) -> List[Dict[str, Any]]:
+    try:
+        return _tag(await generate_mapping_async(headers, samples, signatures), "llm")
+    except LLMUnavailableError as e:
+        print(f"LLM unavailable, using local fallback for {len(headers)} headers: {e}")
+        # Scores every header against every synonym: up to MAX_UPLOAD_HEADERS of them, so not on the loop
+        return await run_in_threadpool(_local_fallback, headers)
+
+
+async def _map_in_chunks(headers: List, samples: List[dict], signatures: Optional[dict] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Wide header sets go out as several smaller prompts in parallel (bounded by the LLM client's
+    concurrency cap); each chunk's mappings are yielded as soon as that chunk is answered.
+    """
+    chunks = [headers[i:i + MAPPING_CHUNK_SIZE] for i in range(0, len(headers), MAPPING_CHUNK_SIZE)]
+    if len(chunks) > 1:
+        print(f"Mapping {len(headers)} headers in {len(chunks)} chunks")
+    for answered in asyncio.as_completed([
+        _llm_or_fallback(chunk, [{h: row.get(h) for h in chunk} for row in samples], signatures)
+        for chunk in chunks
+    ]):
+        yield await answered
+
+
+def _match_locally(db: Optional[Session], headers: List, samples: List[dict]):
+    """
+    Profile the columns and match headers against history and the local matcher.
+    Returns (profiles, resolved mappings by header, unresolved headers). Blocking: reads
+    ProcessingLog on a history refresh and scores every header, so it runs in a worker thread.
+    """
+    profiles = profile_columns(headers, samples)
+    history, _ = get_history_index(db).match_headers(headers)
+    local, _ = match_headers(headers, profiles=profiles)
+    resolved = _most_confident(headers, history, local)
+    unresolved = [h for h in headers if str(h) not in resolved]
+    return profiles, resolved, unresolved
+
+
+async def iter_mapping_stages(db: Optional[Session], headers: List, samples: List[dict]) -> AsyncIterator[Tuple[str, List[Dict[str, Any]]]]:
+    """
+    Map file headers to the predefined schema, yielding (stage, mappings) as each stage finishes:
+    "cache" for a known header set, "local" for history and local matcher hits, "llm" per answered
+    prompt, and always a closing "final" with one conflict-free entry per header in file order.
+
+    Only headers the earlier stages could not resolve are sent to the LLM. If the LLM is
+    unavailable those headers get low-confidence local guesses. Database reads/writes and
+    column profiling run in the threadpool, so a burst of uploads does not stall the event loop.
+    """
+    cacheable = list(headers) not in CONTENT_HEADERS
+    if not cacheable:
+        llm = await _llm_or_fallback(headers, samples)
+        yield "llm", llm
+        yield "final", resolve_conflicts(llm)
+        return
+
+    cached = await run_in_threadpool(get_cached_mapping, db, headers)
+    if cached is not None:
+        print(f"Mapping cache hit for {len(headers)} headers")
+        yield "cache", _tag(cached, "cache")
+        yield "final", cached
+        return
+
+    profiles, resolved, unresolved = await run_in_threadpool(_match_locally, db, headers, samples)
+    print(f"History/local matchers mapped {len(resolved)}/{len(headers)} headers")
+    yield "local", list(resolved.values())
+
+    llm = []
+    if unresolved:
+        # Only the unresolved columns go into the prompts, described by their type signatures
+        async for chunk_result in _map_in_chunks(unresolved, samples, profiles):
+            llm.extend(chunk_result)
+            yield "llm", chunk_result
+
+    result = resolve_conflicts(_in_header_order(headers, list(resolved.values()) + llm))
+    if not any(m["mapping_source"] == "local_fallback" for m in result):
+        # Degraded answers are not cached, so the next upload of this header set asks the LLM again
+        await run_in_threadpool(store_mapping, db, headers, result)
+    yield "final", result
+
+
+async def resolve_mappings(db: Optional[Session], headers: List, samples: List[dict]) -> List[Dict[str, Any]]:
+    """Map file headers to the predefined schema: cache, then history/local matchers, then the LLM"""
+    result = []
+    async for stage, mappings in iter_mapping_stages(db, headers, samples):
+        if stage == "final":
+            result = mappings
+    return result
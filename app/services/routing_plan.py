@@ -0,0 +1,146 @@
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from uuid import uuid4
+
+from app.models.claim_model import Claim
+from app.models.claim_diagnose_model import ClaimDiagnose
+from app.models.patient_model import Patient
+from app.models.provider_model import Provider
+from app.models.policy_model import Policy
+from app.services.column_cleaner import clean_column, is_date_column, DateColumnParser
+
+# Entities a mapped column can feed; any target not listed below is a claim attribute
+PATIENT, PROVIDER, POLICY, CLAIM, DIAGNOSIS = range(5)
+
+ENTITY_TARGETS = {
+    PATIENT: ["member_id", "first_name", "last_name", "dob", "gender", "email", "phone", "address"],
+    PROVIDER: ["npi_number", "provider_name"],
+    POLICY: ["policy_number", "plan_name", "group_number", "policy_start_date", "policy_end_date"],
+    DIAGNOSIS: ["diagnosis_code", "diagnosis_description"],
+}
+
+ENTITY_MODELS = {PATIENT: Patient, PROVIDER: Provider, POLICY: Policy, CLAIM: Claim, DIAGNOSIS: ClaimDiagnose}
+
+# Slot value of a row that had no (valid) cell for it
+UNSET = object()
+
+
+def entity_of(target_column: str) -> int:
+    for entity, targets in ENTITY_TARGETS.items():
+        if target_column in targets:
+            return entity
+    return CLAIM
+
+
+class Route(NamedTuple):
+    header: Any
+    target_column: str
+    entity: int
+    slot: Optional[int]  # None: the model has no such column, the value is validated but not stored
+    convert: Callable[[List[Any]], Tuple[List[Any], List[Optional[str]]]]
+
+
+class StagedRow:
+    """A row's cleaned values by slot; diagnoses are (column, value) pairs, one claim_diagnose each"""
+    __slots__ = ("values", "present", "diagnoses")
+
+    def __init__(self, slot_count: int):
+        self.values = [UNSET] * slot_count
+        self.present = [False] * 4  # patient, provider, policy, claim had any valid cell
+        self.diagnoses: List[Tuple[str, Any]] = []
+
+    def __bool__(self):
+        return any(self.present) or bool(self.diagnoses)
+
+
+class RoutingPlan:
+    """
+    An import's column mapping compiled once: every mapped header gets its entity, its slot in
+    the staged row and its converter (clean_column, with one DateColumnParser per date column),
+    and every model gets the (column, slot) pairs it is built from. `date_formats` (header ->
+    format, from the source's profile) seeds the date parsers instead of inferring a format.
+    """
+
+    def __init__(self, column_mapping: Dict[str, str], date_formats: Optional[Dict[str, str]] = None):
+        self.date_parsers: Dict[str, DateColumnParser] = {}
+        self._slots: Dict[str, int] = {}
+        self._routes: Dict[str, Route] = {}
+        self._bound: Dict[Tuple, List[Route]] = {}
+
+        for header, target_column in column_mapping.items():
+            entity = entity_of(target_column)
+            slot = None
+            if entity != DIAGNOSIS and target_column in ENTITY_MODELS[entity].__table__.columns:
+                slot = self._slots.setdefault(target_column, len(self._slots))
+
+            date_parser = None
+            if is_date_column(target_column):
+                date_parser = self.date_parsers[header] = DateColumnParser((date_formats or {}).get(header))
+            convert = partial(clean_column, target_column, date_parser=date_parser)
+            self._routes[header] = Route(header, target_column, entity, slot, convert)
+
+        self._columns = {
+            entity: [(target_column, slot) for target_column, slot in self._slots.items() if entity_of(target_column) == entity]
+            for entity in (PATIENT, PROVIDER, POLICY, CLAIM)
+        }
+
+    def bind(self, headers: Iterable) -> List[Route]:
+        """Routes for a batch's source columns, in source order; unmapped columns are skipped"""
+        headers = tuple(headers)
+        if headers not in self._bound:
+            self._bound[headers] = [
+                self._routes[str(header)]._replace(header=header) for header in headers if str(header) in self._routes
+            ]
+        return self._bound[headers]
+
+    def new_row(self) -> StagedRow:
+        return StagedRow(len(self._slots))
+
+    @staticmethod
+    def put(row: StagedRow, route: Route, value: Any):
+        if route.entity == DIAGNOSIS:
+            row.diagnoses.append((route.target_column, value))
+            return
+        row.present[route.entity] = True
+        if route.slot is not None:
+            row.values[route.slot] = value
+
+    def _values(self, entity: int, row: StagedRow) -> Dict[str, Any]:
+        values = row.values
+        return {column: values[slot] for column, slot in self._columns[entity] if values[slot] is not UNSET}
+
+    def stage(self, import_id, row: StagedRow) -> List[Tuple[Any, Dict[str, Any]]]:
+        """
+        The row's claim graph as (model, values) pairs for the bulk writer. IDs are generated here
+        so children can reference their parents before anything is written.
+        """
+        present = row.present
+        entities = []
+        patient_id = None
+        if present[PATIENT]:
+            patient_id = uuid4()
+            entities.append((Patient, {"patient_id": patient_id, **self._values(PATIENT, row)}))
+
+        provider_id = None
+        if present[PROVIDER]:
+            provider_id = uuid4()
+            entities.append((Provider, {"provider_id": provider_id, **self._values(PROVIDER, row)}))
+
+        policy_id = None
+        if present[POLICY] and provider_id:
+            policy_id = uuid4()
+            entities.append((Policy, {"policy_id": policy_id, "provider_id": provider_id, **self._values(POLICY, row)}))
+
+        claim_id = uuid4()
+        entities.append((Claim, {
+            "claim_id": claim_id,
+            "import_id": import_id,
+            "patient_id": patient_id,
+            "provider_id": provider_id,
+            "policy_id": policy_id,
+            **self._values(CLAIM, row)
+        }))
+
+        for column, value in row.diagnoses:
+            entities.append((ClaimDiagnose, {"claim_diagnose_id": uuid4(), "claim_id": claim_id, column: value}))
+        return entities
@@ -0,0 +1,74 @@
+import os
+import re
+from typing import Optional, Dict, Any, List
+from sqlalchemy.orm import Session
+from app.models.source_profile import SourceProfile
+from app.services.header_fingerprint import header_fingerprint
+
+# Stored files are prefixed with "<uuid4>_"
+_STORAGE_PREFIX = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}_")
+_DIGITS = re.compile(r"\d+")
+
+
+def filename_pattern(filename: str) -> str:
+    """
+    Reduce a filename to the pattern shared by every delivery of the same feed,
+    e.g. 'ACME_Claims_20240131 (2).csv' -> 'acme_claims_# (#).csv'
+    """
+    name = _STORAGE_PREFIX.sub("", os.path.basename(filename).lower())
+    return _DIGITS.sub("#", name)
+
+
+def find_source_profile(db: Session, filename: str, headers: Optional[List] = None) -> Optional[SourceProfile]:
+    """Look a source up by header fingerprint when headers are known, otherwise by filename pattern"""
+    extension = filename.split(".")[-1].lower()
+    query = db.query(SourceProfile).filter(SourceProfile.file_extension == extension)
+
+    if headers:
+        profile = (
+            query.filter(SourceProfile.header_fingerprint == header_fingerprint(headers))
+            .order_by(SourceProfile.success_count.desc())
+            .first()
+        )
+        if profile:
+            return profile
+
+    return query.filter(SourceProfile.filename_pattern == filename_pattern(filename)).first()
+
+
+def record_source_profile(
+    db: Session,
+    filename: str,
+    headers: List,
+    parse_settings: Optional[Dict[str, Any]] = None,
+    extraction_method: Optional[str] = None,
+    date_formats: Optional[Dict[str, str]] = None,
+    ingested: bool = False,
+) -> SourceProfile:
+    """
+    Create or refresh the profile for this file's source with the settings that just worked.
+    Only a successful ingest (`ingested`) counts towards success_count; a parse alone does not.
+    """
+    extension = filename.split(".")[-1].lower()
+    pattern = filename_pattern(filename)
+    profile = (
+        db.query(SourceProfile)
+        .filter(SourceProfile.filename_pattern == pattern, SourceProfile.file_extension == extension)
+        .first()
+    )
+    if not profile:
+        profile = SourceProfile(filename_pattern=pattern, file_extension=extension, success_count=0)
+        db.add(profile)
+
+    profile.header_fingerprint = header_fingerprint(headers) if headers else profile.header_fingerprint
+    if parse_settings is not None:
+        profile.parse_settings = parse_settings
+    if extraction_method is not None:
+        profile.extraction_method = extraction_method
+    if date_formats:
+        profile.date_formats = {**(profile.date_formats or {}), **date_formats}
+    if ingested:
+        profile.success_count = (profile.success_count or 0) + 1
+
+    db.commit()
+    return profile
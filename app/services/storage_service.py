@@ -1,6 +1,9 @@
 import os
+import shutil
+import tempfile
+from contextlib import contextmanager
 from uuid import uuid4
-from app.core.config import STORAGE_TYPE, StorageType
+from app.core.config import STORAGE_TYPE, StorageType, UPLOAD_CHUNK_BYTES
 
 
 
@@ -9,7 +12,7 @@ def save_file_locally(file, filename: str):
     os.makedirs(upload_dir, exist_ok=True)
     file_path = os.path.join(upload_dir, f"{uuid4()}_{filename}")
     with open(file_path, "wb") as f:
-        f.write(file.file.read())
+        shutil.copyfileobj(file.file, f, UPLOAD_CHUNK_BYTES)  # never the whole upload in memory
     return file_path
 
 def save_file_to_s3(file, filename: str):
@@ -26,3 +29,21 @@ def save_file(file, filename: str):
     else:
         return "local", save_file_locally(file, filename)
 
+
+@contextmanager
+def stored_file_path(file_import):
+    """Yield a local filesystem path for a stored import (S3 objects are downloaded to a temp file)"""
+    if file_import.storage_type != StorageType.S3:
+        yield file_import.local_path
+        return
+
+    import boto3  # ensure boto3 is installed
+    s3 = boto3.client("s3")
+    suffix = f".{file_import.file_extension}"
+    fd, temp_path = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    try:
+        s3.download_file(file_import.s3_bucket, file_import.s3_key, temp_path)
+        yield temp_path
+    finally:
+        os.remove(temp_path)
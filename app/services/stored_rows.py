@@ -0,0 +1,57 @@
+from typing import Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from app.core.config import INGEST_READ_ROWS
+from app.models.file_import import FileImport
+from app.models.fixed_width_layout import FixedWidthLayout
+from app.services.storage_service import stored_file_path
+from app.services.file_sniffer import sniff_text_file, open_csv_reader, detect_excel_layout, read_excel_file
+from app.services.fixed_width_service import FIXED_WIDTH_EXTENSIONS, read_fixed_width
+
+# Extensions whose rows can be re-read from storage; documents are mapped from extracted content instead
+STORED_ROW_EXTENSIONS = ["csv", "tsv", "xlsx", "xls", *FIXED_WIDTH_EXTENSIONS]
+
+
+def _records(df: pd.DataFrame) -> List[dict]:
+    df.columns = [str(c) for c in df.columns]
+    return df.replace({np.nan: None}).to_dict(orient="records")
+
+
+def _slices(df: pd.DataFrame, chunk_rows: int) -> Iterator[List[dict]]:
+    for start in range(0, len(df), chunk_rows):
+        yield _records(df.iloc[start:start + chunk_rows].copy())
+
+
+def iter_stored_rows(db: Session, file_import: FileImport, chunk_rows: int = INGEST_READ_ROWS) -> Iterator[List[dict]]:
+    """
+    Re-read a stored upload and yield its rows in chunks of dicts keyed by header.
+    Delimited files are streamed with the parse settings recorded at upload (sniffed again for
+    older imports); workbooks and fixed-width files are parsed once and sliced.
+    """
+    extension = file_import.file_extension.lower()
+    if extension not in STORED_ROW_EXTENSIONS:
+        raise ValueError(f"Rows of .{extension} files cannot be read from storage")
+
+    settings = file_import.parse_settings
+    with stored_file_path(file_import) as path:
+        if extension in ["csv", "tsv"]:
+            settings = settings or sniff_text_file(path, extension)
+            # Read as text, as the browser would have sent it: IDs keep leading zeros
+            for chunk in open_csv_reader(path, settings, chunksize=chunk_rows, dtype=str):
+                yield _records(chunk)
+
+        elif extension in ["xlsx", "xls"]:
+            df = read_excel_file(path, settings or detect_excel_layout(path))
+            yield from _slices(df, chunk_rows)
+
+        else:
+            layout: Optional[FixedWidthLayout] = db.query(FixedWidthLayout).filter(
+                FixedWidthLayout.layout_id == file_import.layout_id
+            ).first()
+            if layout is None:
+                raise ValueError("Fixed-width import has no layout")
+            df = read_fixed_width(path, layout.fields, layout.header_lines, layout.encoding)
+            yield from _slices(df, chunk_rows)
@@ -0,0 +1,7 @@
+import json
+from typing import Any
+
+
+def sse_event(event: str, data: Any) -> str:
+    """One server-sent event frame; values JSON cannot encode (UUIDs, dates) are sent as strings"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
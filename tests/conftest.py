@@ -0,0 +1,64 @@
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base
+from app.models import (  # noqa: F401  (registers every table on Base.metadata)
+    claim_diagnose_model, claim_model, file_import, fixed_width_layout, mapping_cache,
+    patient_model, policy_model, processing_log, provider_model, source_profile,
+)
+from app.models.file_import import FileImport
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb_on_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, _):
+        # Let SQLAlchemy emit BEGIN so SAVEPOINTs work, and enforce foreign keys like PostgreSQL
+        dbapi_connection.isolation_level = None
+        dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
+    @event.listens_for(engine, "begin")
+    def _begin(connection):
+        connection.exec_driver_sql("BEGIN")
+
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine, autoflush=False)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def make_import(db):
+    def make(filename="claims.csv", status="Mapping"):
+        record = FileImport(
+            filename=filename,
+            file_extension=filename.rsplit(".", 1)[-1],
+            storage_type="local",
+            local_path=f"/tmp/{filename}",
+            processing_status=status,
+        )
+        db.add(record)
+        db.commit()
+        return record
+    return make
@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+
+from app.services.extraction_watchdog import run_with_limits, resource, OK, MEMORY_LIMIT
+
+pytestmark = pytest.mark.skipif(resource is None, reason="rlimits need the resource module")
+
+
+def _allocate(megabytes: int) -> int:
+    return len(bytearray(megabytes * 1024 * 1024))
+
+
+def test_memory_cap_does_not_count_the_api_process():
+    # A large API process does not eat into the worker's budget: the worker is not forked from it
+    ballast = np.empty(1536 * 1024 * 1024, dtype=np.uint8)
+    try:
+        assert run_with_limits(_allocate, 10, memory_mb=512) == (OK, 10 * 1024 * 1024)
+    finally:
+        del ballast
+
+
+def test_memory_cap_still_stops_large_allocations():
+    assert run_with_limits(_allocate, 1024, memory_mb=512) == (MEMORY_LIMIT, None)
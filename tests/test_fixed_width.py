@@ -0,0 +1,47 @@
+from decimal import Decimal
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes import fixed_width_layout
+from app.core.database import get_db
+from app.services.fixed_width_service import read_fixed_width
+
+FIELDS = [
+    {"name": "MEMBER", "offset": 0, "length": 4, "type": "str", "target_column": "member_id"},
+    {"name": "AMOUNT", "offset": 4, "length": 18, "type": "decimal", "scale": 2, "target_column": "amount_claimed"},
+]
+
+
+def test_implied_decimals_are_exact(tmp_path):
+    path = tmp_path / "claims.dat"
+    path.write_bytes(b"M001000000000000001050\nM002123456789012345678\nM003                  \n")
+
+    amounts = read_fixed_width(str(path), FIELDS)["AMOUNT"].tolist()
+
+    assert amounts == [Decimal("10.50"), Decimal("1234567890123456.78"), None]
+    assert str(amounts[0]) == "10.50"
+
+
+def test_nrows_reads_only_the_first_records(tmp_path):
+    path = tmp_path / "claims.dat"
+    path.write_bytes(b"M001000000000000001050\nM002000000000000002000\nM003000000000000003000")
+
+    assert read_fixed_width(str(path), FIELDS, nrows=2)["MEMBER"].tolist() == ["M001", "M002"]
+    assert read_fixed_width(str(path), FIELDS, nrows=5)["MEMBER"].tolist() == ["M001", "M002", "M003"]
+
+
+def test_layout_endpoints_use_the_read_schema(db):
+    app = FastAPI()
+    app.include_router(fixed_width_layout.router)
+    app.dependency_overrides[get_db] = lambda: db
+    client = TestClient(app)
+
+    created = client.post("/layouts", json={"name": "acme", "fields": FIELDS})
+    assert created.status_code == 200, created.text
+    layout = created.json()
+    assert layout["fields"][0] == {**FIELDS[0], "format": None, "scale": None}
+    assert layout["encoding"] == "latin-1"
+
+    listed = client.get("/layouts")
+    assert [item["layout_id"] for item in listed.json()] == [layout["layout_id"]]
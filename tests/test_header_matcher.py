@@ -0,0 +1,47 @@
+from app.services.column_profiler import profile_columns
+from app.services.header_matcher import match_headers
+
+
+def _match(header, values):
+    profiles = profile_columns([header], [{header: value} for value in values])
+    matched, unresolved = match_headers([header], profiles=profiles)
+    assert unresolved == []
+    return matched[0]["matched_column"], matched[0]["confidence_score"]
+
+
+def test_exact_header_match_is_not_redirected_by_icd10_like_values():
+    member_ids = [f"M{i:03d}" for i in range(1, 21)]
+    assert _match("Member ID", member_ids) == ("member_id", 1.0)
+
+
+def test_values_redirect_a_vague_header():
+    codes = ["E11.9", "I10", "J45.909", "M54.5", "K21.9"] * 4
+    column, confidence = _match("Code", codes)
+    assert column == "diagnosis_code"
+    assert confidence >= 0.9
+
+
+def test_pruned_scoring_matches_the_full_comparison():
+    from difflib import SequenceMatcher
+
+    from app.services.header_matcher import _INDEX, normalize_phrase, score_header
+
+    def reference(header):
+        phrase = normalize_phrase(header)
+        compact, tokens = phrase.replace(" ", ""), frozenset(phrase.split())
+        best_column, best_score = "Unmapped", 0.0
+        for column, synonym, synonym_compact, synonym_tokens, _ in _INDEX:
+            if phrase == synonym:
+                return column, 1.0
+            if compact == synonym_compact:
+                score = 0.98
+            else:
+                overlap = len(tokens & synonym_tokens) / len(tokens | synonym_tokens)
+                score = 0.95 * max(SequenceMatcher(None, compact, synonym_compact).ratio(), overlap)
+            if score > best_score:
+                best_column, best_score = column, score
+        return best_column, round(best_score, 2)
+
+    headers = ["Mbr Nbr", "Pat_DOB", "Rendering Prov NPI", "Billed Amt", "DX Code 2", "Svc Dt", "Zip", "Remarks"]
+    for header in headers:
+        assert score_header(header) == reference(header), header
@@ -0,0 +1,103 @@
+import pytest
+from sqlalchemy import text
+
+from app.models.claim_model import Claim
+from app.models.patient_model import Patient
+from app.models.provider_model import Provider
+from app.services.bulk_writer import BulkWriter, MissingNaturalKeyIndex
+from app.services.ingest_service import ingest_rows
+
+MAPPINGS = [
+    {"header": header, "final_mapping": target}
+    for header, target in [
+        ("Member ID", "member_id"), ("First Name", "first_name"), ("NPI", "npi_number"), ("Amount", "amount_claimed"),
+    ]
+]
+
+TWO_ROWS_ONE_NPI = [
+    {"Member ID": "M1", "First Name": "Ann", "NPI": "1234567893", "Amount": "10.00"},
+    {"Member ID": "M2", "First Name": "Bob", "NPI": "1234567893", "Amount": "20.00"},
+]
+
+
+def _ingest(db, make_import, rows):
+    return ingest_rows(db, make_import(), MAPPINGS, [dict(row) for row in rows])["statistics"]
+
+
+def test_reimport_with_repeated_keys_keeps_every_row(db, make_import):
+    first = _ingest(db, make_import, TWO_ROWS_ONE_NPI)
+    second = _ingest(db, make_import, TWO_ROWS_ONE_NPI)
+
+    assert first["rows"]["successful"] == 2
+    assert second["rows"]["successful"] == 2
+    assert db.query(Claim).count() == 4
+    assert db.query(Provider).count() == 1
+    assert db.query(Patient).count() == 2
+
+
+def test_reimport_counts_only_created_entities(db, make_import):
+    first = _ingest(db, make_import, TWO_ROWS_ONE_NPI)
+    second = _ingest(db, make_import, TWO_ROWS_ONE_NPI)
+
+    assert first["entities_created"]["patients"] == 2
+    assert first["entities_created"]["providers"] == 1
+    assert second["entities_created"]["patients"] == 0
+    assert second["entities_created"]["providers"] == 0
+    assert second["entities_created"]["claims"] == 2
+
+
+def test_non_string_natural_key(db, make_import):
+    rows = [dict(row, NPI=1234567893) for row in TWO_ROWS_ONE_NPI]
+    first = _ingest(db, make_import, rows)
+    second = _ingest(db, make_import, rows)
+
+    assert first["rows"]["successful"] == 2
+    assert second["rows"]["successful"] == 2
+    assert db.query(Provider).one().npi_number == "1234567893"
+
+
+def test_bisection_retries_valid_rows_with_their_own_keys(db, make_import):
+    db.execute(text(
+        # Fails after the row's patient was upserted and its claim's FK rewritten (like a NUL byte would)
+        "CREATE TRIGGER reject_bad BEFORE INSERT ON claim WHEN NEW.amount_claimed = 666 "
+        "BEGIN SELECT RAISE(ABORT, 'bad claim'); END"
+    ))
+    db.commit()
+    rows = [
+        {"Member ID": "M1", "First Name": "Ann", "NPI": "1234567893", "Amount": "666"},
+        {"Member ID": "M1", "First Name": "Ann", "NPI": "1234567893", "Amount": "2"},
+        {"Member ID": "M2", "First Name": "Bob", "NPI": "1234567893", "Amount": "3"},
+    ]
+    stats = _ingest(db, make_import, rows)
+
+    assert stats["rows"]["failed"] == 1
+    assert stats["rows"]["successful"] == 2
+    assert db.query(Claim).count() == 2
+    assert {p.member_id for p in db.query(Patient)} == {"M1", "M2"}
+
+
+def test_rerun_of_failed_import_replaces_its_committed_claims(db, make_import):
+    from app.services.ingest_service import record_mappings
+
+    file_import = make_import()
+    # Every row commits a claim (and a patient without member ID), but too many fields are invalid
+    rows = [{"Member ID": None, "First Name": "Ann", "NPI": "1234567893", "Amount": "n/a"} for _ in range(3)]
+    result = ingest_rows(db, file_import, MAPPINGS, rows)
+    assert result["processing_status"] == "Failed"
+    assert db.query(Claim).count() == 3
+    assert db.query(Patient).count() == 3
+
+    record_mappings(db, file_import, MAPPINGS)
+    result = ingest_rows(db, file_import, MAPPINGS, [dict(row) for row in TWO_ROWS_ONE_NPI])
+
+    assert result["processing_status"] == "Success"
+    assert db.query(Claim).count() == 2
+    assert {p.member_id for p in db.query(Patient)} == {"M1", "M2"}
+    assert db.query(Provider).count() == 1
+
+
+def test_missing_natural_key_index_is_reported(db):
+    db.execute(text("DROP INDEX ix_patient_member_id"))
+    db.commit()
+    with pytest.raises(MissingNaturalKeyIndex, match="002_natural_key_indexes.sql"):
+        BulkWriter(db)
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from app.services.llm_client import AsyncLLMClient, LLMUnavailableError
+from app.services.llm_providers import FixtureMissingError, MappingProvider
+
+
+class SlowProvider(MappingProvider):
+    name = "slow"
+
+    def __init__(self, text="[]", delay=0.05):
+        self.text = text
+        self.delay = delay
+        self.calls = 0
+
+    async def generate(self, prompt, headers):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.text
+
+
+class FailingProvider(MappingProvider):
+    name = "failing"
+
+    def __init__(self, error):
+        self.error = error
+        self.calls = 0
+
+    async def generate(self, prompt, headers):
+        self.calls += 1
+        raise self.error
+
+
+def test_cancelled_leader_does_not_strand_followers():
+    client = AsyncLLMClient(provider=SlowProvider(text="answer"), retry_base=0)
+
+    async def scenario():
+        leader = asyncio.ensure_future(client.generate("prompt"))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(client.generate("prompt"))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await asyncio.wait_for(follower, 1)
+
+    assert asyncio.run(scenario()) == "answer"
+    assert client._inflight == {}
+
+
+@pytest.mark.parametrize("error", [ValueError("bad request"), FixtureMissingError("no fixture")])
+def test_non_retryable_error_is_unavailable_and_counts_for_the_breaker(error):
+    provider = FailingProvider(error)
+    client = AsyncLLMClient(provider=provider, circuit_failures=2, retry_base=0)
+
+    for _ in range(2):
+        with pytest.raises(LLMUnavailableError):
+            asyncio.run(client.generate("prompt"))
+    assert provider.calls == 2  # no retries
+    assert client.circuit_open
+
+
+def test_unparseable_response_uses_local_fallback(monkeypatch):
+    from app.services import mapping_service
+
+    monkeypatch.setattr("app.services.llm_service.llm_client", AsyncLLMClient(provider=SlowProvider(text="not json", delay=0)))
+
+    mappings = asyncio.run(mapping_service._llm_or_fallback(["Member ID"], [{"Member ID": "1001"}]))
+    assert [(m["header"], m["mapping_source"]) for m in mappings] == [("Member ID", "local_fallback")]
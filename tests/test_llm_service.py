@@ -0,0 +1,38 @@
+import hashlib
+import sys
+import types
+
+from app.services import llm_service
+
+
+def _fake_tiktoken(calls):
+    class Encoding:
+        def encode(self, text):
+            return text.split()
+
+    def get_encoding(name):
+        calls.append(name)
+        return Encoding()
+
+    return types.SimpleNamespace(get_encoding=get_encoding)
+
+
+def test_count_tokens_estimates_without_a_cached_encoding(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setitem(sys.modules, "tiktoken", _fake_tiktoken(calls))
+    monkeypatch.setenv("TIKTOKEN_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(llm_service, "_encoder", None)
+
+    assert llm_service.count_tokens("member id npi") == 4
+    assert calls == []  # would have downloaded the BPE file
+
+
+def test_count_tokens_uses_a_cached_encoding(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setitem(sys.modules, "tiktoken", _fake_tiktoken(calls))
+    monkeypatch.setenv("TIKTOKEN_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(llm_service, "_encoder", None)
+    (tmp_path / hashlib.sha1(llm_service._CL100K_URL.encode()).hexdigest()).write_text("")
+
+    assert llm_service.count_tokens("member id npi") == 3
+    assert calls == ["cl100k_base"]
@@ -0,0 +1,19 @@
+import asyncio
+
+from app.benchmarks.mapping_benchmark import load_corpus, run_benchmark
+
+
+def test_replay_runs_offline_from_the_committed_fixtures():
+    report = asyncio.run(run_benchmark(["replay"], repeats=1))["providers"]["replay"]
+
+    assert report["errors"] == report["fallback_runs"] == 0
+    assert report["llm_calls"] > 0
+
+
+def test_replay_without_fixtures_reports_errors(tmp_path):
+    report = asyncio.run(run_benchmark(["replay"], repeats=1, fixtures_dir=str(tmp_path)))["providers"]["replay"]
+
+    # Cases the local matchers could not finish fell back instead of scoring the local matcher as "replay"
+    assert report["errors"] == report["fallback_runs"] > 0
+    assert sum(case["fallback_runs"] for case in report["cases"]) == report["fallback_runs"]
+    assert report["latency_ms"]["runs"] == len(load_corpus()) - report["errors"]
@@ -0,0 +1,27 @@
+import asyncio
+import threading
+
+from app.services import mapping_service
+
+
+def test_blocking_stages_run_off_the_event_loop(monkeypatch):
+    threads = {}
+
+    def recording(name, result):
+        def blocking(*args, **kwargs):
+            threads[name] = threading.current_thread()
+            return result
+        return blocking
+
+    monkeypatch.setattr(mapping_service, "get_cached_mapping", recording("cache", None))
+    monkeypatch.setattr(mapping_service, "_match_locally", recording("local", ({}, {"NPI": {
+        "header": "NPI", "matched_column": "npi_number", "llm_suggestion": "npi_number",
+        "confidence_score": 1.0, "mapping_source": "local",
+    }}, [])))
+    monkeypatch.setattr(mapping_service, "store_mapping", recording("store", None))
+
+    result = asyncio.run(mapping_service.resolve_mappings(None, ["NPI"], [{"NPI": "1234567893"}]))
+
+    assert [m["matched_column"] for m in result] == ["npi_number"]
+    assert set(threads) == {"cache", "local", "store"}
+    assert all(thread is not threading.main_thread() for thread in threads.values())
@@ -0,0 +1,53 @@
+from app.models.source_profile import SourceProfile
+from app.services.ingest_service import ingest_rows
+from app.services.source_profile_service import record_source_profile
+
+MAPPINGS = [
+    {"header": "Member ID", "final_mapping": "member_id"},
+    {"header": "Service Date", "final_mapping": "claim_date"},
+]
+
+ROWS = [
+    {"Member ID": "M1", "Service Date": "20240131"},
+    {"Member ID": "M2", "Service Date": "20240201"},
+]
+
+
+def test_success_is_counted_after_ingest_with_its_date_formats(db, make_import):
+    record_source_profile(db, "claims.csv", ["Member ID", "Service Date"], {"delimiter": ","})
+    profile = db.query(SourceProfile).one()
+    assert profile.success_count == 0
+
+    result = ingest_rows(db, make_import(), MAPPINGS, [dict(row) for row in ROWS])
+
+    assert result["processing_status"] == "Success"
+    db.refresh(profile)
+    assert profile.success_count == 1
+    assert profile.date_formats == {"Service Date": "%Y%m%d"}
+
+
+def test_failed_ingest_is_not_counted(db, make_import):
+    record_source_profile(db, "claims.csv", ["Member ID", "Service Date"], {"delimiter": ","})
+    rows = [{"Member ID": None, "Service Date": "not a date"}] * 2
+
+    result = ingest_rows(db, make_import(), MAPPINGS, rows)
+
+    assert result["processing_status"] == "Failed"
+    assert db.query(SourceProfile).one().success_count == 0
+
+
+def test_stored_date_format_seeds_the_next_import(db, make_import, monkeypatch):
+    # A feed delivered under a new name each time is found by its header fingerprint
+    record_source_profile(db, "acme_claims.csv", ["Member ID", "Service Date"], {"delimiter": ","})
+    ingest_rows(db, make_import("acme_claims.csv"), MAPPINGS, [dict(row) for row in ROWS])
+
+    def no_inference(*args, **kwargs):
+        raise AssertionError("date format inferred despite the source profile")
+
+    monkeypatch.setattr("app.services.column_cleaner.infer_date_format", no_inference)
+    record_source_profile(db, "acme_export.csv", ["Member ID", "Service Date"], {"delimiter": ","})
+    result = ingest_rows(db, make_import("acme_export.csv"), MAPPINGS, [dict(row) for row in ROWS])
+
+    assert result["statistics"]["date_formats"] == {"Service Date": {"format": "%Y%m%d", "fallback_cells": 0}}
+    renamed = db.query(SourceProfile).filter(SourceProfile.filename_pattern == "acme_export.csv").one()
+    assert (renamed.success_count, renamed.date_formats) == (1, {"Service Date": "%Y%m%d"})
@@ -0,0 +1,66 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes import file_import
+from app.core.database import get_db
+from app.models.claim_model import Claim
+from app.models.patient_model import Patient
+from app.models.provider_model import Provider
+from app.models.processing_log import ProcessingLog
+from app.services.mapping_cache import store_mapping
+from app.services.mapping_history_index import MappingHistoryIndex
+
+HEADERS = ["Member ID", "NPI", "Amount"]
+CSV = b"Member ID,NPI,Amount\n1001,1234567893,10.50\n,1234567893,\n"
+
+
+def _client(db):
+    store_mapping(db, HEADERS, [
+        {"header": "Member ID", "matched_column": "member_id", "confidence_score": 1.0},
+        {"header": "NPI", "matched_column": "npi_number", "confidence_score": 1.0},
+        {"header": "Amount", "matched_column": "amount_claimed", "confidence_score": 1.0},
+    ], confirmed=True)
+
+    app = FastAPI()
+    app.include_router(file_import.router)
+    app.dependency_overrides[get_db] = lambda: db
+    return TestClient(app)
+
+
+def test_straight_through_inserts_inline(db, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # uploads are stored under the working directory
+    response = _client(db).post(
+        "/upload/straight-through", files={"file": ("claims.csv", CSV, "text/csv")}
+    )
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["straight_through"] is True
+    assert body["statistics"]["rows"] == {"total": 2, "successful": 2, "failed": 0, "success_rate": "100.00%"}
+    # Read back as text: an ID column with a gap is not turned into floats ("1001.0")
+    assert db.query(Patient).one().member_id == "1001"
+    assert db.query(Provider).one().npi_number == "1234567893"
+    assert db.query(Claim).count() == 2
+    # The template was applied without review: logged, but not learned from
+    assert {log.user_confirmed for log in db.query(ProcessingLog)} == {False}
+    history = MappingHistoryIndex()
+    history.refresh(db, force=True)
+    assert len(history) == 0
+
+
+def test_upload_parses_only_sample_rows_but_ingests_the_whole_file(db, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(file_import, "UPLOAD_SAMPLE_ROWS", 5)
+    content = b"Member ID,NPI,Amount\n" + b"".join(b"%d,1234567893,1.00\n" % (1000 + i) for i in range(50))
+    client = _client(db)
+
+    mapped = client.post("/upload", files={"file": ("claims.csv", content, "text/csv")})
+    assert mapped.status_code == 200, mapped.text
+    assert len(mapped.json()["sample_data"]) == 5
+    stored = list((tmp_path / "app" / "uploaded_files").iterdir())
+    assert [path.read_bytes() for path in stored] == [content]
+
+    response = client.post("/upload/straight-through", files={"file": ("claims.csv", content, "text/csv")})
+    assert response.status_code == 200, response.text
+    assert response.json()["statistics"]["rows"]["total"] == 50
+    assert db.query(Claim).count() == 50